@@ -1,7 +1,23 @@
-from mailerlite.api import MailerLiteApi
+"""Python wrapper for the MailerLite API.
 
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+Submodules, and ``requests`` with them, are imported when first used.
+"""
 
-__all__ = ['MailerLiteApi', __version__]
+__all__ = ['MailerLiteApi', '__version__']
+
+
+def __getattr__(name):
+    if name == 'MailerLiteApi':
+        from mailerlite.api import MailerLiteApi as value
+    elif name == '__version__':
+        from ._version import get_versions
+        value = get_versions()['version']
+    else:
+        raise AttributeError("module 'mailerlite' has no attribute {!r}"
+                             .format(name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
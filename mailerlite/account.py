@@ -4,8 +4,12 @@ import mailerlite.client as client
 
 
 class Account:
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_ME = client.UrlTemplate('me')
+    URL_STATS = client.UrlTemplate('stats')
+    URL_DOUBLE_OPTIN = client.UrlTemplate('settings', 'double_optin')
 
-    def __init__(self, headers):
+    def __init__(self, headers, validate=True):
         """Initialize Account object.
 
         Parameters
@@ -13,11 +17,15 @@ class Account:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
 
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
 
@@ -32,7 +40,7 @@ class Account:
             all account information.
 
         """
-        url = client.build_url('me')
+        url = self.URL_ME()
         _, res_json = client.get(url, headers=self.headers)
 
         return res_json
@@ -50,7 +58,7 @@ class Account:
             account stats
 
         """
-        url = client.build_url('stats')
+        url = self.URL_STATS()
         _, res_json = client.get(url, headers=self.headers)
 
         return res_json
@@ -66,7 +74,7 @@ class Account:
             deletion status
 
         """
-        url = client.build_url('settings', 'double_optin')
+        url = self.URL_DOUBLE_OPTIN()
         _, res_json = client.get(url, headers=self.headers)
         return res_json
 
@@ -86,7 +94,7 @@ class Account:
             action result
 
         """
-        url = client.build_url('settings', 'double_optin')
+        url = self.URL_DOUBLE_OPTIN()
         body = {'enable': enable}
         _, res_json = client.post(url, body=body, headers=self.headers)
 
@@ -0,0 +1,197 @@
+"""Harvest the activity of many subscribers."""
+
+import json
+import os
+import threading
+
+from mailerlite.concurrency import map_concurrent, RateLimiter
+from mailerlite.constants import Activity, ACTIVITY_TYPES
+
+DONE = -1
+
+
+def _identifier(subscriber):
+    """Return the identifier keyword of a subscriber id or email."""
+    if isinstance(subscriber, str) and '@' in subscriber:
+        return {'email': subscriber}
+    return {'id': subscriber}
+
+
+class ActivityHarvester:
+
+    def __init__(self, api, path, checkpoint=None, atypes=ACTIVITY_TYPES,
+                 page_size=100, max_workers=None, rate=None,
+                 checkpoint_every=50):
+        """Initialize an ActivityHarvester object.
+
+        Every (subscriber, activity type) pair is a stream, paginated on its
+        own. Streams are fetched concurrently and their activities appended
+        to ``path`` as NDJSON, one :class:`Activity` per line with the
+        ``subscriber`` it belongs to.
+
+        The checkpoint file records the offset reached by every stream and
+        the size of the output file at that time. It is a log: each
+        checkpoint appends the offsets changed since the previous one, and
+        the log is compacted when a run starts. When a run is interrupted,
+        the next one truncates the output back to the last recorded size
+        and resumes each stream where it stopped, so no row is lost or
+        written twice.
+
+        Parameters
+        ----------
+        api : :class:`mailerlite.MailerLiteApi`
+            api of the account
+        path : str
+            NDJSON output file, opened in append mode
+        checkpoint : str, optional
+            checkpoint file, default ``path + '.checkpoint'``
+        atypes : list of str
+            activity types to fetch, see :data:`ACTIVITY_TYPES`. None fetches
+            all the activities in a single stream.
+        page_size : int
+            number of activities requested per page (default 100)
+        max_workers : int, optional
+            maximum number of concurrent requests, default 8 or the
+            adaptive limiter maximum, see :func:`resolve_workers`
+        rate : float, optional
+            maximum number of requests per second
+        checkpoint_every : int
+            number of pages between two checkpoints (default 50)
+
+        """
+        atypes = [None] if atypes is None else list(atypes)
+        unknown = [a for a in atypes if a is not None
+                   and a not in ACTIVITY_TYPES]
+        if unknown:
+            raise ValueError('Incorrect value atype. Activity type should'
+                             ' be {0}'.format(ACTIVITY_TYPES))
+        self.api = api
+        self.path = path
+        self.checkpoint = checkpoint or path + '.checkpoint'
+        self.atypes = atypes
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.checkpoint_every = checkpoint_every
+        self._limiter = RateLimiter(rate) if rate else None
+        self._lock = threading.Lock()
+        self._offsets = {}
+        # offsets changed since the last checkpoint
+        self._changed = {}
+        self._pages = 0
+        self._file = None
+        self.rows = 0
+
+    @staticmethod
+    def stream_key(subscriber, atype):
+        """Return the checkpoint key of a stream."""
+        return '{}:{}'.format(subscriber, atype or 'all')
+
+    def _load_checkpoint(self):
+        """Replay the checkpoint log, then compact it into one record."""
+        if not os.path.exists(self.checkpoint):
+            return {}, None
+        offsets, size = {}, 0
+        with open(self.checkpoint) as f:
+            for line in f:
+                try:
+                    state = json.loads(line)
+                except ValueError:
+                    # a record torn by a crash, the previous one holds
+                    break
+                offsets.update(state['streams'])
+                size = state['size']
+
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(json.dumps({'size': size, 'streams': offsets}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint)
+        return offsets, size
+
+    def _save_checkpoint(self):
+        """Append the changed offsets and the output size.
+
+        The lock must be held.
+
+        """
+        if not self._changed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        state = {'size': self._file.tell(), 'streams': self._changed}
+        with open(self.checkpoint, 'a') as f:
+            f.write(json.dumps(state) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._changed = {}
+
+    def _write(self, key, subscriber, activities, offset):
+        lines = []
+        for res in activities:
+            row = {'subscriber': subscriber}
+            row.update((k, res.get(k)) for k in Activity._fields)
+            lines.append(json.dumps(row))
+        with self._lock:
+            if lines:
+                self._file.write('\n'.join(lines) + '\n')
+            self._offsets[key] = self._changed[key] = offset
+            self.rows += len(lines)
+            self._pages += 1
+            if self._pages % self.checkpoint_every == 0:
+                self._save_checkpoint()
+
+    def _harvest(self, stream):
+        subscriber, atype = stream
+        key = self.stream_key(subscriber, atype)
+        offset = self._offsets.get(key, 0)
+        while offset != DONE:
+            if self._limiter is not None:
+                self._limiter.acquire()
+            page = self.api.subscribers.activity(
+                as_json=True, atype=atype, limit=self.page_size,
+                offset=offset, **_identifier(subscriber)) or []
+            offset = DONE if len(page) < self.page_size \
+                else offset + len(page)
+            self._write(key, subscriber, page, offset)
+
+    def run(self, subscribers):
+        """Fetch the activities of the subscribers.
+
+        Parameters
+        ----------
+        subscribers : iterable
+            subscriber ids or emails
+
+        Returns
+        -------
+        rows : int
+            number of activities written by this run
+
+        """
+        self._offsets, size = self._load_checkpoint()
+        self._changed = {}
+        self.rows = 0
+        streams = [(subscriber, atype) for subscriber in subscribers
+                   for atype in self.atypes
+                   if self._offsets.get(self.stream_key(subscriber, atype))
+                   != DONE]
+
+        if size is not None and (not os.path.exists(self.path) or
+                                 os.path.getsize(self.path) < size):
+            raise ValueError('{} is missing or shorter than its checkpoint,'
+                             ' remove {} to start over'
+                             .format(self.path, self.checkpoint))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if size is not None:
+                # drop the rows written after the last checkpoint
+                f.truncate(size)
+            self._file = f
+            try:
+                map_concurrent(self._harvest, streams,
+                               max_workers=self.max_workers)
+            finally:
+                with self._lock:
+                    self._save_checkpoint()
+                self._file = None
+        return self.rows
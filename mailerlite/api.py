@@ -1,21 +1,33 @@
 """Mailerlite API."""
 import os
+import threading
+from importlib import import_module
 
-from mailerlite.campaign import Campaigns
-from mailerlite.segment import Segments
-from mailerlite.subscriber import Subscribers
-from mailerlite.group import Groups
-from mailerlite.field import Fields
-from mailerlite.webhook import Webhooks
-from mailerlite.account import Account
 import mailerlite.client as client
 
+# attribute -> (module, class) of the resources, imported on first access
+RESOURCES = {'campaigns': ('mailerlite.campaign', 'Campaigns'),
+             'segments': ('mailerlite.segment', 'Segments'),
+             'subscribers': ('mailerlite.subscriber', 'Subscribers'),
+             'groups': ('mailerlite.group', 'Groups'),
+             'fields': ('mailerlite.field', 'Fields'),
+             'webhooks': ('mailerlite.webhook', 'Webhooks'),
+             'account': ('mailerlite.account', 'Account'),
+             }
+
 
 class MailerLiteApi:
     """Python interface to the mailerlite v2 API.
 
+    Resources (``campaigns``, ``subscribers``, ...) are created, and their
+    module imported, the first time they are accessed. The api key is
+    checked once, by the constructor; resources do not check it again.
+
     """
 
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_BATCH = client.UrlTemplate('batch')
+
     def __init__(self, api_key=None):
         """Initialize a new mailerlite.api object.
 
@@ -34,14 +46,27 @@ class MailerLiteApi:
                          "X-MailerLite-ApiDocs": "true",
                          'x-mailerlite-apikey': api_key
                          }
-
-        self.campaigns = Campaigns(headers=self.headers)
-        self.segments = Segments(headers=self.headers)
-        self.subscribers = Subscribers(headers=self.headers)
-        self.groups = Groups(headers=self.headers)
-        self.fields = Fields(headers=self.headers)
-        self.webhooks = Webhooks(headers=self.headers)
-        self.account = Account(headers=self.headers)
+        self._resources_lock = threading.Lock()
+        valid_headers, error_msg = client.check_headers(self._headers)
+        if not valid_headers:
+            raise ValueError(error_msg)
+
+    def __getattr__(self, name):
+        if name not in RESOURCES:
+            raise AttributeError("'MailerLiteApi' object has no attribute"
+                                 " {!r}".format(name))
+        module, cls = RESOURCES[name]
+        # one instance per api, even when first accessed by several threads
+        with self._resources_lock:
+            if name not in vars(self):
+                resource = getattr(import_module(module), cls)(
+                    headers=self.headers, validate=False)
+                # stored on the instance, __getattr__ is not called again
+                setattr(self, name, resource)
+        return vars(self)[name]
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(RESOURCES))
 
     @property
     def headers(self):
@@ -78,5 +103,61 @@ class MailerLiteApi:
         * requests parameter should not be empty
 
         """
-        url = client.build_url('batch')
+        url = self.URL_BATCH()
         return client.post(url, body=batch_requests, headers=self.headers)
+
+    def batch_results(self, batch_requests, chunk_size=50):
+        """Execute a list of commands and report the outcome of each one.
+
+        Unlike :meth:`batch`, a failing sub-request does not hide the
+        others: every request gets a :class:`BulkItem` with its status,
+        body and MailerLite error code. Requests are sent in batches of
+        ``chunk_size``; when a whole batch call fails, each of its requests
+        is reported failed with that error.
+
+        Parameters
+        ----------
+        batch_requests : dict or list of dict
+            ``{"requests": [...]}`` as for :meth:`batch`, or the list itself
+        chunk_size : int
+            requests per batch call, 50 at most (default 50)
+
+        Returns
+        -------
+        result : :class:`BulkResult`
+            ``result.retry()`` sends again the failed requests only
+
+        """
+        from mailerlite.bulk import BulkResult, item_from_error, \
+            item_from_status
+
+        if isinstance(batch_requests, dict):
+            batch_requests = batch_requests.get('requests', [])
+        batch_requests = list(batch_requests)
+        if not 0 < chunk_size <= 50:
+            raise ValueError('chunk_size should be between 1 and 50')
+
+        url = self.URL_BATCH()
+        items = []
+        for start in range(0, len(batch_requests), chunk_size):
+            chunk = batch_requests[start:start + chunk_size]
+            try:
+                _, res_json = client.post(url, body={'requests': chunk},
+                                          headers=self.headers)
+            except IOError as e:
+                items.extend(item_from_error(start + i, request, e)
+                             for i, request in enumerate(chunk))
+                continue
+            responses = res_json.get('responses', []) \
+                if isinstance(res_json, dict) else res_json or []
+            for i, request in enumerate(chunk):
+                if i < len(responses) and isinstance(responses[i], dict):
+                    response = responses[i]
+                    items.append(item_from_status(start + i, request,
+                                                  response.get('code'),
+                                                  response.get('body')))
+                else:
+                    # missing answer, the request may not have run
+                    items.append(item_from_status(start + i, request, None))
+        return BulkResult(items, send=lambda requests: self.batch_results(
+            requests, chunk_size=chunk_size))
@@ -0,0 +1,190 @@
+"""Per item results of the bulk endpoints."""
+
+import time
+
+from mailerlite.constants import BulkItem
+from mailerlite.exceptions import MailerLiteError, error_class
+
+
+def _error_message(body):
+    """Return the MailerLite error code and message of a response body."""
+    if not isinstance(body, dict):
+        return None, body if isinstance(body, str) else None
+    error = body.get('error')
+    if isinstance(error, dict):
+        return error.get('code'), error.get('message')
+    if isinstance(error, str):
+        return body.get('code'), error
+    return body.get('code'), body.get('message')
+
+
+def item_from_status(index, request, status, body=None):
+    """Return the :class:`BulkItem` of a sub-request answered with status."""
+    if status is not None and status < 400:
+        return BulkItem(index=index, request=request, ok=True, status=status,
+                        body=body, retryable=False)
+    code, message = _error_message(body)
+    if status is None:
+        # the outcome is unknown, sending it again may succeed
+        return BulkItem(index=index, request=request, ok=False, body=body,
+                        code=code, retryable=True,
+                        message=message or 'no response for this request')
+    return BulkItem(index=index, request=request, ok=False, status=status,
+                    body=body, code=code, message=message,
+                    retryable=error_class(status).retryable)
+
+
+def item_from_error(index, request, error):
+    """Return the failed :class:`BulkItem` of a request that raised error."""
+    if isinstance(error, MailerLiteError):
+        return BulkItem(index=index, request=request, ok=False,
+                        status=error.status, body=error.body,
+                        code=error.code, message=error.message,
+                        retryable=error.retryable,
+                        retry_after=error.retry_after)
+    # connection errors and timeouts may succeed later, invalid requests
+    # (ValueError, ...) will not
+    return BulkItem(index=index, request=request, ok=False,
+                    message=str(error), retryable=isinstance(error, IOError))
+
+
+class BulkResult:
+
+    def __init__(self, items, send=None):
+        """Initialize a BulkResult object.
+
+        The outcome of a bulk call, one :class:`BulkItem` per sent item, in
+        the order they were sent. Failed items keep their request, their
+        HTTP status, the MailerLite error code and message, and whether
+        sending them again may succeed.
+
+        Parameters
+        ----------
+        items : list of :class:`BulkItem`
+        send : callable, optional
+            called with a list of requests, returns their
+            :class:`BulkResult`; used by :meth:`retry`
+
+        """
+        self.items = sorted(items, key=lambda item: item.index)
+        self.send = send
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __repr__(self):
+        return '<BulkResult {} ok, {} failed>'.format(len(self.succeeded),
+                                                      len(self.failed))
+
+    @property
+    def ok(self):
+        """True when every item succeeded."""
+        return all(item.ok for item in self.items)
+
+    @property
+    def succeeded(self):
+        """List of the items which succeeded."""
+        return [item for item in self.items if item.ok]
+
+    @property
+    def failed(self):
+        """List of the items which failed."""
+        return [item for item in self.items if not item.ok]
+
+    @property
+    def retryable(self):
+        """List of the failed items which may succeed when sent again."""
+        return [item for item in self.items if not item.ok and item.retryable]
+
+    def errors(self):
+        """Return the number of failed items per HTTP status."""
+        counts = {}
+        for item in self.failed:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+    def merge(self, result, items):
+        """Return a new result where items are replaced by result.
+
+        Parameters
+        ----------
+        result : :class:`BulkResult`
+            result of sending again the requests of items, in order
+        items : list of :class:`BulkItem`
+            items of this result which were sent again
+
+        """
+        merged = {item.index: item for item in self.items}
+        for old, new in zip(items, result):
+            merged[old.index] = new._replace(index=old.index)
+        return BulkResult(merged.values(), send=self.send)
+
+    def retry(self, attempts=3, retryable_only=True, delay=1.,
+              max_delay=300., sleep=time.sleep):
+        """Send again the failed items only.
+
+        Parameters
+        ----------
+        attempts : int
+            maximum number of rounds (default 3)
+        retryable_only : bool
+            skip the failures which would fail again, e.g. validation
+            errors (default True)
+        delay : float
+            seconds to wait before the first round, doubled each round; the
+            ``Retry-After`` of a rate limited item is used when longer
+        max_delay : float
+            maximum seconds to wait before a round (default 300)
+        sleep : callable
+            called with the seconds to wait
+
+        Returns
+        -------
+        result : :class:`BulkResult`
+            this result updated with the outcome of the retried items
+
+        """
+        return retry_failed(self, self.send, attempts=attempts,
+                            retryable_only=retryable_only, delay=delay,
+                            max_delay=max_delay, sleep=sleep)
+
+
+def retry_failed(result, send, attempts=3, retryable_only=True, delay=1.,
+                 max_delay=300., sleep=time.sleep):
+    """Send again the failed items of a :class:`BulkResult`.
+
+    Parameters
+    ----------
+    result : :class:`BulkResult`
+    send : callable
+        called with the list of requests to send again, returns their
+        :class:`BulkResult`
+    attempts, retryable_only, delay, max_delay, sleep
+        see :meth:`BulkResult.retry`
+
+    Returns
+    -------
+    result : :class:`BulkResult`
+
+    """
+    if send is None:
+        raise ValueError('send is required to retry the failed items')
+    for attempt in range(attempts):
+        items = result.retryable if retryable_only else result.failed
+        if not items:
+            break
+        wait = delay * 2 ** attempt
+        wait = max([wait] + [item.retry_after for item in items
+                             if item.retry_after is not None])
+        wait = min(wait, max_delay)
+        if wait > 0:
+            sleep(wait)
+        result = result.merge(send([item.request for item in items]), items)
+        result.send = send
+    return result
@@ -0,0 +1,155 @@
+"""Cache of GET responses revalidated with ETag / Last-Modified."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+
+    __slots__ = ('status', 'body', 'etag', 'last_modified', 'stored_at',
+                 'records')
+
+    def __init__(self, status, body, etag, last_modified, stored_at):
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.records = None
+
+
+class ResponseCache:
+
+    def __init__(self, maxsize=256, ttl=0, clock=time.monotonic):
+        """Initialize a ResponseCache object.
+
+        Only responses carrying an ``ETag`` or a ``Last-Modified`` header
+        are stored. Once ``ttl`` is over, entries are revalidated with a
+        conditional request (``If-None-Match`` / ``If-Modified-Since``):
+        on ``304 Not Modified`` the stored body, and the records already
+        decoded from it, are reused as they are.
+
+        Parameters
+        ----------
+        maxsize : int
+            maximum number of entries, least recently used are evicted
+            first (default 256)
+        ttl : float
+            seconds during which an entry is served without asking the API
+            (default 0, always revalidate)
+        clock : callable, optional
+            monotonic time source, mostly useful for testing
+
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key):
+        """Return the entry stored for key and whether it is still fresh.
+
+        Returns
+        -------
+        entry : object or None
+            the stored entry
+        fresh : bool
+            True if the entry can be used without revalidation
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            fresh = self._clock() - entry.stored_at < self.ttl
+            if fresh:
+                self.hits += 1
+            return entry, fresh
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Return the validators to send for a stored entry."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, key, status, body, response_headers):
+        """Store a response if it carries validators.
+
+        Returns
+        -------
+        stored : bool
+            True if the response has been cached
+
+        """
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+        with self._lock:
+            self._entries[key] = _Entry(status, body, etag, last_modified,
+                                        self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return True
+
+    def refresh(self, entry):
+        """Mark an entry as revalidated by a ``304 Not Modified``."""
+        with self._lock:
+            entry.stored_at = self._clock()
+            self.revalidated += 1
+
+    def decode(self, key, body, decoder):
+        """Decode a body, reusing the records decoded for the same entry.
+
+        Parameters
+        ----------
+        key : hashable
+            request key
+        body : object
+            JSON body returned by the request
+        decoder : callable
+            build the records from the body
+
+        Returns
+        -------
+        records : object
+            decoded records, lists are copied
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry.body is not body:
+            return decoder(body)
+        if entry.records is None:
+            entry.records = decoder(body)
+        records = entry.records
+        return list(records) if isinstance(records, list) else records
+
+    def invalidate(self, key=None):
+        """Remove one entry, or all of them if key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Return hits, revalidations, misses and size of the cache."""
+        with self._lock:
+            return {'hits': self.hits, 'revalidated': self.revalidated,
+                    'misses': self.misses, 'size': len(self._entries)}
@@ -5,8 +5,15 @@ from mailerlite.constants import Campaign, Stats
 
 
 class Campaigns:
-
-    def __init__(self, headers):
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_CAMPAIGNS = client.UrlTemplate('campaigns')
+    URL_CAMPAIGN = client.UrlTemplate('campaigns', '{}')
+    URL_CONTENT = client.UrlTemplate('campaigns', '{}', 'content')
+    URL_SEND = client.UrlTemplate('campaigns', '{}', 'actions/send')
+    URL_CANCEL = client.UrlTemplate('campaigns', '{}', 'actions/cancel')
+    URL_COUNT = client.UrlTemplate('campaigns', '{}', 'count')
+
+    def __init__(self, headers, validate=True):
         """Initialize Campaigns object.
 
         Parameters
@@ -14,10 +21,14 @@ class Campaigns:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
 
@@ -53,17 +64,16 @@ class Campaigns:
             raise IOError("Incorrect order, please choose between ASC or DESC")
 
         params = {'limit': limit, 'offset': offset, 'order': order}
-        url = client.build_url('campaigns', status, **params)
+        url = self.URL_CAMPAIGN(status, **params)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        for res in res_json:
-            res['opened'] = Stats(**res.pop('opened'))
-            res['clicked'] = Stats(**res.pop('clicked'))
-
-        all_campaigns = [Campaign(**res) for res in res_json]
+        all_campaigns = [Campaign(**{**res,
+                                     'opened': Stats(**res['opened']),
+                                     'clicked': Stats(**res['clicked'])})
+                         for res in res_json]
         return all_campaigns
 
     # def get(self, campaign_id, as_json=False):
@@ -83,7 +93,7 @@ class Campaigns:
     #     campaign: :class:`Campaign`
     #         a single campaign
     #     """
-    #     url = client.build_url('campaigns', campaign_id)
+    #     url = self.URL_CAMPAIGN(campaign_id)
     #     res_code, res_json = client.get(url, headers=self.headers)
 
     #     if as_json or not res_json:
@@ -139,7 +149,7 @@ class Campaigns:
             * {$url} - URL to your HTML newsletter
 
         """
-        url = client.build_url('campaigns', campaign_id, 'content')
+        url = self.URL_CONTENT(campaign_id)
         # Todo, Check html syntax
         body = {"html": html, "plain": plain}
         _, res_json = client.put(url, body=body, headers=self.headers)
@@ -216,7 +226,7 @@ class Campaigns:
                                  " ab_settings and they are required : "
                                  "{}".format(errors))
 
-        url = client.build_url('campaigns')
+        url = self.URL_CAMPAIGNS()
         return client.post(url, body=data, headers=self.headers)
 
     def send(self, campaign_id):
@@ -237,7 +247,7 @@ class Campaigns:
         """
         # TODO: Check if campaign is in Draft otherwise raise an issue
         #  Add parameters like followup / send later / etc...
-        url = client.build_url('campaigns', campaign_id, "actions/send")
+        url = self.URL_SEND(campaign_id)
         return client.post(url, headers=self.headers)
 
     def cancel(self, campaign_id, as_json=False):
@@ -259,7 +269,7 @@ class Campaigns:
 
         """
         # TODO: Check if campaign is in Outbox otherwise raise an issue
-        url = client.build_url('campaigns', campaign_id, "actions/cancel")
+        url = self.URL_CANCEL(campaign_id)
         code, res_json = client.post(url, headers=self.headers)
 
         # TODO: Check new attribute to campaign object.
@@ -287,7 +297,7 @@ class Campaigns:
         success: bool
             deletion status
         """
-        url = client.build_url('campaigns', campaign_id)
+        url = self.URL_CAMPAIGN(campaign_id)
         return client.delete(url, headers=self.headers)
 
     def count(self, status='sent'):
@@ -305,6 +315,6 @@ class Campaigns:
         """
         if status.lower() not in ['sent', 'draft', 'outbox']:
             raise ValueError('Incorrect status, check documentation')
-        url = client.build_url('campaigns', status.lower(), 'count')
+        url = self.URL_COUNT(status.lower())
         _, res_json = client.get(url, headers=self.headers)
         return res_json['count']
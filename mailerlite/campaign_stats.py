@@ -0,0 +1,233 @@
+"""Aggregate the statistics of all campaigns."""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from mailerlite.concurrency import map_concurrent
+from mailerlite.constants import CampaignRollup
+from mailerlite.pagination import iter_pages, iter_records
+
+CAMPAIGN_STATUSES = ('sent', 'draft', 'outbox')
+PERIODS = ('day', 'week', 'month', 'year', 'all')
+
+
+def period_key(date, period='month'):
+    """Return the period a MailerLite date belongs to.
+
+    Parameters
+    ----------
+    date : str
+        date as returned by the API, e.g. '2020-05-03 10:12:54'
+    period : str
+        one of 'day', 'week', 'month', 'year' or 'all'
+
+    Returns
+    -------
+    key : str or None
+        e.g. '2020-05-03', '2020-W18', '2020-05', '2020' or 'all'.
+        None if the date is missing.
+
+    """
+    if period == 'all':
+        return 'all'
+    if not date:
+        return None
+    if period == 'day':
+        return date[:10]
+    if period == 'month':
+        return date[:7]
+    if period == 'year':
+        return date[:4]
+    if period == 'week':
+        year, week, _ = datetime.strptime(date[:10], '%Y-%m-%d') \
+            .isocalendar()
+        return '{}-W{:02d}'.format(year, week)
+    raise ValueError('Incorrect period, should be {}'.format(PERIODS))
+
+
+def _count(stats):
+    if isinstance(stats, dict):
+        return stats.get('count') or 0
+    return stats or 0
+
+
+class CampaignStats:
+
+    def __init__(self, api, statuses=CAMPAIGN_STATUSES, page_size=100,
+                 max_workers=3, window=7 * 86400, clock=time.time):
+        """Initialize a CampaignStats object.
+
+        Campaigns are fetched with :meth:`refresh`, one listing per status
+        running in parallel. Rollups asked with :meth:`rollup` are kept up
+        to date: a refresh only adds the difference of the campaigns that
+        changed, instead of aggregating everything again. The opens and
+        clicks of a sent campaign keep changing for a while: campaigns sent
+        within ``window`` are always fetched again.
+
+        Parameters
+        ----------
+        api : :class:`mailerlite.MailerLiteApi`
+            api of the account
+        statuses : tuple of str
+            statuses to fetch (default: sent, draft and outbox)
+        page_size : int
+            number of campaigns requested per page (default 100)
+        max_workers : int
+            maximum number of concurrent requests (default 3)
+        window : float
+            seconds after sending during which a campaign is fetched again
+            by every refresh (default 7 days)
+        clock : callable
+            returns the current unix time
+
+        """
+        unknown = set(statuses) - set(CAMPAIGN_STATUSES)
+        if unknown:
+            raise ValueError('Incorrect statuses: {}'.format(unknown))
+        self.api = api
+        self.statuses = tuple(statuses)
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._campaigns = {}
+        self._rollups = {}
+
+    def __len__(self):
+        return len(self._campaigns)
+
+    def _fetch(self, status, full):
+        """Return the campaigns of a status and if the listing is full."""
+        with self._lock:
+            known = set(self._campaigns)
+        if status != 'sent' or full or not known:
+            return status, list(iter_records(
+                self.api.campaigns.all, status=status,
+                page_size=self.page_size, as_json=True)), True
+
+        # sent campaigns: newest first, stop at the first page already
+        # known and sent before the window
+        since = datetime.fromtimestamp(self.clock() - self.window,
+                                       timezone.utc) \
+            .strftime('%Y-%m-%d %H:%M:%S')
+        campaigns = []
+        for page in iter_pages(self.api.campaigns.all, status=status,
+                               page_size=self.page_size, order='desc',
+                               as_json=True):
+            campaigns.extend(page)
+            if all(c['id'] in known and (c.get('date_send') or '') < since
+                   for c in page):
+                break
+        return status, campaigns, False
+
+    def refresh(self, full=False):
+        """Fetch the campaigns and update the rollups.
+
+        Parameters
+        ----------
+        full : bool
+            fetch every sent campaign again. By default, only the newest
+            sent campaigns are fetched until a page of known ones, sent
+            before the window, is met.
+            Drafts and outbox are always fetched completely.
+
+        Returns
+        -------
+        changed : int
+            number of campaigns added, updated or removed
+
+        """
+        results = map_concurrent(lambda status: self._fetch(status, full),
+                                 self.statuses, max_workers=self.max_workers)
+        changed = 0
+        with self._lock:
+            for status, campaigns, complete in results:
+                seen = set()
+                for campaign in campaigns:
+                    campaign = {**campaign, 'status': status}
+                    seen.add(campaign['id'])
+                    if self._campaigns.get(campaign['id']) != campaign:
+                        self._replace(campaign['id'], campaign)
+                        changed += 1
+                if complete:
+                    gone = [cid for cid, c in self._campaigns.items()
+                            if c['status'] == status and cid not in seen]
+                    for cid in gone:
+                        self._replace(cid, None)
+                    changed += len(gone)
+        return changed
+
+    def _replace(self, campaign_id, campaign):
+        old = self._campaigns.pop(campaign_id, None)
+        if campaign is not None:
+            self._campaigns[campaign_id] = campaign
+        for (period, by), totals in self._rollups.items():
+            if old is not None:
+                self._accumulate(totals, old, period, by, -1)
+            if campaign is not None:
+                self._accumulate(totals, campaign, period, by, 1)
+
+    @staticmethod
+    def _keys(campaign, period, by):
+        key = period_key(campaign.get('date_send') or
+                         campaign.get('date_created'), period)
+        if by is None:
+            return [key]
+        value = by(campaign) if callable(by) else campaign.get(by)
+        if isinstance(value, (list, tuple, set)):
+            return [(key, v.get('id') if isinstance(v, dict) else v)
+                    for v in value]
+        return [(key, value)]
+
+    def _accumulate(self, totals, campaign, period, by, sign):
+        values = (1, campaign.get('total_recipients') or 0,
+                  _count(campaign.get('opened')),
+                  _count(campaign.get('clicked')))
+        for key in self._keys(campaign, period, by):
+            row = totals.setdefault(key, [0, 0, 0, 0])
+            for i, value in enumerate(values):
+                row[i] += sign * value
+            if row[0] == 0:
+                del totals[key]
+
+    def rollup(self, period='month', by=None):
+        """Aggregate campaigns, recipients, opens and clicks.
+
+        Parameters
+        ----------
+        period : str
+            one of 'day', 'week', 'month' (default), 'year' or 'all'.
+            Campaigns are dated by their sending date, or their creation
+            date if not sent.
+        by : str or callable, optional
+            also split by this campaign key (e.g. 'status', 'type') or by
+            the value returned by a callable taking the campaign dict. List
+            values (e.g. 'groups') count the campaign once for each item.
+
+        Returns
+        -------
+        rollups : list of :class:`CampaignRollup`
+            sorted by key. The key is the period, or (period, value) when
+            ``by`` is given.
+
+        """
+        if period not in PERIODS:
+            raise ValueError('Incorrect period, should be {}'
+                             .format(PERIODS))
+        with self._lock:
+            totals = self._rollups.get((period, by))
+            if totals is None:
+                totals = self._rollups[(period, by)] = {}
+                for campaign in self._campaigns.values():
+                    self._accumulate(totals, campaign, period, by, 1)
+            rows = sorted(totals.items(), key=lambda item: str(item[0]))
+
+        return [CampaignRollup(key=key, campaigns=n, recipients=recipients,
+                               opened=opened, clicked=clicked,
+                               open_rate=opened / recipients
+                               if recipients else 0.0,
+                               click_rate=clicked / recipients
+                               if recipients else 0.0)
+                for key, (n, recipients, opened, clicked) in rows]
@@ -0,0 +1,220 @@
+"""Circuit breaker guarding the calls to the MailerLite API."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from mailerlite.exceptions import MailerLiteError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(MailerLiteError):
+    """Request rejected without being sent because the circuit is open."""
+
+    retryable = True
+
+    def __init__(self, retry_after):
+        super().__init__(message="MailerLite circuit is open, retry in "
+                         "{:.1f}s".format(retry_after),
+                         retry_after=retry_after)
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=10,
+                 reset_timeout=30, half_open_calls=1, on_state_change=None,
+                 clock=time.monotonic):
+        """Initialize a CircuitBreaker object.
+
+        Parameters
+        ----------
+        failure_rate : float
+            fraction of failed calls in the window opening the circuit
+            (default 0.5)
+        window : int
+            number of most recent calls used to compute the failure rate
+            (default 20)
+        min_calls : int
+            minimum number of recorded calls before the circuit can open
+            (default 10)
+        reset_timeout : float
+            seconds to stay open before letting trial calls through
+            (default 30)
+        half_open_calls : int
+            number of trial calls allowed while half-open (default 1)
+        on_state_change : callable, optional
+            called with ``(old_state, new_state)`` on every transition,
+            outside of the breaker lock so it may read the breaker
+        clock : callable, optional
+            monotonic time source, mostly useful for testing
+
+        """
+        if not 0 < failure_rate <= 1:
+            raise ValueError("failure_rate should be in ]0, 1]")
+        if min_calls > window:
+            raise ValueError("min_calls can not be greater than window")
+
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.on_state_change = on_state_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+        self._rejected = 0
+        # incremented on every transition, tokens of older calls are stale
+        self._generation = 0
+        # transitions waiting to be reported to on_state_change
+        self._changes = []
+
+    @property
+    def state(self):
+        """Return the current state: 'closed', 'open' or 'half_open'."""
+        with self._locked():
+            return self._current_state()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the lock, then report the transitions made while held."""
+        changes = []
+        try:
+            with self._lock:
+                try:
+                    yield
+                finally:
+                    changes, self._changes = self._changes, []
+        finally:
+            if self.on_state_change is not None:
+                for old_state, state in changes:
+                    self.on_state_change(old_state, state)
+
+    def _current_state(self):
+        if self._state == OPEN and \
+           self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state):
+        old_state, self._state = self._state, state
+        self._generation += 1
+        if state == OPEN:
+            self._opened_at = self._clock()
+        elif state == CLOSED:
+            self._outcomes.clear()
+            self._opened_at = None
+        self._trials = 0
+        if old_state != state:
+            self._changes.append((old_state, state))
+
+    def _retry_after(self):
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout -
+                   (self._clock() - self._opened_at))
+
+    def before_request(self):
+        """Reserve a call, or fail fast if the circuit does not allow it.
+
+        Returns
+        -------
+        token : tuple
+            identifies the call, to give back to :meth:`record_success`,
+            :meth:`record_failure`, :meth:`record_status` or
+            :meth:`release`
+
+        Raises
+        ------
+        CircuitOpenError
+            if the circuit is open or all half-open trials are in flight
+
+        """
+        with self._locked():
+            state = self._current_state()
+            if state == CLOSED:
+                return (self._generation, False)
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return (self._generation, True)
+            self._rejected += 1
+            raise CircuitOpenError(self._retry_after())
+
+    def _is_stale(self, token):
+        # a call started before the last transition does not tell anything
+        # about the current state, e.g. a success sent before the circuit
+        # opened must not close it
+        return token is not None and token[0] != self._generation
+
+    def record_success(self, token=None):
+        """Record a call which reached the API and got a sane answer."""
+        with self._locked():
+            if self._is_stale(token):
+                return
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+                return
+            self._outcomes.append(False)
+
+    def record_failure(self, token=None):
+        """Record a call which failed (network error, 5xx, 429)."""
+        with self._locked():
+            if self._is_stale(token):
+                return
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append(True)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and \
+               sum(self._outcomes) / calls >= self.failure_rate:
+                self._transition(OPEN)
+
+    def record_status(self, status_code, token=None):
+        """Record a call from its HTTP status code."""
+        if status_code >= 500 or status_code == 429:
+            self.record_failure(token)
+        else:
+            self.record_success(token)
+
+    def release(self, token):
+        """Free the trial slot of a call ended without outcome to record."""
+        with self._locked():
+            if not self._is_stale(token) and token[1] and \
+               self._state == HALF_OPEN:
+                self._trials -= 1
+
+    def reset(self):
+        """Force the circuit back to the closed state."""
+        with self._locked():
+            self._transition(CLOSED)
+
+    def stats(self):
+        """Return a snapshot of the breaker for monitoring.
+
+        Returns
+        -------
+        stats : dict
+            state, calls and failures in the window, failure rate, seconds
+            before the next trial and number of rejected calls
+
+        """
+        with self._locked():
+            state = self._current_state()
+            calls = len(self._outcomes)
+            failures = sum(self._outcomes)
+            return {'state': state,
+                    'calls': calls,
+                    'failures': failures,
+                    'failure_rate': failures / calls if calls else 0.0,
+                    'retry_after': self._retry_after() if state == OPEN
+                    else 0.0,
+                    'rejected': self._rejected}
@@ -0,0 +1,620 @@
+"""Command line interface: ``mailerlite export`` and ``mailerlite import``."""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+from itertools import islice
+
+import mailerlite.client as client
+from mailerlite.api import MailerLiteApi
+from mailerlite.concurrency import map_concurrent, resolve_workers, \
+    AdaptiveLimiter
+
+FORMATS = ('csv', 'ndjson', 'parquet')
+IMPORT_FORMATS = ('csv', 'ndjson')
+# top level keys of an imported subscriber, other fields go in 'fields'
+SUBSCRIBER_KEYS = ('email', 'name')
+
+
+def _segments(api, limit=100, offset=0, as_json=True):
+    """List segments as JSON, without their meta."""
+    data, _ = api.segments.all(limit=limit, offset=offset, as_json=True)
+    return data
+
+
+# endpoint -> (listing method of an api, options of the listing)
+ENDPOINTS = {
+    'subscribers': (lambda api: api.subscribers.all, ('stype',)),
+    'group-subscribers': (lambda api: api.groups.subscribers,
+                          ('group_id', 'stype')),
+    'groups': (lambda api: api.groups.all, ()),
+    'campaigns': (lambda api: api.campaigns.all, ('status',)),
+    'segments': (lambda api: lambda **kw: _segments(api, **kw), ()),
+}
+
+
+def _cell(value):
+    """Return a CSV cell, nested values are written as JSON."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _text(value):
+    """Return a Parquet cell, every column is a nullable string."""
+    return None if value is None else str(_cell(value))
+
+
+def _columns_of(rows):
+    """Return the keys of rows, in order of first appearance."""
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def _check_columns(rows, columns):
+    """Raise if rows have keys which are not columns of the file."""
+    known = set(columns)
+    extra = [c for c in _columns_of(rows) if c not in known]
+    if extra:
+        raise ValueError('Columns {} are not in the header written from the'
+                         ' first page, give the columns of the export'
+                         .format(', '.join(map(str, extra))))
+
+
+class _TextWriter:
+
+    def __init__(self, path, fmt, size=None, columns=None):
+        self.fmt = fmt
+        self.columns = list(columns) if columns is not None else None
+        # a resumed file already has its header
+        self._header = size is None or columns is None
+        if size is not None and (not os.path.exists(path) or
+                                 os.path.getsize(path) < size):
+            raise ValueError('{} is missing or shorter than its checkpoint,'
+                             ' remove the checkpoint to start over'
+                             .format(path))
+        self._file = open(path, 'a' if size is not None else 'w',
+                          encoding='utf-8', newline='')
+        if size is not None:
+            # drop the rows written after the last checkpoint
+            self._file.truncate(size)
+        self._csv = None
+
+    def write(self, rows):
+        if self.fmt == 'ndjson':
+            self._file.writelines(json.dumps(row) + '\n' for row in rows)
+            return
+        if self._csv is None:
+            if self.columns is None:
+                if not rows:
+                    return
+                # keys of every row of the first page
+                self.columns = _columns_of(rows)
+            self._csv = csv.DictWriter(self._file, self.columns)
+            if self._header:
+                self._csv.writeheader()
+        _check_columns(rows, self.columns)
+        self._csv.writerows({k: _cell(v) for k, v in row.items()}
+                            for row in rows)
+
+    def tell(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+
+    def __init__(self, path, columns=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet export needs pyarrow: '
+                              'pip install pyarrow')
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.columns = list(columns) if columns is not None else None
+        self._writer = None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self._writer is None:
+            if self.columns is None:
+                self.columns = _columns_of(rows)
+            # explicit schema: a column with only nulls on the first page
+            # must not be typed null
+            schema = self._pa.schema([(c, self._pa.string())
+                                      for c in self.columns])
+            self._writer = self._pq.ParquetWriter(self.path, schema)
+        _check_columns(rows, self.columns)
+        table = self._pa.table({c: [_text(row.get(c)) for row in rows]
+                                for c in self.columns},
+                               schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def tell(self):
+        return None
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _load_checkpoint(checkpoint):
+    if not checkpoint or not os.path.exists(checkpoint):
+        return None
+    with open(checkpoint) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(checkpoint, state):
+    tmp = checkpoint + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint)
+
+
+def export(fetch, path, fmt='ndjson', page_size=1000,
+           max_workers=None, checkpoint=None, progress=None, columns=None,
+           **kwargs):
+    """Stream every record of a listing to a file.
+
+    Pages are fetched ``max_workers`` at a time and written in order as soon
+    as they arrive, so at most ``max_workers`` pages are held in memory.
+
+    Parameters
+    ----------
+    fetch : callable
+        listing method accepting ``limit``, ``offset`` and ``as_json``,
+        e.g. ``api.subscribers.all``
+    path : str
+        output file
+    fmt : str
+        csv, ndjson (default) or parquet (needs pyarrow)
+    page_size : int
+        number of records requested per page (default 1000)
+    max_workers : int, optional
+        maximum number of pages fetched at once, default 8 or the
+        adaptive limiter maximum, see :func:`resolve_workers`
+    checkpoint : str, optional
+        file recording the progress after each round of pages. If it exists,
+        the export resumes from it; it is removed once the export is done.
+        Not supported with parquet.
+    progress : callable, optional
+        called with the number of records written so far
+    columns : list of str, optional
+        columns of csv and parquet exports, the keys of the records of the
+        first page by default. A record with another key raises ValueError.
+        Parquet columns are nullable strings, nested values are JSON.
+    kwargs : dict
+        other arguments given to fetch
+
+    Returns
+    -------
+    rows : int
+        number of records written, including the ones of a resumed export
+
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Incorrect format, should be one of {}'
+                         .format(FORMATS))
+    if fmt == 'parquet' and checkpoint:
+        raise ValueError('Parquet exports can not be resumed, use csv or'
+                         ' ndjson with a checkpoint')
+    state = _load_checkpoint(checkpoint) or {'offset': 0, 'rows': 0}
+    if fmt == 'parquet':
+        writer = _ParquetWriter(path, columns=columns)
+    elif 'size' in state:
+        writer = _TextWriter(path, fmt, size=state['size'],
+                             columns=state.get('columns'))
+    else:
+        writer = _TextWriter(path, fmt, columns=columns)
+
+    def fetch_page(offset):
+        return fetch(limit=page_size, offset=offset, as_json=True,
+                     **kwargs) or []
+
+    max_workers = resolve_workers(max_workers)
+    offset, rows = state['offset'], state['rows']
+    try:
+        done = False
+        while not done:
+            offsets = [offset + i * page_size for i in range(max_workers)]
+            for page in map_concurrent(fetch_page, offsets,
+                                       max_workers=max_workers):
+                writer.write(page)
+                rows += len(page)
+                offset += len(page)
+                if len(page) < page_size:
+                    done = True
+                    break
+            if progress is not None:
+                progress(rows)
+            if checkpoint and not done:
+                _save_checkpoint(checkpoint, {
+                    'offset': offset, 'rows': rows, 'size': writer.tell(),
+                    'columns': writer.columns})
+    finally:
+        writer.close()
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return rows
+
+
+def read_records(path, fmt=None):
+    """Yield the records of a CSV or NDJSON file, one dict at a time.
+
+    Parameters
+    ----------
+    path : str
+        input file
+    fmt : str, optional
+        csv or ndjson, guessed from the file extension by default
+
+    """
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError('Incorrect format, should be one of {}'
+                         .format(IMPORT_FORMATS))
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def resolve_columns(columns, fields, mapping=None, skip_unknown=False):
+    """Map the columns of a file to subscriber fields.
+
+    A column maps to the field given in mapping, else to the field whose key
+    or title is the column name (case insensitive).
+
+    Parameters
+    ----------
+    columns : list of str
+        column names of the file
+    fields : list of :class:`Field`
+        fields of the account, from :meth:`Fields.all`
+    mapping : dict, optional
+        column -> field key
+    skip_unknown : bool
+        ignore the columns without field instead of raising (default False)
+
+    Returns
+    -------
+    resolved : dict
+        column -> field key
+
+    """
+    mapping = mapping or {}
+    keys = {f.key for f in fields}
+    by_name = {}
+    for f in fields:
+        by_name.setdefault(f.key.lower(), f.key)
+        if f.title:
+            by_name.setdefault(f.title.lower(), f.key)
+
+    resolved, unknown = {}, []
+    for column in columns:
+        key = mapping.get(column) or by_name.get(column.strip().lower())
+        if key is None or key not in keys:
+            unknown.append(column)
+        else:
+            resolved[column] = key
+    missing = [c for c in mapping if c not in columns]
+    if missing:
+        raise ValueError('Mapped columns not found in the file: {}'
+                         .format(', '.join(missing)))
+    if unknown and not skip_unknown:
+        raise ValueError('No field for the columns: {}. Map them or skip'
+                         ' them'.format(', '.join(unknown)))
+    if 'email' not in resolved.values():
+        raise ValueError('No column mapped to the email field')
+    return resolved
+
+
+def _subscriber(record, columns):
+    """Return the import payload of a record, None without email."""
+    subscriber = {'name': '', 'fields': {}}
+    for column, key in columns.items():
+        value = record.get(column)
+        if key in SUBSCRIBER_KEYS:
+            subscriber[key] = (value or '').strip()
+        elif value not in (None, ''):
+            subscriber['fields'][key] = value
+    return subscriber if subscriber.get('email') else None
+
+
+def _record_columns(path, fmt=None):
+    """Return the columns of a file: the CSV header, or every key of the
+    NDJSON records, in order of first appearance."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    if fmt == 'csv':
+        with open(path, encoding='utf-8', newline='') as f:
+            return csv.DictReader(f).fieldnames or []
+    columns = {}
+    for record in read_records(path, fmt):
+        columns.update(dict.fromkeys(record))
+    return list(columns)
+
+
+def _journal_source(path, chunk_size):
+    """Return what identifies an import: the file and the chunk size."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size,
+            'mtime': stat.st_mtime, 'chunk_size': chunk_size}
+
+
+def _load_journal(journal, source):
+    """Return the chunks already imported, checking the journal is the one
+    of the same file and chunk size."""
+    if not journal or not os.path.exists(journal):
+        return set()
+    done, header = set(), None
+    with open(journal) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # line cut by a crash
+            if 'source' in entry:
+                header = entry['source']
+            elif 'chunk' in entry:
+                done.add(entry['chunk'])
+    if done and header != source:
+        raise ValueError('The journal {} was written for another file or'
+                         ' chunk size, remove it to start over'
+                         .format(journal))
+    return done
+
+
+def import_file(api, group_id, path, fmt=None, mapping=None,
+                skip_unknown=False, chunk_size=500,
+                max_workers=None, journal=None,
+                resubscribe=False, autoresponders=False, progress=None):
+    """Stream a CSV or NDJSON file into a group.
+
+    Columns are mapped to subscriber fields with :func:`resolve_columns`.
+    Records are sent by chunks with :meth:`Groups.add_subscribers`, up to
+    ``max_workers`` chunks at once, so at most ``max_workers`` chunks are
+    held in memory. Every acknowledged chunk is appended to the journal: an
+    interrupted import started again with the same file and journal skips
+    them. The journal records the file (path, size, modification time) and
+    the chunk size, resuming with another file or chunk size is refused.
+    The columns of an NDJSON file are the keys of all its records.
+
+    Parameters
+    ----------
+    api : :class:`mailerlite.MailerLiteApi`
+        api of the account
+    group_id : int
+        group to import the subscribers into
+    path : str
+        input file
+    fmt : str, optional
+        csv or ndjson, guessed from the file extension by default
+    mapping : dict, optional
+        column -> field key
+    skip_unknown : bool
+        ignore the columns without field (default False)
+    chunk_size : int
+        number of subscribers per request (default 500)
+    max_workers : int, optional
+        maximum number of chunks uploaded at once, default 8 or the
+        adaptive limiter maximum, see :func:`resolve_workers`
+    journal : str, optional
+        progress journal, one line per acknowledged chunk
+    resubscribe : bool
+        reactivate unsubscribed subscribers (default False)
+    autoresponders : bool
+        send the autoresponders (default False)
+    progress : callable, optional
+        called with the number of records sent so far
+
+    Returns
+    -------
+    sent : int
+        number of subscribers sent by this run
+    invalid : int
+        number of records skipped because they have no email
+
+    """
+    source = _journal_source(path, chunk_size)
+    done = _load_journal(journal, source)
+    file_columns = _record_columns(path, fmt)
+    if not file_columns:
+        return 0, 0
+    fields = api.fields.all()
+    columns = resolve_columns(file_columns, fields, mapping=mapping,
+                              skip_unknown=skip_unknown)
+
+    def chunks():
+        stream = read_records(path, fmt)
+        number = 0
+        while True:
+            chunk = list(islice(stream, chunk_size))
+            if not chunk:
+                return
+            yield number, chunk
+            number += 1
+
+    log = open(journal, 'a') if journal else None
+    if log is not None and not done:
+        log.write(json.dumps({'source': source}) + '\n')
+        log.flush()
+    lock = threading.Lock()
+    counts = {'sent': 0, 'invalid': 0}
+
+    def upload(item):
+        number, chunk = item
+        subscribers = [_subscriber(record, columns) for record in chunk]
+        valid = [s for s in subscribers if s is not None]
+        if valid:
+            api.groups.add_subscribers(group_id, valid,
+                                       resubscribe=resubscribe,
+                                       autoresponders=autoresponders,
+                                       as_json=True)
+        with lock:
+            counts['sent'] += len(valid)
+            counts['invalid'] += len(subscribers) - len(valid)
+            if log is not None:
+                log.write(json.dumps({'chunk': number, 'rows': len(valid)})
+                          + '\n')
+                log.flush()
+                os.fsync(log.fileno())
+
+    max_workers = resolve_workers(max_workers)
+    try:
+        pending = (item for item in chunks() if item[0] not in done)
+        while True:
+            wave = list(islice(pending, max_workers))
+            if not wave:
+                break
+            map_concurrent(upload, wave, max_workers=max_workers)
+            if progress is not None:
+                progress(counts['sent'])
+    finally:
+        if log is not None:
+            log.close()
+    return counts['sent'], counts['invalid']
+
+
+def _progress(rows):
+    sys.stderr.write('\rexported {} records'.format(rows))
+    sys.stderr.flush()
+
+
+def _import_progress(rows):
+    sys.stderr.write('\rimported {} records'.format(rows))
+    sys.stderr.flush()
+
+
+def _export_command(args):
+    method, options = ENDPOINTS[args.endpoint]
+    kwargs = {name: getattr(args, name) for name in options
+              if getattr(args, name) is not None}
+    if args.endpoint == 'group-subscribers' and 'group_id' not in kwargs:
+        raise SystemExit('--group-id is required for group-subscribers')
+    fetch = method(MailerLiteApi(args.api_key))
+    columns = args.columns.split(',') if args.columns else None
+    rows = export(fetch, args.output, fmt=args.format,
+                  page_size=args.page_size, max_workers=args.workers,
+                  checkpoint=args.checkpoint, columns=columns,
+                  progress=None if args.quiet else _progress, **kwargs)
+    if not args.quiet:
+        sys.stderr.write('\rexported {} records to {}\n'
+                         .format(rows, args.output))
+    return 0
+
+
+def _import_command(args):
+    mapping = {}
+    for item in args.map or []:
+        column, sep, key = item.partition('=')
+        if not sep:
+            raise SystemExit('--map should be column=field, got {}'
+                             .format(item))
+        mapping[column] = key
+    sent, invalid = import_file(
+        MailerLiteApi(args.api_key), args.group_id, args.input,
+        fmt=args.format, mapping=mapping, skip_unknown=args.skip_unknown,
+        chunk_size=args.chunk_size, max_workers=args.workers,
+        journal=args.journal, resubscribe=args.resubscribe,
+        autoresponders=args.autoresponders,
+        progress=None if args.quiet else _import_progress)
+    if not args.quiet:
+        sys.stderr.write('\rimported {} records into group {}, {} without'
+                         ' email skipped\n'.format(sent, args.group_id,
+                                                   invalid))
+    return 0
+
+
+def build_parser():
+    """Return the parser of the ``mailerlite`` command."""
+    parser = argparse.ArgumentParser(prog='mailerlite',
+                                     description='MailerLite command line')
+    parser.add_argument('--api-key', default=None,
+                        help='api key, default MAILERLITE_PYTHON_API_KEY')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='adapt the number of concurrent requests to the'
+                             ' latency and the 429 responses')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    exporter = commands.add_parser('export', help='export a listing')
+    exporter.add_argument('endpoint', choices=sorted(ENDPOINTS))
+    exporter.add_argument('-o', '--output', required=True,
+                          help='output file')
+    exporter.add_argument('-f', '--format', choices=FORMATS,
+                          default='ndjson')
+    exporter.add_argument('--page-size', type=int, default=1000)
+    exporter.add_argument('--workers', type=int, default=None,
+                          help='pages fetched at once (default 8, 32 with'
+                               ' --adaptive)')
+    exporter.add_argument('--checkpoint', default=None,
+                          help='resume from (and save progress to) this'
+                               ' file')
+    exporter.add_argument('--columns', default=None,
+                          help='comma separated columns of csv and parquet'
+                               ' exports (default: keys of the first page)')
+    exporter.add_argument('--type', dest='stype', default=None,
+                          help='subscriber type (active, unsubscribed, ...)')
+    exporter.add_argument('--group-id', type=int, default=None)
+    exporter.add_argument('--status', default=None,
+                          help='campaign status (sent, draft, outbox)')
+    exporter.add_argument('-q', '--quiet', action='store_true',
+                          help='do not report progress')
+    exporter.set_defaults(func=_export_command)
+
+    importer = commands.add_parser('import',
+                                   help='import a file into a group')
+    importer.add_argument('input', help='CSV or NDJSON file')
+    importer.add_argument('--group-id', type=int, required=True)
+    importer.add_argument('-f', '--format', choices=IMPORT_FORMATS,
+                          default=None, help='default from the extension')
+    importer.add_argument('--map', action='append', metavar='COLUMN=FIELD',
+                          help='map a column to a field key')
+    importer.add_argument('--skip-unknown', action='store_true',
+                          help='ignore the columns without field')
+    importer.add_argument('--chunk-size', type=int, default=500)
+    importer.add_argument('--workers', type=int, default=None,
+                          help='chunks uploaded at once (default 8, 32 with'
+                               ' --adaptive)')
+    importer.add_argument('--journal', default=None,
+                          help='resume from (and record progress to) this'
+                               ' file')
+    importer.add_argument('--resubscribe', action='store_true')
+    importer.add_argument('--autoresponders', action='store_true')
+    importer.add_argument('-q', '--quiet', action='store_true',
+                          help='do not report progress')
+    importer.set_defaults(func=_import_command)
+    return parser
+
+
+def main(argv=None):
+    """Run the ``mailerlite`` command."""
+    args = build_parser().parse_args(argv)
+    if not args.adaptive:
+        return args.func(args)
+    previous = client.set_adaptive_limiter(AdaptiveLimiter())
+    try:
+        return args.func(args)
+    finally:
+        client.set_adaptive_limiter(previous)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,293 @@
 """Utility function for calling the API."""
 
-import requests
-from urllib.parse import urlencode, urljoin
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlencode, urljoin, urlsplit
 
-from mailerlite.constants import MAILERLITE_API_V2_URL, VALID_REQUEST_METHODS
+from mailerlite.constants import MAILERLITE_API_V2_URL, \
+    VALID_REQUEST_METHODS, Response
+from mailerlite.exceptions import error_from_response
+
+_circuit_breaker = None
+_single_flight = None
+_response_cache = None
+_compression = None
+_adaptive_limiter = None
+_response_listeners = []
+_local = threading.local()
+
+
+def set_circuit_breaker(breaker):
+    """Install the circuit breaker guarding every request.
+
+    Parameters
+    ----------
+    breaker : :class:`mailerlite.circuit.CircuitBreaker` or None
+        shared breaker, None to disable it
+
+    Returns
+    -------
+    previous : :class:`mailerlite.circuit.CircuitBreaker` or None
+        the breaker installed before
+
+    """
+    global _circuit_breaker
+    previous, _circuit_breaker = _circuit_breaker, breaker
+    return previous
+
+
+def get_circuit_breaker():
+    """Return the installed circuit breaker or None."""
+    return _circuit_breaker
+
+
+def set_single_flight(enabled=True):
+    """Share a single round-trip between identical in-flight GET requests.
+
+    Concurrent GET requests on the same url with the same headers wait for
+    the first one and get the same (read-only) result.
+
+    Parameters
+    ----------
+    enabled : bool or :class:`mailerlite.singleflight.SingleFlight`
+        True to enable it, False to disable it, or the group to use
+
+    Returns
+    -------
+    group : :class:`mailerlite.singleflight.SingleFlight` or None
+        the group now in use
+
+    """
+    global _single_flight
+    if enabled is True:
+        from mailerlite.singleflight import SingleFlight
+        enabled = SingleFlight()
+    _single_flight = enabled or None
+    return _single_flight
+
+
+def get_single_flight():
+    """Return the single-flight group in use or None."""
+    return _single_flight
+
+
+def set_response_cache(cache):
+    """Install the cache used for GET requests.
+
+    Parameters
+    ----------
+    cache : :class:`mailerlite.cache.ResponseCache` or None
+        shared cache, None to disable it
+
+    Returns
+    -------
+    previous : :class:`mailerlite.cache.ResponseCache` or None
+        the cache installed before
+
+    """
+    global _response_cache
+    previous, _response_cache = _response_cache, cache
+    return previous
+
+
+def get_response_cache():
+    """Return the installed response cache or None."""
+    return _response_cache
+
+
+def set_compression(compression):
+    """Install the compression settings used for every request.
+
+    Parameters
+    ----------
+    compression : :class:`mailerlite.compression.Compression` or None
+        shared settings and measures, None to disable it
+
+    Returns
+    -------
+    previous : :class:`mailerlite.compression.Compression` or None
+        the settings installed before
+
+    """
+    global _compression
+    previous, _compression = _compression, compression
+    return previous
+
+
+def get_compression():
+    """Return the installed compression settings or None."""
+    return _compression
+
+
+def endpoint_key(method, url):
+    """Return the endpoint of a request: its method and path template.
+
+    The query is dropped and the path segments holding an id or an email
+    are replaced by ``{id}``, e.g. ``GET /api/v2/groups/{id}/subscribers``.
+
+    """
+    path = urlsplit(url).path
+    segments = ['{id}' if segment.isdigit() or '@' in segment else segment
+                for segment in path.split('/')]
+    return '{} {}'.format(method.upper(), '/'.join(segments))
+
+
+def set_adaptive_limiter(limiter):
+    """Install the adaptive limiter gating every request.
+
+    Parameters
+    ----------
+    limiter : :class:`mailerlite.concurrency.AdaptiveLimiter` or None
+        shared limiter, None to disable it
+
+    Returns
+    -------
+    previous : :class:`mailerlite.concurrency.AdaptiveLimiter` or None
+        the limiter installed before
+
+    """
+    global _adaptive_limiter
+    previous, _adaptive_limiter = _adaptive_limiter, limiter
+    return previous
+
+
+def get_adaptive_limiter():
+    """Return the installed adaptive limiter or None."""
+    return _adaptive_limiter
+
+
+def add_response_listener(listener):
+    """Call listener with the :class:`Response` of every request.
+
+    Listeners run in the thread of the request, e.g. to feed metrics or an
+    adaptive concurrency limit with the live status, rate-limit and timing.
+
+    Parameters
+    ----------
+    listener : callable
+        called with a :class:`Response`
+
+    """
+    _response_listeners.append(listener)
+
+
+def remove_response_listener(listener):
+    """Stop calling a listener added with :func:`add_response_listener`."""
+    _response_listeners.remove(listener)
+
+
+def last_response():
+    """Return the :class:`Response` of the last request of this thread."""
+    return getattr(_local, 'response', None)
+
+
+def with_response(func, *args, **kwargs):
+    """Call a resource method and return its result and its response.
+
+    Parameters
+    ----------
+    func : callable
+        e.g. ``api.subscribers.get``
+    args, kwargs
+        arguments given to func
+
+    Returns
+    -------
+    result : object
+        what func returns
+    response : :class:`Response` or None
+        envelope of the last request made by func, None if it made none.
+        When func raises, :func:`last_response` still returns it.
+
+    Examples
+    --------
+    >>> subscriber, response = with_response(api.subscribers.get,
+    ...                                      email='demo@mailerlite.com')
+    >>> response.rate_limit_remaining, response.elapsed
+
+    """
+    _local.response = None
+    result = func(*args, **kwargs)
+    return result, last_response()
+
+
+def _header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+def _envelope(response, url, method, body, elapsed):
+    """Return the :class:`Response` of a :class:`requests.Response`."""
+    headers = response.headers
+    size = _header_int(headers, 'Content-Length')
+    return Response(status=response.status_code, body=body,
+                    headers=headers,
+                    rate_limit_remaining=_header_int(
+                        headers, 'X-RateLimit-Remaining'),
+                    rate_limit_reset=_header_int(headers,
+                                                 'X-RateLimit-Reset'),
+                    request_id=headers.get('X-Request-Id'),
+                    elapsed=elapsed,
+                    bytes=len(response.content) if size is None else size,
+                    url=url, method=method, cached=False)
+
+
+def _record(envelope):
+    _local.response = envelope
+    for listener in list(_response_listeners):
+        listener(envelope)
+
+
+def absolute_url(url):
+    """Return the absolute url of an endpoint path.
+
+    Paths built by :func:`build_url` or :class:`UrlTemplate` are simply
+    appended to the base url, other urls go through ``urljoin``.
+
+    """
+    if url.startswith(('https://', 'http://')):
+        return url
+    if url.startswith(('/', '.')):
+        return urljoin(MAILERLITE_API_V2_URL, url)
+    return MAILERLITE_API_V2_URL + url
+
+
+def request_key(url, headers=None):
+    """Return the key identifying a GET request on an account."""
+    return (absolute_url(url), frozenset((headers or {}).items()))
+
+
+def decode(url, res_json, decoder, headers=None):
+    """Build records from a JSON body, reusing cached ones if possible.
+
+    When a response cache is installed and ``res_json`` is the body it
+    stores for this request (e.g. after a ``304 Not Modified``), the
+    records decoded the previous time are returned without decoding again.
+
+    Parameters
+    ----------
+    url : str
+        The url for the endpoint including path parameters
+    res_json : object
+        JSON body returned by :func:`get`
+    decoder : callable
+        build the records from res_json
+    headers : dict, optional
+        headers used for the request
+
+    Returns
+    -------
+    records : object
+        the decoded records
+
+    """
+    cache = _response_cache
+    if cache is None:
+        return decoder(res_json)
+    return cache.decode(request_key(url, headers), res_json, decoder)
 
 
 def check_headers(headers):
@@ -46,12 +330,34 @@ def check_headers(headers):
         _, _ = get(url, headers=headers)
     except OSError as e_res:
         valid_headers = False
-        error_msg = e_res.args[0].content or \
+        reason = e_res.args[0] if e_res.args else None
+        error_msg = getattr(reason, 'content', None) or \
             "Something Wrong happens with the API headers"
 
     return valid_headers, error_msg
 
 
+@lru_cache(maxsize=1024)
+def _encode_query(items):
+    return urlencode([(k, v) for k, v, _ in items])
+
+
+def encode_query(queryparams):
+    """Return the encoded query string of a dict of parameters.
+
+    Encodings are cached: listing methods send the same few parameter sets
+    (limit, offset, type, ...) over and over. Value types are part of the
+    cache key since ``1``, ``1.0`` and ``True`` are equal but encoded
+    differently.
+
+    """
+    try:
+        return _encode_query(tuple((k, v, type(v))
+                                   for k, v in queryparams.items()))
+    except TypeError:  # unhashable value
+        return urlencode(queryparams)
+
+
 def build_url(*path, **queryparams):
     """Build path with endpoint and args.
 
@@ -67,10 +373,39 @@ def build_url(*path, **queryparams):
     """
     url = '/'.join(map(str, path))
     if queryparams:
-        url += '?{}'.format(urlencode(queryparams))
+        url += '?' + encode_query(queryparams)
     return url
 
 
+class UrlTemplate:
+
+    def __init__(self, *path):
+        """Initialize a UrlTemplate object.
+
+        Precompiled path of an endpoint, ``'{}'`` parts are the path
+        parameters. ``UrlTemplate('groups', '{}', 'subscribers')(12,
+        limit=10)`` returns the same path as ``build_url('groups', 12,
+        'subscribers', limit=10)`` with a single format call.
+
+        Parameters
+        ----------
+        path : str
+            parts of the path
+
+        """
+        self.path = '/'.join(path)
+        self._format = self.path.format
+
+    def __call__(self, *args, **queryparams):
+        url = self._format(*args) if args else self.path
+        if queryparams:
+            url += '?' + encode_query(queryparams)
+        return url
+
+    def __repr__(self):
+        return 'UrlTemplate({!r})'.format(self.path)
+
+
 def make_request(url, method, headers=None, data=None,
                  timeout=None, hooks=None):
     """Make the request to the API.
@@ -93,34 +428,143 @@ def make_request(url, method, headers=None, data=None,
         response value
     content : dict
         The JSON output from the API
+
+    The full :class:`Response` (headers, rate-limit, timing, bytes) is
+    available with :func:`last_response` and :func:`with_response`.
+
+    Raises
+    ------
+    MailerLiteError
+        on error responses, a subclass per status (NotFound, RateLimited,
+        ValidationError, ServerError, ...), see :mod:`mailerlite.exceptions`
+    CircuitOpenError
+        if a circuit breaker is installed and currently rejects calls
+
+    Notes
+    -----
+    When single-flight is enabled (see :func:`set_single_flight`),
+    concurrent identical GET requests share the same response. When a
+    response cache is installed (see :func:`set_response_cache`), GET
+    requests are revalidated with ``If-None-Match``/``If-Modified-Since``
+    and a ``304 Not Modified`` returns the cached body. When compression is
+    installed (see :func:`set_compression`), large bodies sent to bulk
+    endpoints are gzipped and the bytes exchanged are measured.
     """
     if method not in VALID_REQUEST_METHODS:
         raise ValueError("Incorrect request method. method should be "
                          "{}".format(VALID_REQUEST_METHODS))
 
-    url = urljoin(MAILERLITE_API_V2_URL, url)
+    url = absolute_url(url)
+    flight = _single_flight
+    if method == 'GET' and flight is not None:
+        result, envelope = flight.do(request_key(url, headers),
+                                     _send_request, url, method, headers,
+                                     data, timeout, hooks)
+        _local.response = envelope
+        return result
+    result, _ = _send_request(url, method, headers, data, timeout, hooks)
+    return result
+
+
+def _send_request(url, method, headers, data, timeout, hooks):
+    """Send a single request to the API, see :func:`make_request`.
+
+    Returns the result of make_request and the :class:`Response`.
+
+    """
+    # imported on the first request, not with the package
+    import requests
+
+    cache, entry = _response_cache, None
+    if method == 'GET' and cache is not None:
+        key = request_key(url, headers)
+        entry, fresh = cache.lookup(key)
+        if fresh:
+            envelope = Response(status=entry.status, body=entry.body,
+                                headers={}, elapsed=0., bytes=0, url=url,
+                                method=method, cached=True)
+            _record(envelope)
+            return (entry.status, entry.body), envelope
+        if entry is not None:
+            headers = {**(headers or {}),
+                       **cache.conditional_headers(entry)}
+
     hooks = hooks or requests.hooks.default_hooks()
     headers = headers or requests.utils.default_headers()
+    body = dict(json=data)
+    compression = _compression
+    if compression is not None:
+        headers = {**headers,
+                   'Accept-Encoding': compression.accept_encoding}
+        if data is not None:
+            content, extra_headers = compression.encode(url, data)
+            body = dict(data=content)
+            headers = {**extra_headers, **headers}
+
+    # wait for the limiter before taking a half-open trial slot, both are
+    # given back whatever happens
+    breaker = _circuit_breaker
+    limiter = _adaptive_limiter
+    acquired, token = False, None
     try:
+        if limiter is not None:
+            limiter.acquire()
+            acquired = True
+        if breaker is not None:
+            token = breaker.before_request()
+        start = time.perf_counter()
         response = requests.request(**dict(method=method,
                                            url=url,
-                                           json=data,
                                            timeout=timeout,
                                            hooks=hooks,
-                                           headers=headers
+                                           headers=headers,
+                                           **body
                                            ))
     except requests.exceptions.RequestException as e:
+        if acquired:
+            limiter.release()
+            limiter.record()
+        if token is not None:
+            breaker.record_failure(token)
         raise e
+    except BaseException:
+        if acquired:
+            limiter.release()
+        if token is not None:
+            breaker.release(token)
+        raise
     else:
+        elapsed = time.perf_counter() - start
+        if limiter is not None:
+            limiter.release()
+            limiter.record(response.status_code, elapsed,
+                           endpoint_key(method, url))
+        if breaker is not None:
+            breaker.record_status(response.status_code, token)
+        if compression is not None:
+            compression.record_response(response)
+        if response.status_code == 304 and entry is not None:
+            cache.refresh(entry)
+            envelope = _envelope(response, url, method, entry.body, elapsed)
+            envelope = envelope._replace(cached=True)
+            _record(envelope)
+            return (entry.status, entry.body), envelope
+
         if response.status_code >= 400:
-            print(response.text)
-            raise IOError(response)
+            _record(_envelope(response, url, method, None, elapsed))
+            raise error_from_response(response)
 
         if response.status_code == 204:
-            return None
-        return response.status_code, response.json()
-
-    return response.status_code, response.json()
+            envelope = _envelope(response, url, method, None, elapsed)
+            _record(envelope)
+            return None, envelope
+        res_json = response.json()
+        envelope = _envelope(response, url, method, res_json, elapsed)
+        _record(envelope)
+        if method == 'GET' and cache is not None:
+            cache.store(key, response.status_code, res_json,
+                        response.headers)
+        return (response.status_code, res_json), envelope
 
 
 def post(url, body=None, **kwargs):
@@ -162,7 +606,7 @@ def get(url, params=None, **kwargs):
         The JSON output from the API
     """
     if params:
-        url += '?' + urlencode(params)
+        url += '?' + encode_query(params)
     return make_request(url=url, method='GET', **kwargs)
 
 
@@ -0,0 +1,141 @@
+"""Compression negotiation and compressed request bodies."""
+
+import gzip
+import json
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+COMPRESSIBLE_PATHS = ('batch', 'subscribers/import')
+
+
+class Compression:
+
+    def __init__(self, threshold=16384, paths=COMPRESSIBLE_PATHS, level=6,
+                 accept_encoding='gzip, deflate'):
+        """Initialize a Compression object.
+
+        Parameters
+        ----------
+        threshold : int
+            minimum size in bytes of a JSON body to gzip it (default 16384)
+        paths : tuple of str
+            endpoints accepting gzip request bodies, matched on the end of
+            the url path (default: batch and group imports). An empty tuple
+            only negotiates the response encoding.
+        level : int
+            gzip compression level, from 1 (fast) to 9 (small), default 6
+        accept_encoding : str
+            value of the ``Accept-Encoding`` header (default 'gzip, deflate')
+
+        """
+        self.threshold = threshold
+        self.paths = tuple(p.strip('/') for p in paths)
+        self.level = level
+        self.accept_encoding = accept_encoding
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.requests = 0
+        self.compressed_requests = 0
+        self.request_bytes = 0
+        self.request_bytes_sent = 0
+        self.responses = 0
+        self.response_bytes = 0
+        self.response_bytes_received = 0
+        self.encodings = Counter()
+
+    def should_compress(self, url, size):
+        """Return True if a body of this size sent to url is gzipped."""
+        if size < self.threshold:
+            return False
+        path = urlparse(url).path.rstrip('/')
+        return any(path.endswith(p) for p in self.paths)
+
+    def encode(self, url, data):
+        """Serialize a JSON body, gzipping it if worth it.
+
+        Parameters
+        ----------
+        url : str
+            full url of the request
+        data : object
+            JSON serializable body
+
+        Returns
+        -------
+        body : bytes
+            serialized (and maybe compressed) body
+        headers : dict
+            headers to add to the request
+
+        """
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        raw_size = len(body)
+        headers = {'Content-Type': 'application/json'}
+        if self.should_compress(url, raw_size):
+            body = gzip.compress(body, compresslevel=self.level)
+            headers['Content-Encoding'] = 'gzip'
+        with self._lock:
+            self.requests += 1
+            self.request_bytes += raw_size
+            self.request_bytes_sent += len(body)
+            if 'Content-Encoding' in headers:
+                self.compressed_requests += 1
+        return body, headers
+
+    def record_response(self, response):
+        """Measure the bytes received for a response.
+
+        Parameters
+        ----------
+        response : :class:`requests.Response`
+            a response whose content has been read
+
+        """
+        encoding = response.headers.get('Content-Encoding', 'identity')
+        decoded = len(response.content)
+        try:
+            received = response.raw.tell()
+        except (AttributeError, OSError, ValueError):
+            received = 0
+        if not received:
+            received = int(response.headers.get('Content-Length') or decoded)
+        with self._lock:
+            self.responses += 1
+            self.response_bytes += decoded
+            self.response_bytes_received += received
+            self.encodings[encoding.lower()] += 1
+
+    def stats(self):
+        """Return what has been measured so far.
+
+        Returns
+        -------
+        stats : dict
+            number of requests/responses, bytes before and after compression
+            in both directions, the ratios and the negotiated encodings
+
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'compressed_requests': self.compressed_requests,
+                'request_bytes': self.request_bytes,
+                'request_bytes_sent': self.request_bytes_sent,
+                'request_ratio': (self.request_bytes_sent /
+                                  self.request_bytes
+                                  if self.request_bytes else 1.0),
+                'responses': self.responses,
+                'response_bytes': self.response_bytes,
+                'response_bytes_received': self.response_bytes_received,
+                'response_ratio': (self.response_bytes_received /
+                                   self.response_bytes
+                                   if self.response_bytes else 1.0),
+                'encodings': dict(self.encodings)}
+
+    def reset(self):
+        """Reset the measures."""
+        with self._lock:
+            self._reset()
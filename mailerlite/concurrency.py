@@ -0,0 +1,257 @@
+"""Helpers to run many API calls concurrently."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import mailerlite.client as client
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def resolve_workers(max_workers=None):
+    """Return the number of threads to use for concurrent API calls.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        explicit number of threads. None uses the maximum of the adaptive
+        limiter installed with :func:`client.set_adaptive_limiter`, which
+        then decides how many calls actually run at once, or 8 without one.
+
+    """
+    if max_workers is not None:
+        return max_workers
+    limiter = client.get_adaptive_limiter()
+    return DEFAULT_MAX_WORKERS if limiter is None else limiter.max_limit
+
+
+def map_concurrent(func, items, max_workers=None):
+    """Call ``func`` on every item from a pool of threads.
+
+    Items are submitted as threads free up, at most twice ``max_workers``
+    at a time. On the first exception, the items not started yet are
+    cancelled and the exception is raised once the running calls end.
+
+    Parameters
+    ----------
+    func : callable
+        function called with each item
+    items : iterable
+        arguments to map
+    max_workers : int, optional
+        maximum number of concurrent calls, see :func:`resolve_workers`
+
+    Returns
+    -------
+    results : list
+        results in the same order as items. The first exception raised by
+        func is re-raised.
+
+    """
+    max_workers = resolve_workers(max_workers)
+    if max_workers <= 1:
+        return [func(item) for item in items]
+
+    results = []
+    pending = deque()
+
+    def collect():
+        running = [f for f in pending if not f.done()]
+        if running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    future.result()
+        while pending and pending[0].done():
+            results.append(pending.popleft().result())
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                while len(pending) >= 2 * max_workers:
+                    collect()
+            while pending:
+                collect()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    return results
+
+
+class RateLimiter:
+
+    def __init__(self, rate, burst=1, clock=time.monotonic,
+                 sleep=time.sleep):
+        """Initialize a RateLimiter object (token bucket).
+
+        Parameters
+        ----------
+        rate : float
+            number of calls allowed per second
+        burst : int
+            number of calls allowed at once after an idle period (default 1)
+        clock, sleep : callable, optional
+            time source and sleep function, mostly useful for testing
+
+        """
+        if rate <= 0:
+            raise ValueError('rate should be positive')
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = clock()
+
+    def acquire(self):
+        """Wait until a call is allowed."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens +
+                                   (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class AdaptiveLimiter:
+
+    def __init__(self, initial=4, min_limit=1, max_limit=32, backoff=0.5,
+                 tolerance=2., cooldown=1., clock=time.monotonic):
+        """Initialize an AdaptiveLimiter object (AIMD).
+
+        Limits the number of requests in flight. Each successful response
+        whose latency stays within ``tolerance`` times the baseline of its
+        endpoint (the lowest latency seen, slowly drifting up) raises the
+        limit by ``1 / limit``, i.e. by one per round of requests. Growing
+        latency lowers it the same way. A 304 carries no body and does not
+        count. A 429, a 5xx or a connection error
+        multiplies it by ``backoff``, at most once per ``cooldown`` seconds
+        so a burst of failures from the same round counts once.
+
+        Install it with :func:`client.set_adaptive_limiter` to gate every
+        request; bulk helpers called without max_workers then start
+        ``max_limit`` threads and let the limiter decide.
+
+        Parameters
+        ----------
+        initial : int
+            starting limit (default 4)
+        min_limit, max_limit : int
+            bounds of the limit (default 1 and 32)
+        backoff : float
+            multiplicative decrease on failures (default 0.5)
+        tolerance : float
+            latency increase, relative to the baseline, still considered
+            stable (default 2)
+        cooldown : float
+            seconds between two decreases (default 1)
+        clock : callable, optional
+            time source, mostly useful for testing
+
+        """
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError('Limits should verify 1 <= min_limit <= initial'
+                             ' <= max_limit')
+        if not 0 < backoff < 1:
+            raise ValueError('backoff should be between 0 and 1')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._limit = float(initial)
+        self._last_backoff = None
+        self.baselines = {}
+        self.in_flight = 0
+        self.backoffs = 0
+
+    @property
+    def limit(self):
+        """Current number of requests allowed at once."""
+        return int(self._limit)
+
+    def acquire(self):
+        """Wait until a request is allowed."""
+        with self._cond:
+            while self.in_flight >= int(self._limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        """Signal the end of a request started with :meth:`acquire`."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def baseline(self):
+        """Lowest baseline latency of the endpoints, None before any."""
+        with self._cond:
+            return min(self.baselines.values(), default=None)
+
+    def record(self, status=None, elapsed=None, endpoint=None):
+        """Adjust the limit with the outcome of a request.
+
+        Parameters
+        ----------
+        status : int, optional
+            HTTP status, None for a connection error or a timeout
+        elapsed : float, optional
+            latency of the request in seconds
+        endpoint : str, optional
+            endpoint of the request, see :func:`client.endpoint_key`; latencies
+            are only compared within the same endpoint
+
+        """
+        with self._cond:
+            previous = int(self._limit)
+            if status is None or status == 429 or status >= 500:
+                now = self._clock()
+                if self._last_backoff is None or \
+                   now - self._last_backoff >= self.cooldown:
+                    self._limit = max(self.min_limit,
+                                      self._limit * self.backoff)
+                    self._last_backoff = now
+                    self.backoffs += 1
+                return
+            if elapsed is None or status == 304:
+                return
+            baseline = self.baselines.get(endpoint)
+            if baseline is None or elapsed < baseline:
+                baseline = elapsed
+            else:
+                baseline += (elapsed - baseline) * 0.01
+            self.baselines[endpoint] = baseline
+            step = 1. / self._limit
+            if elapsed <= self.tolerance * baseline:
+                self._limit = min(self.max_limit, self._limit + step)
+            else:
+                self._limit = max(self.min_limit, self._limit - step)
+            if int(self._limit) > previous:
+                self._cond.notify_all()
+
+    def stats(self):
+        """Return the limit, the requests in flight and the baselines."""
+        with self._cond:
+            return {'limit': int(self._limit), 'in_flight': self.in_flight,
+                    'baselines': dict(self.baselines),
+                    'backoffs': self.backoffs}
@@ -8,6 +8,9 @@ API_KEY_TEST = "fc7b8c5b32067bcd47cafb5f475d2fe9"
 
 VALID_REQUEST_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
 
+ACTIVITY_TYPES = ['opens', 'clicks', 'junks', 'bounces', 'unsubscribes',
+                  'forwards', 'sendings']
+
 Field = namedtuple('Field', ['key', 'value', 'type', 'title', 'id',
                              'date_updated', 'date_created'])
 Group = namedtuple('Group', ["id", "name", "total", "active", "unsubscribed",
@@ -47,9 +50,29 @@ Campaign = namedtuple('Campaign', ['id', 'total_recipients', 'type',
                                    'opened', 'clicked'])
 Webhook = namedtuple('Webhook', ['id', 'event', 'url', 'created_at',
                                  'updated_at'])
+CampaignRollup = namedtuple('CampaignRollup', ['key', 'campaigns',
+                                               'recipients', 'opened',
+                                               'clicked', 'open_rate',
+                                               'click_rate'])
+PreflightReport = namedtuple('PreflightReport', ['received', 'sent',
+                                                 'duplicates', 'unchanged',
+                                                 'invalid', 'saved'])
+WebhookReport = namedtuple('WebhookReport', ['created', 'updated', 'deleted',
+                                             'unchanged', 'errors'])
+Response = namedtuple('Response', ['status', 'body', 'headers',
+                                   'rate_limit_remaining', 'rate_limit_reset',
+                                   'request_id', 'elapsed', 'bytes', 'url',
+                                   'method', 'cached'])
+WebhookEvent = namedtuple('WebhookEvent', ['type', 'timestamp', 'subscriber',
+                                           'group', 'data', 'account_id',
+                                           'webhook_id', 'id'])
+BulkItem = namedtuple('BulkItem', ['index', 'request', 'ok', 'status',
+                                   'body', 'code', 'message', 'retryable',
+                                   'retry_after'])
 
 for nt in [Subscriber, Field, Group, Activity, Segment, Meta, Pagination,
-           Campaign, Stats, Webhook]:
+           Campaign, Stats, Webhook, CampaignRollup, PreflightReport,
+           WebhookEvent, WebhookReport, Response, BulkItem]:
     nt.__new__.__defaults__ = (None,) * len(nt._fields)
 
 
@@ -0,0 +1,305 @@
+"""Apply webhook events to a local copy of the subscribers."""
+
+import heapq
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from mailerlite.constants import Field
+from mailerlite.index import SubscriberIndex, field_values
+
+# subscriber type set by an event, other events only update the profile
+EVENT_TYPES = {'subscriber.unsubscribe': 'unsubscribed',
+               'subscriber.bounced': 'bounced',
+               'subscriber.complaint': 'junk'}
+DELETE_EVENTS = ('subscriber.delete', 'subscriber.deleted',
+                 'subscriber.forget')
+GROUP_EVENTS = {'subscriber.add_to_group': True,
+                'subscriber.remove_from_group': False}
+
+logger = logging.getLogger(__name__)
+
+
+def event_time(timestamp):
+    """Return a unix time from the timestamp of an event, 0 if unknown."""
+    if timestamp is None:
+        return 0.
+    try:
+        return float(timestamp)
+    except (TypeError, ValueError):
+        pass
+    try:
+        date = datetime.strptime(str(timestamp), '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return 0.
+    return date.replace(tzinfo=timezone.utc).timestamp()
+
+
+def event_key(event):
+    """Return the key identifying an event for deduplication."""
+    if event.id is not None:
+        return event.id
+    subscriber = event.subscriber
+    return (event.type, event.timestamp,
+            getattr(subscriber, 'id', None),
+            getattr(subscriber, 'email', None),
+            getattr(event.group, 'id', None))
+
+
+def _merge(current, subscriber, stype=None):
+    """Return current updated with the known values of subscriber."""
+    changes = {k: v for k, v in subscriber._asdict().items()
+               if v is not None and k != 'fields'}
+    if stype is not None:
+        changes['type'] = stype
+    fields = field_values(current) if current is not None else {}
+    fields.update(field_values(subscriber))
+    changes['fields'] = [Field(key=k, value=v) for k, v in fields.items()]
+    if current is None:
+        return subscriber._replace(**changes)
+    return current._replace(**changes)
+
+
+class EventBuffer:
+
+    def __init__(self, index=None, memberships=None, delay=0,
+                 dedup_size=100000, retention=86400., clock=time.time):
+        """Initialize an EventBuffer object.
+
+        Webhook events are buffered, ordered by timestamp and applied to a
+        :class:`SubscriberIndex` and to a map subscriber id -> group ids.
+
+        * duplicated deliveries (same event id, or same type, timestamp,
+          subscriber and group) are dropped,
+        * events are applied in timestamp order; ``delay`` keeps them in the
+          buffer for a while so late deliveries are still put back in order,
+        * an event older than the last one applied to the same subscriber
+          (or to the same membership) is stale and skipped, so applying
+          events again or out of order never reverts the cache. The
+          timestamps are remembered for ``retention`` seconds of event
+          time, an older delivery is not detected.
+
+        With a ``delay``, buffered events are applied by :meth:`apply`:
+        call it periodically, or :meth:`start` a background thread doing
+        it, as :meth:`attach` does.
+
+        Parameters
+        ----------
+        index : :class:`SubscriberIndex`, optional
+            cache to update, a new empty one by default
+        memberships : :class:`MembershipIndex` or dict, optional
+            initial group memberships, subscriber id -> group ids
+        delay : float
+            seconds an event stays in the buffer before being applied
+            (default 0)
+        dedup_size : int
+            number of recent event keys remembered (default 100000)
+        retention : float
+            seconds the last timestamp of a subscriber is kept, before the
+            newest applied event, for stale detection (default 86400)
+        clock : callable
+            returns the current unix time
+
+        """
+        self.index = SubscriberIndex() if index is None else index
+        if memberships is not None and hasattr(memberships, 'as_dict'):
+            memberships = memberships.as_dict()
+        self.memberships = {sid: set(gids) for sid, gids in
+                            (memberships or {}).items()}
+        self.delay = delay
+        self.dedup_size = dedup_size
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._heap = []
+        self._seq = 0
+        self._seen = OrderedDict()
+        self._versions = {}
+        self._expiry = []
+        self._newest = float('-inf')
+        self.retention = retention
+        self._stop = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.duplicates = 0
+        self.stale = 0
+        self.applied = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, events):
+        """Buffer events, duplicates of recent events are dropped.
+
+        Parameters
+        ----------
+        events : list of :class:`WebhookEvent`
+
+        Returns
+        -------
+        count : int
+            number of events buffered
+
+        """
+        count = 0
+        with self._lock:
+            for event in events:
+                self.received += 1
+                key = event_key(event)
+                if key in self._seen:
+                    self._seen.move_to_end(key)
+                    self.duplicates += 1
+                    continue
+                self._seen[key] = True
+                if len(self._seen) > self.dedup_size:
+                    self._seen.popitem(last=False)
+                heapq.heappush(self._heap, (event_time(event.timestamp),
+                                            self._seq, event))
+                self._seq += 1
+                count += 1
+        return count
+
+    def apply(self, now=None):
+        """Apply the buffered events older than ``delay``, in order.
+
+        Returns
+        -------
+        count : int
+            number of events applied, stale ones excluded
+
+        """
+        deadline = (self.clock() if now is None else now) - self.delay
+        count = 0
+        with self._lock:
+            while self._heap and self._heap[0][0] <= deadline:
+                when, _, event = heapq.heappop(self._heap)
+                if self._apply(event, when):
+                    count += 1
+            self.applied += count
+            self._evict()
+        return count
+
+    def flush(self):
+        """Apply every buffered event, whatever its age."""
+        return self.apply(now=float('inf'))
+
+    def handle(self, event):
+        """Buffer and apply an event, handler of a WebhookReceiver."""
+        self.push([event])
+        self.apply()
+
+    def attach(self, receiver, interval=1.0):
+        """Feed this buffer with the events of a :class:`WebhookReceiver`.
+
+        With a ``delay``, the background thread applying the buffered
+        events is started, see :meth:`start`; :meth:`stop` it when done.
+
+        """
+        receiver.add_handler(self.handle)
+        if self.delay > 0:
+            self.start(interval)
+
+    def start(self, interval=1.0):
+        """Start a background thread applying the buffered events.
+
+        Parameters
+        ----------
+        interval : float
+            seconds between two calls to :meth:`apply` (default 1.0)
+
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.apply()
+                except Exception:  # keep the thread alive
+                    logger.exception('MailerLite event buffer apply failed')
+
+        self._thread = threading.Thread(target=run, daemon=True,
+                                        name='mailerlite-event-buffer')
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """Stop the background thread.
+
+        Parameters
+        ----------
+        flush : bool
+            apply every buffered event one last time (default True)
+
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def groups_of(self, subscriber_id):
+        """Return the group ids of a subscriber."""
+        with self._lock:
+            return sorted(self.memberships.get(subscriber_id, ()))
+
+    def _is_stale(self, key, when):
+        if when < self._versions.get(key, float('-inf')):
+            self.stale += 1
+            return True
+        self._set_version(key, when)
+        return False
+
+    def _set_version(self, key, when):
+        self._versions[key] = when
+        self._newest = max(self._newest, when)
+        heapq.heappush(self._expiry, (when, self._seq, key))
+        self._seq += 1
+
+    def _evict(self):
+        """Forget the timestamps older than the retention window."""
+        cutoff = self._newest - self.retention
+        while self._expiry and self._expiry[0][0] < cutoff:
+            when, _, key = heapq.heappop(self._expiry)
+            # a newer timestamp of the key has its own entry
+            if self._versions.get(key) == when:
+                del self._versions[key]
+
+    def _apply(self, event, when):
+        subscriber = event.subscriber
+        if subscriber is None:
+            return False
+        sid = subscriber.id
+        if sid is None and subscriber.email:
+            current = self.index.get(email=subscriber.email)
+            sid = current.id if current is not None else None
+        if sid is None:
+            return False
+        subscriber = subscriber._replace(id=sid)
+
+        if event.type in GROUP_EVENTS:
+            if event.group is None or \
+               self._is_stale((sid, event.group.id), when):
+                return False
+            groups = self.memberships.setdefault(sid, set())
+            if GROUP_EVENTS[event.type]:
+                groups.add(event.group.id)
+            else:
+                groups.discard(event.group.id)
+            # the payload also carries the current profile
+            if self._versions.get(sid, float('-inf')) <= when:
+                self._set_version(sid, when)
+                self.index.add(_merge(self.index.get(sid), subscriber))
+            return True
+
+        if self._is_stale(sid, when):
+            return False
+        if event.type in DELETE_EVENTS:
+            self.index.remove(sid)
+            self.memberships.pop(sid, None)
+            return True
+        self.index.add(_merge(self.index.get(sid), subscriber,
+                              EVENT_TYPES.get(event.type)))
+        return True
@@ -0,0 +1,144 @@
+"""Exceptions raised for the error responses of the API."""
+
+import time
+
+# a reset value above this is a unix time, not a number of seconds
+_EPOCH_THRESHOLD = 1e9
+
+
+def _seconds(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _reset_seconds(value):
+    """Return the seconds before a rate limit reset, from a delay or a date."""
+    seconds = _seconds(value)
+    if seconds is not None and seconds > _EPOCH_THRESHOLD:
+        seconds = max(0., seconds - time.time())
+    return seconds
+
+
+class MailerLiteError(IOError):
+    """Error response of the API.
+
+    ``args[0]`` is the :class:`requests.Response`, as with the ``IOError``
+    raised before, so existing ``except IOError`` blocks keep working.
+
+    Attributes
+    ----------
+    response : :class:`requests.Response` or None
+        the error response
+    status : int or None
+        HTTP status
+    body : object
+        parsed JSON body, None if it is not JSON
+    code : int or None
+        MailerLite error code, from the body
+    message : str
+        error message, from the body when there is one
+    retry_after : float or None
+        seconds to wait before retrying, from the ``Retry-After`` or
+        ``X-RateLimit-Reset`` headers; a reset given as a unix time is
+        turned into the seconds left until then
+    retryable : bool
+        True when the same request may succeed later
+
+    """
+
+    status = None
+    retryable = False
+
+    def __init__(self, response=None, message=None, retry_after=None):
+        super().__init__(response if response is not None else message)
+        self.response = response
+        self.body = None
+        self.code = None
+        self.retry_after = retry_after
+        if response is not None:
+            self.status = response.status_code
+            try:
+                self.body = response.json()
+            except ValueError:
+                pass
+            error = self.body.get('error') \
+                if isinstance(self.body, dict) else None
+            if isinstance(error, dict):
+                self.code = error.get('code')
+                message = message or error.get('message')
+            elif isinstance(self.body, dict):
+                message = message or self.body.get('message')
+            message = message or response.reason or response.text
+            if retry_after is None:
+                headers = response.headers
+                self.retry_after = _seconds(headers.get('Retry-After')) or \
+                    _reset_seconds(headers.get('X-RateLimit-Reset'))
+        self.message = message or ''
+
+    def __str__(self):
+        if self.status is None:
+            return self.message
+        return '{} {}: {}'.format(self.status, type(self).__name__,
+                                  self.message)
+
+
+class ClientError(MailerLiteError):
+    """4xx response: the request should be fixed before being sent again."""
+
+
+class BadRequest(ClientError):
+    """400 Bad Request."""
+
+
+class Unauthorized(ClientError):
+    """401 Unauthorized: missing or invalid api key."""
+
+
+class Forbidden(ClientError):
+    """403 Forbidden."""
+
+
+class NotFound(ClientError):
+    """404 Not Found."""
+
+
+class Conflict(ClientError):
+    """409 Conflict."""
+
+
+class ValidationError(ClientError):
+    """422 Unprocessable Entity: invalid fields in the request body."""
+
+
+class RateLimited(ClientError):
+    """429 Too Many Requests, retry after ``retry_after`` seconds."""
+
+    retryable = True
+
+
+class ServerError(MailerLiteError):
+    """5xx response, the request may succeed later."""
+
+    retryable = True
+
+
+ERRORS = {400: BadRequest, 401: Unauthorized, 403: Forbidden, 404: NotFound,
+          409: Conflict, 422: ValidationError, 429: RateLimited}
+
+
+def error_class(status):
+    """Return the exception class of an HTTP error status."""
+    if status in ERRORS:
+        return ERRORS[status]
+    if status >= 500:
+        return ServerError
+    if status >= 400:
+        return ClientError
+    return MailerLiteError
+
+
+def error_from_response(response):
+    """Return the exception matching an error response."""
+    return error_class(response.status_code)(response)
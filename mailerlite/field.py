@@ -5,8 +5,11 @@ from mailerlite.constants import Field
 
 
 class Fields:
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_FIELDS = client.UrlTemplate('fields')
+    URL_FIELD = client.UrlTemplate('fields', '{}')
 
-    def __init__(self, headers):
+    def __init__(self, headers, validate=True):
         """Initialize Fields object.
 
         Parameters
@@ -14,11 +17,15 @@ class Fields:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
 
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
 
@@ -38,14 +45,15 @@ class Fields:
             all desired Fields.
 
         """
-        url = client.build_url('fields')
+        url = self.URL_FIELDS()
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        all_fields = [Field(**res) for res in res_json]
-        return all_fields
+        return client.decode(url, res_json,
+                             lambda js: [Field(**res) for res in js],
+                             headers=self.headers)
 
     def get(self, field_id, as_json=False):
         """Get single field by ID from your account.
@@ -92,7 +100,7 @@ class Fields:
             deletion status
 
         """
-        url = client.build_url('fields', field_id)
+        url = self.URL_FIELD(field_id)
         return client.delete(url, headers=self.headers)
 
     def update(self, field_id, title, as_json=False):
@@ -113,7 +121,7 @@ class Fields:
             field object updated
 
         """
-        url = client.build_url('fields', field_id)
+        url = self.URL_FIELD(field_id)
         body = {"title": title}
         _, res_json = client.put(url, body=body, headers=self.headers)
 
@@ -144,6 +152,6 @@ class Fields:
         if field_type.upper() not in ['TEXT', 'NUMBER', 'DATE']:
             raise ValueError('Incorrect field_type. Available values'
                              ' are: TEXT , NUMBER, DATE')
-        url = client.build_url('fields')
+        url = self.URL_FIELDS()
         data = {'title': title, 'type': field_type.upper()}
         return client.post(url, body=data, headers=self.headers)
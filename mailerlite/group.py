@@ -1,12 +1,20 @@
 """Manage Groups."""
+import threading
 
 import mailerlite.client as client
 from mailerlite.constants import Subscriber, Group, Field
+from mailerlite.pagination import iter_records
 
 
 class Groups:
-
-    def __init__(self, headers):
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_GROUPS = client.UrlTemplate('groups')
+    URL_GROUP = client.UrlTemplate('groups', '{}')
+    URL_SUBSCRIBERS = client.UrlTemplate('groups', '{}', 'subscribers')
+    URL_SUBSCRIBER = client.UrlTemplate('groups', '{}', 'subscribers', '{}')
+    URL_IMPORT = client.UrlTemplate('groups', '{}', 'subscribers', 'import')
+
+    def __init__(self, headers, validate=True):
         """Initialize Groups object.
 
         Parameters
@@ -14,13 +22,20 @@ class Groups:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
 
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
+        # name -> Group, loaded by the first resolve
+        self._names = None
+        self._names_lock = threading.RLock()
 
     def all(self, limit=100, offset=0, gfilters='', as_json=False):
         """Get list of groups from your account.
@@ -46,14 +61,15 @@ class Groups:
 
         """
         params = {'limit': limit, 'offset': offset, 'filters': gfilters}
-        url = client.build_url('groups', **params)
+        url = self.URL_GROUPS(**params)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        all_groups = [Group(**res) for res in res_json]
-        return all_groups
+        return client.decode(url, res_json,
+                             lambda js: [Group(**res) for res in js],
+                             headers=self.headers)
 
     def get(self, group_id, as_json=False):
         """Get single group by ID from your account.
@@ -72,7 +88,7 @@ class Groups:
             a single group
 
         """
-        url = client.build_url('groups', group_id)
+        url = self.URL_GROUP(group_id)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
@@ -96,8 +112,10 @@ class Groups:
             deletion status
 
         """
-        url = client.build_url('groups', group_id)
-        return client.delete(url, headers=self.headers)
+        url = self.URL_GROUP(group_id)
+        success = client.delete(url, headers=self.headers)
+        self._forget(group_id)
+        return success
 
     def update(self, group_id, name, as_json=False):
         """Update existing group.
@@ -119,12 +137,15 @@ class Groups:
             group object
 
         """
-        url = client.build_url('groups', group_id)
+        url = self.URL_GROUP(group_id)
         body = {"name": name, }
         _, res_json = client.put(url, body=body, headers=self.headers)
+        self._forget(group_id)
+        if res_json:
+            self._remember(res_json)
 
         if as_json or not res_json:
-            return as_json
+            return res_json
 
         return Group(**res_json)
 
@@ -146,15 +167,94 @@ class Groups:
             group object
 
         """
-        url = client.build_url('groups')
+        url = self.URL_GROUPS()
         data = {'name': name}
         _, res_json = client.post(url, body=data, headers=self.headers)
+        if res_json:
+            self._remember(res_json)
 
         if as_json or not res_json:
             return res_json
 
         return Group(**res_json)
 
+    def resolve(self, name, refresh=False):
+        """Return the group named name, from a cached index of the groups.
+
+        The index is built on the first call by listing every group, page
+        after page, then kept up to date by :meth:`create`, :meth:`update`
+        and :meth:`delete`. Groups changed elsewhere are seen after
+        :meth:`invalidate` or with ``refresh=True``.
+
+        Parameters
+        ----------
+        name : str
+            group name, case sensitive
+        refresh : bool
+            list the groups again first (default False)
+
+        Returns
+        -------
+        group: :class:Group
+            None if there is no group with that name
+
+        """
+        with self._names_lock:
+            if refresh or self._names is None:
+                self._load_names()
+            return self._names.get(name)
+
+    def get_or_create(self, name):
+        """Return the group named name, created if it does not exist.
+
+        A missing name is looked up again in a fresh listing before the
+        group is created, and concurrent calls of this object are
+        serialized, so a group is not created twice.
+
+        Parameters
+        ----------
+        name : str
+            group name
+
+        Returns
+        -------
+        group: :class:Group
+            the existing or new group
+
+        """
+        with self._names_lock:
+            group = self.resolve(name)
+            if group is None:
+                group = self.resolve(name, refresh=True)
+            if group is None:
+                group = self.create(name)
+            return group
+
+    def invalidate(self):
+        """Drop the index of group names, rebuilt by the next resolve."""
+        with self._names_lock:
+            self._names = None
+
+    def _load_names(self):
+        names = {}
+        for group in iter_records(self.all, as_json=True):
+            names.setdefault(group['name'], Group(**group))
+        self._names = names
+
+    def _remember(self, res_json):
+        with self._names_lock:
+            if self._names is not None and 'name' in res_json:
+                self._names.setdefault(res_json['name'], Group(**res_json))
+
+    def _forget(self, group_id):
+        with self._names_lock:
+            if self._names is None:
+                return
+            names = [n for n, g in self._names.items()
+                     if str(g.id) == str(group_id)]
+            for name in names:
+                del self._names[name]
+
     def add_subscribers(self, group_id, subscribers_data, resubscribe=False,
                         autoresponders=False, as_json=False):
         """Add one or many new subscribers to specified group at once.
@@ -181,7 +281,7 @@ class Groups:
             group object
 
         """
-        url = client.build_url('groups', group_id, 'subscribers', 'import')
+        url = self.URL_IMPORT(group_id)
 
         body = {'resubscribe': resubscribe, 'autoresponders': autoresponders}
         if isinstance(subscribers_data, dict):
@@ -205,6 +305,90 @@ class Groups:
 
         return [Subscriber(**subs) for subs in res_json['imported']]
 
+    def add_subscribers_results(self, group_id, subscribers_data,
+                                resubscribe=False, autoresponders=False):
+        """Add many subscribers to a group and report the outcome of each one.
+
+        Unlike :meth:`add_subscribers`, an invalid subscriber does not fail
+        the whole call: subscribers without email or name are reported
+        failed without being sent, the others are imported and matched by
+        email with the ``imported``, ``updated``, ``unchanged`` and
+        ``errors`` lists of the response. A subscriber missing from the
+        response is reported failed, without status, and retryable.
+
+        Parameters
+        ----------
+        group_id : int
+            group id
+        subscribers_data : dict, list of dict
+            subscribers element that contains email and name
+        resubscribe : bool
+            reactivate subscriber if value is true (default False)
+        autoresponders : bool
+            autoresponders will be sent if value is true (default False)
+
+        Returns
+        -------
+        result : :class:`BulkResult`
+            one item per subscriber, the message of a successful item is
+            the list it was found in, e.g. 'imported'. ``result.retry()``
+            sends again the failed subscribers only.
+
+        """
+        from mailerlite.bulk import BulkResult, item_from_error, \
+            item_from_status
+        from mailerlite.index import normalize_email
+
+        if isinstance(subscribers_data, dict):
+            subscribers_data = [subscribers_data, ]
+        items, valid = [], []
+        for i, data in enumerate(subscribers_data):
+            if isinstance(data, dict) and {'email', 'name'}.issubset(data):
+                valid.append((i, data))
+            else:
+                items.append(item_from_status(i, data, None)._replace(
+                    message='subscribers_data should contain the following'
+                            ' keys: email, name', retryable=False))
+
+        def send(subscribers):
+            return self.add_subscribers_results(
+                group_id, subscribers, resubscribe=resubscribe,
+                autoresponders=autoresponders)
+
+        if not valid:
+            return BulkResult(items, send=send)
+
+        body = {'resubscribe': resubscribe, 'autoresponders': autoresponders,
+                'subscribers': [data for _, data in valid]}
+        try:
+            _, res_json = client.post(self.URL_IMPORT(group_id), body=body,
+                                      headers=self.headers)
+        except IOError as e:
+            items.extend(item_from_error(i, data, e) for i, data in valid)
+            return BulkResult(items, send=send)
+
+        res_json = res_json if isinstance(res_json, dict) else {}
+        outcome = {}
+        for status in ('imported', 'updated', 'unchanged'):
+            for subs in res_json.get(status) or []:
+                if isinstance(subs, dict):
+                    outcome[normalize_email(subs.get('email'))] = \
+                        item_from_status(None, None, 200, subs)._replace(
+                            message=status)
+        for error in res_json.get('errors') or []:
+            if isinstance(error, dict) and error.get('email'):
+                outcome[normalize_email(error['email'])] = \
+                    item_from_status(None, None, 422, error)
+
+        for i, data in valid:
+            item = outcome.get(normalize_email(data['email']))
+            if item is None:
+                # not listed in the response, the outcome is unknown
+                item = item_from_status(None, None, None)._replace(
+                    message='not listed in the import response')
+            items.append(item._replace(index=i, request=data))
+        return BulkResult(items, send=send)
+
     def add_single_subscriber(self, group_id, subscribers_data: dict,
                               resubscribe=False, autoresponders=False,
                               as_json=False):
@@ -231,7 +415,7 @@ class Groups:
             subscriber object
 
         """
-        url = client.build_url('groups', group_id, 'subscribers')
+        url = self.URL_SUBSCRIBERS(group_id)
 
         body = {'resubscribe': resubscribe, 'autoresponders': autoresponders,
                 **subscribers_data}
@@ -284,16 +468,14 @@ class Groups:
                                        'junk', 'unconfirmed']:
             params.update({'type': stype})
 
-        url = client.build_url('groups', group_id, 'subscribers', **params)
+        url = self.URL_SUBSCRIBERS(group_id, **params)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        for res in res_json:
-            res['fields'] = [Field(**field) for field in res['fields']]
-
-        all_subscribers = [Subscriber(**res) for res in res_json]
+        all_subscribers = [Subscriber(**{**res, 'fields': [
+            Field(**field) for field in res['fields']]}) for res in res_json]
         return all_subscribers
 
     def subscriber(self, group_id, subscriber_id, as_json=False):
@@ -315,16 +497,15 @@ class Groups:
         subscriber: :class:Subscriber
             a single subscriber
         """
-        url = client.build_url('groups', group_id, 'subscribers',
-                               subscriber_id)
+        url = self.URL_SUBSCRIBER(group_id, subscriber_id)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        res_json['fields'] = [Field(**res) for res in res_json['fields']]
+        fields = [Field(**res) for res in res_json['fields']]
 
-        return Subscriber(**res_json)
+        return Subscriber(**{**res_json, 'fields': fields})
 
     def delete_subscriber(self, group_id, subscriber_id):
         """Remove a subscribers.
@@ -341,6 +522,5 @@ class Groups:
         success: bool
             deletion status
         """
-        url = client.build_url('groups', group_id, 'subscribers',
-                               subscriber_id)
+        url = self.URL_SUBSCRIBER(group_id, subscriber_id)
         return client.delete(url, headers=self.headers)
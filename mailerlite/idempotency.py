@@ -0,0 +1,320 @@
+"""Idempotent creation of resources, safe to retry after a timeout."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from mailerlite.exceptions import MailerLiteError, NotFound
+from mailerlite.pagination import iter_records
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _digest(kind, payload):
+    text = json.dumps([kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def idempotency_key(kind, payload):
+    """Return the default key of a write: a digest of its kind and payload.
+
+    The same write sent twice gets the same key, so it is only performed
+    once. Give your own key to perform identical writes several times.
+
+    """
+    return '{}:{}'.format(kind, _digest(kind, payload)[:32])
+
+
+def is_ambiguous(error):
+    """Return True if the write may have been performed despite error.
+
+    Connection errors, timeouts and 5xx responses are ambiguous; a 4xx
+    response (429 included) means the write was not performed.
+
+    """
+    if isinstance(error, MailerLiteError):
+        return error.status is None or error.status >= 500
+    return isinstance(error, IOError)
+
+
+class IdempotencyJournal:
+
+    def __init__(self, path=':memory:'):
+        """Initialize an IdempotencyJournal object.
+
+        Records the state of each write by key: ``pending`` while it is
+        being sent or when its outcome is unknown, ``done`` with the created
+        resource, ``failed`` with the error when it was rejected.
+
+        Parameters
+        ----------
+        path : str
+            SQLite database file, default ':memory:' (not durable)
+
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key):
+        """Return the entry of a key as a dict, None if unknown."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT key, kind, digest, state, result, attempts,'
+                ' last_error FROM writes WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(('key', 'kind', 'digest', 'state', 'result',
+                          'attempts', 'last_error'), row))
+        if entry['result'] is not None:
+            entry['result'] = json.loads(entry['result'])
+        return entry
+
+    def begin(self, key, kind, digest):
+        """Mark a write as pending and count an attempt."""
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO writes (key, kind, digest, state, attempts,'
+                ' updated_at) VALUES (?, ?, ?, ?, 1, ?)'
+                ' ON CONFLICT(key) DO UPDATE SET state = excluded.state,'
+                ' attempts = attempts + 1, updated_at = excluded.updated_at',
+                (key, kind, digest, PENDING, time.time()))
+            self._db.commit()
+
+    def complete(self, key, result):
+        """Record the created resource of a write."""
+        self._set(key, DONE, result=json.dumps(result))
+
+    def fail(self, key, error, state=FAILED):
+        """Record the error of a write, keep state pending if unsure."""
+        self._set(key, state, last_error=str(error))
+
+    def forget(self, key):
+        """Remove a key, the next write with it is performed again."""
+        with self._lock:
+            self._db.execute('DELETE FROM writes WHERE key = ?', (key,))
+            self._db.commit()
+
+    def pending(self):
+        """Return the keys whose outcome is unknown."""
+        with self._lock:
+            rows = self._db.execute('SELECT key FROM writes WHERE state = ?'
+                                    ' ORDER BY updated_at', (PENDING,))
+            return [key for key, in rows]
+
+    def _set(self, key, state, **values):
+        columns = ''.join(', {} = ?'.format(k) for k in values)
+        with self._lock:
+            self._db.execute(
+                'UPDATE writes SET state = ?, updated_at = ?' + columns +
+                ' WHERE key = ?',
+                (state, time.time(), *values.values(), key))
+            self._db.commit()
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+class IdempotentWriter:
+
+    # kind of write -> method finding an existing resource
+    LOOKUPS = {'subscriber': '_lookup_subscriber', 'group': '_lookup_group',
+               'field': '_lookup_field', 'campaign': '_lookup_campaign'}
+
+    def __init__(self, api, journal=None, attempts=3, delay=1.,
+                 max_delay=300., sleep=time.sleep):
+        """Initialize an IdempotentWriter object.
+
+        Creates subscribers, groups, campaigns and fields at most once, even
+        when retried. Each write has a key recorded in an
+        :class:`IdempotencyJournal`:
+
+        * a write already done returns the recorded resource without any
+          request,
+        * after an ambiguous failure (timeout, connection error, 5xx) or a
+          pending entry left by a crash, the resource is first looked up
+          (subscriber by email, group by name, field by title, draft
+          campaign by name and subject) and only POSTed again when missing,
+        * other errors are raised, a 4xx is recorded as failed and 429 is
+          retried after its ``Retry-After``.
+
+        Parameters
+        ----------
+        api : :class:`mailerlite.MailerLiteApi`
+            api used to send the writes
+        journal : :class:`IdempotencyJournal`, optional
+            an in-memory journal by default
+        attempts : int
+            maximum number of POSTs per call (default 3)
+        delay : float
+            seconds to wait before the second attempt, doubled afterwards
+        max_delay : float
+            maximum seconds to wait between two attempts, ``Retry-After``
+            included (default 300)
+        sleep : callable
+            called with the seconds to wait
+
+        """
+        self.api = api
+        self.journal = IdempotencyJournal() if journal is None else journal
+        self.attempts = attempts
+        self.delay = delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.reconciled = 0
+
+    def create_subscriber(self, data, key=None):
+        """Create a subscriber once, see :meth:`Subscribers.create`.
+
+        Returns
+        -------
+        subscriber : dict
+            JSON of the subscriber
+
+        """
+        return self.write('subscriber', data, key=key)
+
+    def create_group(self, name, key=None):
+        """Create a group once, see :meth:`Groups.create`."""
+        return self.write('group', {'name': name}, key=key)
+
+    def create_field(self, title, field_type='TEXT', key=None):
+        """Create a custom field once, see :meth:`Fields.create`."""
+        return self.write('field', {'title': title,
+                                    'type': field_type.upper()}, key=key)
+
+    def create_campaign(self, data, key=None):
+        """Create a draft campaign once, see :meth:`Campaigns.create`."""
+        return self.write('campaign', data, key=key)
+
+    def write(self, kind, payload, key=None):
+        """Perform a write at most once.
+
+        Parameters
+        ----------
+        kind : str
+            'subscriber', 'group', 'field' or 'campaign'
+        payload : dict
+            body of the creation
+        key : str, optional
+            idempotency key, derived from kind and payload by default
+
+        Returns
+        -------
+        result : dict
+            JSON of the created, or found, resource
+
+        """
+        if kind not in self.LOOKUPS:
+            raise ValueError('Unknown kind {!r}, expected one of {}'
+                             .format(kind, sorted(self.LOOKUPS)))
+        key = idempotency_key(kind, payload) if key is None else key
+        digest = _digest(kind, payload)
+        entry = self.journal.get(key)
+        if entry is not None:
+            if entry['digest'] != digest:
+                raise ValueError('Idempotency key {!r} was used for another'
+                                 ' write'.format(key))
+            if entry['state'] == DONE:
+                return entry['result']
+
+        # a pending entry is a previous attempt with an unknown outcome
+        ambiguous = entry is not None and entry['state'] == PENDING
+        for attempt in range(self.attempts):
+            if ambiguous:
+                found = self.lookup(kind, payload)
+                if found is not None:
+                    self.reconciled += 1
+                    self.journal.complete(key, found)
+                    return found
+            self.journal.begin(key, kind, digest)
+            try:
+                result = self._post(kind, payload)
+            except IOError as e:
+                ambiguous = is_ambiguous(e)
+                retry = ambiguous or getattr(e, 'status', None) == 429
+                if not retry:
+                    self.journal.fail(key, e)
+                    raise
+                self.journal.fail(key, e, state=PENDING)
+                if attempt == self.attempts - 1:
+                    raise
+                wait = max(self.delay * 2 ** attempt,
+                           getattr(e, 'retry_after', None) or 0)
+                self.sleep(min(wait, self.max_delay))
+                continue
+            self.journal.complete(key, result)
+            return result
+
+    def lookup(self, kind, payload):
+        """Return the JSON of an existing resource matching payload."""
+        return getattr(self, self.LOOKUPS[kind])(payload)
+
+    def _post(self, kind, payload):
+        if kind == 'subscriber':
+            return self.api.subscribers.create(payload, as_json=True)
+        if kind == 'group':
+            return self.api.groups.create(payload['name'], as_json=True)
+        if kind == 'field':
+            _, res_json = self.api.fields.create(payload['title'],
+                                                 payload['type'])
+            return res_json
+        _, res_json = self.api.campaigns.create(payload)
+        return res_json
+
+    def _lookup_subscriber(self, payload):
+        try:
+            return self.api.subscribers.get(email=payload['email'],
+                                            as_json=True) or None
+        except NotFound:
+            return None
+
+    def _lookup_group(self, payload):
+        for group in iter_records(self.api.groups.all, as_json=True):
+            if group.get('name') == payload['name']:
+                return group
+        return None
+
+    def _lookup_field(self, payload):
+        title = payload['title'].strip().lower()
+        for field in self.api.fields.all(as_json=True) or []:
+            if (field.get('title') or '').strip().lower() == title:
+                return field
+        return None
+
+    def _lookup_campaign(self, payload):
+        # the newest draft with the same name and subject
+        for campaign in iter_records(self.api.campaigns.all, status='draft',
+                                     order='desc', as_json=True):
+            if all(campaign.get(k) == payload[k] for k in ('name', 'subject')
+                   if k in payload):
+                return campaign
+        return None
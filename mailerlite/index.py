@@ -0,0 +1,242 @@
+"""Local in-memory index of subscribers."""
+
+import threading
+
+from mailerlite.constants import Subscriber, Field
+from mailerlite.pagination import iter_records
+
+
+def normalize_email(email):
+    """Return the email as used for lookups: stripped and lowercase."""
+    return email.strip().lower() if email else email
+
+
+def same_value(value, ref):
+    """Return True if sending value would not change ref.
+
+    Values are compared as strings, since the API returns custom fields as
+    strings; None and '' both mean empty.
+
+    """
+    if value in (None, '') or ref in (None, ''):
+        return value in (None, '') and ref in (None, '')
+    return str(value) == str(ref)
+
+
+def as_subscriber(subscriber):
+    """Return a :class:`Subscriber` from a Subscriber or its JSON."""
+    if isinstance(subscriber, Subscriber):
+        return subscriber
+    fields = subscriber.get('fields') or []
+    if isinstance(fields, dict):
+        fields = [Field(key=k, value=v) for k, v in fields.items()]
+    else:
+        fields = [f if isinstance(f, Field) else Field(**f) for f in fields]
+    return Subscriber(**{**subscriber, 'fields': fields})
+
+
+def field_values(subscriber):
+    """Return the custom fields of a subscriber as a dict key -> value."""
+    return {f.key: f.value for f in subscriber.fields or []}
+
+
+class SubscriberIndex:
+
+    def __init__(self, subscribers=()):
+        """Initialize a SubscriberIndex object.
+
+        Subscribers are indexed by id and lowercase email for O(1) lookups,
+        and by type and custom field values for filtered scans, without any
+        request to the API.
+
+        Parameters
+        ----------
+        subscribers : iterable, optional
+            :class:`Subscriber` or their JSON to index
+
+        """
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_email = {}
+        self._by_type = {}
+        self._by_field = {}
+        self.update(subscribers)
+
+    @classmethod
+    def from_api(cls, api, stype=None, page_size=1000):
+        """Build an index from a full export of the subscribers.
+
+        Parameters
+        ----------
+        api : :class:`mailerlite.MailerLiteApi`
+            api of the account
+        stype : str, optional
+            only export subscribers of this type (active, unsubscribed, ...)
+        page_size : int
+            number of subscribers requested per page (default 1000)
+
+        Returns
+        -------
+        index : :class:`SubscriberIndex`
+
+        """
+        return cls(iter_records(api.subscribers.all, stype=stype,
+                                page_size=page_size, as_json=True))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._by_id.values()))
+
+    def __contains__(self, key):
+        return self.get(**{'email' if isinstance(key, str) else 'id':
+                           key}) is not None
+
+    def _unindex(self, subscriber):
+        self._by_email.pop(normalize_email(subscriber.email), None)
+        ids = self._by_type.get(subscriber.type)
+        if ids is not None:
+            ids.discard(subscriber.id)
+            if not ids:
+                del self._by_type[subscriber.type]
+        for key, value in field_values(subscriber).items():
+            values = self._by_field.get(key, {})
+            try:
+                ids = values.get(value)
+            except TypeError:  # unhashable value, never indexed
+                continue
+            if ids is not None:
+                ids.discard(subscriber.id)
+                if not ids:
+                    del values[value]
+
+    def add(self, subscriber):
+        """Add or replace a subscriber.
+
+        Parameters
+        ----------
+        subscriber : :class:`Subscriber` or dict
+            the subscriber, its id is required
+
+        Returns
+        -------
+        subscriber : :class:`Subscriber`
+            the indexed subscriber
+
+        """
+        subscriber = as_subscriber(subscriber)
+        if subscriber.id is None:
+            raise ValueError('Only subscribers with an id can be indexed')
+        with self._lock:
+            old = self._by_id.get(subscriber.id)
+            if old is not None:
+                self._unindex(old)
+            self._by_id[subscriber.id] = subscriber
+            if subscriber.email:
+                self._by_email[normalize_email(subscriber.email)] = \
+                    subscriber.id
+            self._by_type.setdefault(subscriber.type, set()) \
+                .add(subscriber.id)
+            for key, value in field_values(subscriber).items():
+                try:
+                    self._by_field.setdefault(key, {}) \
+                        .setdefault(value, set()).add(subscriber.id)
+                except TypeError:  # unhashable value, not indexed
+                    pass
+        return subscriber
+
+    def update(self, subscribers):
+        """Add or replace many subscribers, e.g. an incremental export.
+
+        Returns
+        -------
+        count : int
+            number of subscribers indexed
+
+        """
+        count = 0
+        for subscriber in subscribers:
+            self.add(subscriber)
+            count += 1
+        return count
+
+    def remove(self, subscriber_id):
+        """Remove a subscriber, return it or None if it was not indexed."""
+        with self._lock:
+            subscriber = self._by_id.pop(subscriber_id, None)
+            if subscriber is not None:
+                self._unindex(subscriber)
+            return subscriber
+
+    def get(self, id=None, email=None):
+        """Get a subscriber by id or email.
+
+        Parameters
+        ----------
+        id : int, optional
+            subscriber id
+        email : str, optional
+            subscriber email, case and surrounding spaces are ignored
+
+        Returns
+        -------
+        subscriber : :class:`Subscriber` or None
+
+        """
+        with self._lock:
+            if id is None and email is not None:
+                id = self._by_email.get(normalize_email(email))
+            return self._by_id.get(id)
+
+    def ids(self, stype=None, **fields):
+        """Return the ids of the subscribers matching every criterion.
+
+        Parameters
+        ----------
+        stype : str, optional
+            subscriber type (active, unsubscribed, bounced, ...)
+        fields : dict
+            custom field values, e.g. ``company='MailerLite'``
+
+        Returns
+        -------
+        ids : set
+
+        """
+        with self._lock:
+            candidates = []
+            if stype is not None:
+                candidates.append(self._by_type.get(stype, set()))
+            for key, value in fields.items():
+                candidates.append(self._by_field.get(key, {})
+                                  .get(value, set()))
+            if not candidates:
+                return set(self._by_id)
+            candidates.sort(key=len)
+            return set(candidates[0]).intersection(*candidates[1:])
+
+    def find(self, stype=None, **fields):
+        """Return the subscribers matching every criterion.
+
+        See :meth:`ids` for the parameters.
+
+        Returns
+        -------
+        subscribers : list of :class:`Subscriber`
+
+        """
+        # the same lock (reentrant) is held across both steps, so a
+        # concurrent remove can not drop an id in between
+        with self._lock:
+            return [self._by_id[i] for i in self.ids(stype=stype, **fields)]
+
+    def count(self, stype=None, **fields):
+        """Return the number of subscribers matching every criterion."""
+        return len(self.ids(stype=stype, **fields))
+
+    def values(self, key):
+        """Return the distinct values of a custom field."""
+        with self._lock:
+            return set(self._by_field.get(key, {}))
@@ -0,0 +1,218 @@
+"""Export group memberships of all subscribers at once."""
+
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from mailerlite.concurrency import map_concurrent
+from mailerlite.pagination import iter_pages, iter_records
+
+_MAGIC = b'MLMI'
+_HEADER = struct.Struct('<4sBBqq')
+_VERSION = 1
+_TYPECODE = 'q'
+
+
+class MembershipIndex:
+
+    def __init__(self, subscriber_ids, offsets, group_ids):
+        """Initialize a MembershipIndex object.
+
+        Inverted index subscriber id -> group ids stored in three compact
+        integer arrays (compressed sparse rows): the groups of
+        ``subscriber_ids[i]`` are ``group_ids[offsets[i]:offsets[i + 1]]``.
+        Use :meth:`from_groups`, :meth:`load` or
+        :func:`export_memberships` to build one.
+
+        Parameters
+        ----------
+        subscriber_ids : array
+            sorted subscriber ids
+        offsets : array
+            start of the groups of each subscriber, one more item than
+            subscriber_ids
+        group_ids : array
+            sorted group ids of each subscriber, one after the other
+
+        """
+        if len(offsets) != len(subscriber_ids) + 1:
+            raise ValueError('offsets should have one more item than'
+                             ' subscriber_ids')
+        self.subscriber_ids = subscriber_ids
+        self.offsets = offsets
+        self.group_ids = group_ids
+
+    @classmethod
+    def from_groups(cls, members):
+        """Build the index from the members of each group.
+
+        Parameters
+        ----------
+        members : dict
+            group id -> iterable of subscriber ids
+
+        Returns
+        -------
+        index : :class:`MembershipIndex`
+
+        """
+        sids, gids = array(_TYPECODE), array(_TYPECODE)
+        for group_id, subscriber_ids in members.items():
+            subscriber_ids = array(_TYPECODE, subscriber_ids)
+            sids.extend(subscriber_ids)
+            gids.extend(array(_TYPECODE, [group_id]) * len(subscriber_ids))
+
+        order = sorted(set(zip(sids, gids)))
+        subscriber_ids = array(_TYPECODE)
+        offsets = array(_TYPECODE)
+        group_ids = array(_TYPECODE, [gid for _, gid in order])
+        previous = None
+        for position, (sid, _) in enumerate(order):
+            if sid != previous:
+                subscriber_ids.append(sid)
+                offsets.append(position)
+                previous = sid
+        offsets.append(len(order))
+        return cls(subscriber_ids, offsets, group_ids)
+
+    def __len__(self):
+        return len(self.subscriber_ids)
+
+    def __iter__(self):
+        return iter(self.subscriber_ids)
+
+    def __contains__(self, subscriber_id):
+        return self._position(subscriber_id) is not None
+
+    def _position(self, subscriber_id):
+        i = bisect_left(self.subscriber_ids, subscriber_id)
+        if i < len(self.subscriber_ids) and \
+           self.subscriber_ids[i] == subscriber_id:
+            return i
+        return None
+
+    def groups_of(self, subscriber_id):
+        """Return the ids of the groups a subscriber belongs to.
+
+        Parameters
+        ----------
+        subscriber_id : int
+            subscriber id
+
+        Returns
+        -------
+        group_ids : array
+            sorted group ids, empty if the subscriber is unknown
+
+        """
+        i = self._position(subscriber_id)
+        if i is None:
+            return array(_TYPECODE)
+        return self.group_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def items(self):
+        """Yield (subscriber id, group ids) pairs."""
+        for i, sid in enumerate(self.subscriber_ids):
+            yield sid, self.group_ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def as_dict(self):
+        """Return the index as a dict subscriber id -> list of group ids."""
+        return {sid: gids.tolist() for sid, gids in self.items()}
+
+    def save(self, path):
+        """Write the index to a binary file.
+
+        Parameters
+        ----------
+        path : str
+            destination file
+
+        """
+        arrays = [self.subscriber_ids, self.offsets, self.group_ids]
+        if sys.byteorder != 'little':
+            arrays = [array(_TYPECODE, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, 0,
+                                 len(self.subscriber_ids),
+                                 len(self.group_ids)))
+            for a in arrays:
+                a.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by :meth:`save`.
+
+        Parameters
+        ----------
+        path : str
+            source file
+
+        Returns
+        -------
+        index : :class:`MembershipIndex`
+
+        """
+        with open(path, 'rb') as f:
+            magic, version, _, n_subscribers, n_pairs = \
+                _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError('{} is not a membership index'.format(path))
+            arrays = []
+            for size in (n_subscribers, n_subscribers + 1, n_pairs):
+                a = array(_TYPECODE)
+                a.fromfile(f, size)
+                if sys.byteorder != 'little':
+                    a.byteswap()
+                arrays.append(a)
+        return cls(*arrays)
+
+
+def _group_members(groups, group_id, page_size, stype):
+    members = array(_TYPECODE)
+    for page in iter_pages(groups.subscribers, group_id, page_size=page_size,
+                           stype=stype, as_json=True):
+        members.extend(subscriber['id'] for subscriber in page)
+    return members
+
+
+def export_memberships(api, max_workers=None, page_size=1000,
+                       stype=None, path=None):
+    """Build the subscriber -> groups index of the whole account.
+
+    Every group is listed, then the subscriber pages of all groups are
+    walked concurrently. This costs one request per page of each group,
+    instead of one request per subscriber.
+
+    Parameters
+    ----------
+    api : :class:`mailerlite.MailerLiteApi`
+        api of the account
+    max_workers : int, optional
+        maximum number of concurrent requests, default 8 or the
+        adaptive limiter maximum, see :func:`resolve_workers`
+    page_size : int
+        number of subscribers requested per page (default 1000)
+    stype : str, optional
+        only keep subscribers of this type (active, unsubscribed, ...)
+    path : str, optional
+        if given, the index is also written to this file
+
+    Returns
+    -------
+    index : :class:`MembershipIndex`
+        subscriber id -> group ids
+
+    """
+    group_ids = [group['id'] for group in
+                 iter_records(api.groups.all, page_size=page_size,
+                              as_json=True)]
+    members = map_concurrent(
+        lambda gid: _group_members(api.groups, gid, page_size, stype),
+        group_ids, max_workers=max_workers)
+    index = MembershipIndex.from_groups(dict(zip(group_ids, members)))
+    if path is not None:
+        index.save(path)
+    return index
@@ -0,0 +1,43 @@
+"""Walk through the paginated listings of the API."""
+
+
+def iter_pages(fetch, *args, page_size=100, offset=0, **kwargs):
+    """Yield the successive pages of a listing method.
+
+    Parameters
+    ----------
+    fetch : callable
+        listing method accepting ``limit`` and ``offset``, e.g.
+        ``api.subscribers.all`` or ``api.groups.subscribers``
+    page_size : int
+        number of records requested per page (default 100)
+    offset : int
+        number of records to skip first (default 0)
+    args, kwargs
+        other arguments given to fetch
+
+    Yields
+    ------
+    page : list
+        records of one page, the last page can be shorter
+
+    """
+    while True:
+        page = fetch(*args, limit=page_size, offset=offset, **kwargs)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        offset += len(page)
+
+
+def iter_records(fetch, *args, page_size=100, offset=0, **kwargs):
+    """Yield every record of a listing method, page after page.
+
+    See :func:`iter_pages` for the parameters.
+
+    """
+    for page in iter_pages(fetch, *args, page_size=page_size, offset=offset,
+                           **kwargs):
+        yield from page
@@ -0,0 +1,126 @@
+"""Normalize and deduplicate subscriber payloads before sending them."""
+
+from mailerlite.constants import PreflightReport
+from mailerlite.index import field_values, normalize_email, same_value
+
+MERGE_STRATEGIES = ('last', 'fields')
+
+
+def _merge(old, new, strategy):
+    if strategy == 'last':
+        return new
+    merged = {**old, **new}
+    if isinstance(old.get('fields'), dict) and \
+       isinstance(new.get('fields'), dict):
+        merged['fields'] = {**old['fields'], **new['fields']}
+    return merged
+
+
+def is_unchanged(record, subscriber):
+    """Return True if sending record would not change subscriber.
+
+    Parameters
+    ----------
+    record : dict
+        subscriber payload (email, name, type, fields)
+    subscriber : :class:`Subscriber`
+        current state of the subscriber
+
+    """
+    if 'name' in record and not same_value(record['name'], subscriber.name):
+        return False
+    if 'type' in record and not same_value(record['type'], subscriber.type):
+        return False
+    current = field_values(subscriber)
+    fields = record.get('fields') or {}
+    return all(k in current and same_value(v, current[k])
+               for k, v in fields.items())
+
+
+def preflight(subscribers_data, index=None, group_id=None, memberships=None,
+              merge='last'):
+    """Normalize, deduplicate and filter a batch of subscriber payloads.
+
+    * emails are stripped and lowercased,
+    * payloads without email are dropped,
+    * payloads with the same email are merged into one,
+    * payloads which would not change the subscriber known in ``index``
+      are dropped. When adding to a group, this also requires the
+      subscriber to already be a member of ``group_id`` in ``memberships``.
+
+    Parameters
+    ----------
+    subscribers_data : dict, list of dict
+        payloads as given to :meth:`Groups.add_subscribers` or
+        :meth:`Subscribers.create`
+    index : :class:`SubscriberIndex`, optional
+        local snapshot of the subscribers
+    group_id : int, optional
+        group the payloads are added to. Required when the records feed
+        :meth:`Groups.add_subscribers`: without it, an unchanged subscriber
+        who is not yet a member of the group is dropped.
+    memberships : :class:`MembershipIndex` or dict, optional
+        subscriber id -> group ids, without it every subscriber is
+        considered missing from ``group_id``
+    merge : str
+        how duplicates are merged:
+        * last - the last payload wins (default)
+        * fields - payloads are merged key by key, including their fields
+
+    Returns
+    -------
+    records : list of dict
+        payloads to send, in order of first appearance
+    report : :class:`PreflightReport`
+        how many payloads were received, sent, merged as duplicates,
+        dropped as unchanged or invalid, and saved from being sent
+
+    """
+    if merge not in MERGE_STRATEGIES:
+        raise ValueError('Incorrect merge, should be {}'
+                         .format(MERGE_STRATEGIES))
+    if isinstance(subscribers_data, dict):
+        subscribers_data = [subscribers_data]
+
+    received = invalid = duplicates = 0
+    records = {}
+    for data in subscribers_data:
+        received += 1
+        email = normalize_email(data.get('email'))
+        if not email:
+            invalid += 1
+            continue
+        data = {**data, 'email': email}
+        if email in records:
+            duplicates += 1
+            records[email] = _merge(records[email], data, merge)
+        else:
+            records[email] = data
+
+    unchanged = 0
+    if index is not None:
+        kept = {}
+        for email, data in records.items():
+            subscriber = index.get(email=email)
+            if subscriber is not None and is_unchanged(data, subscriber) \
+               and _is_member(subscriber.id, group_id, memberships):
+                unchanged += 1
+            else:
+                kept[email] = data
+        records = kept
+
+    sent = len(records)
+    report = PreflightReport(received=received, sent=sent,
+                             duplicates=duplicates, unchanged=unchanged,
+                             invalid=invalid, saved=received - sent)
+    return list(records.values()), report
+
+
+def _is_member(subscriber_id, group_id, memberships):
+    if group_id is None:
+        return True
+    if memberships is None:
+        return False
+    if hasattr(memberships, 'groups_of'):
+        return group_id in memberships.groups_of(subscriber_id)
+    return group_id in memberships.get(subscriber_id, ())
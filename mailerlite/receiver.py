@@ -0,0 +1,317 @@
+"""Receive the events sent to webhooks."""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import threading
+from http import HTTPStatus
+
+from mailerlite.constants import WebhookEvent, Subscriber, Field, Group
+
+SIGNATURE_HEADER = 'X-MailerLite-Signature'
+ALL_EVENTS = '*'
+
+logger = logging.getLogger(__name__)
+
+
+def _known(nt, data):
+    """Build a namedtuple from a dict, ignoring unknown keys."""
+    return nt(**{k: v for k, v in data.items() if k in nt._fields})
+
+
+def sign(body, secret):
+    """Return the signature of a webhook body.
+
+    Parameters
+    ----------
+    body : bytes
+        raw request body
+    secret : str
+        your api key
+
+    Returns
+    -------
+    signature : str
+        base64 encoded HMAC-SHA256 of the body
+
+    """
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def verify_signature(body, signature, secret):
+    """Return True if signature is the signature of body.
+
+    Both the base64 and the hexadecimal encodings of the HMAC-SHA256
+    digest are accepted.
+
+    """
+    if not signature:
+        return False
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()
+    expected = (base64.b64encode(digest).decode('ascii'), digest.hex())
+    return any(hmac.compare_digest(signature.strip(), e) for e in expected)
+
+
+def parse_event(event):
+    """Return a :class:`WebhookEvent` from the JSON of an event."""
+    data = event.get('data') or {}
+    subscriber = data.get('subscriber')
+    if isinstance(subscriber, dict):
+        fields = subscriber.get('fields') or []
+        if isinstance(fields, list):
+            fields = [_known(Field, f) for f in fields]
+        subscriber = _known(Subscriber, {**subscriber, 'fields': fields})
+    group = data.get('group')
+    if isinstance(group, dict):
+        group = _known(Group, group)
+    return _known(WebhookEvent, {**event, 'data': data,
+                                 'subscriber': subscriber, 'group': group})
+
+
+def parse_events(body):
+    """Parse the body of a webhook call into events.
+
+    Parameters
+    ----------
+    body : bytes or str
+        raw request body, ``{"events": [...]}`` or a single event
+
+    Returns
+    -------
+    events : list of :class:`WebhookEvent`
+
+    """
+    payload = json.loads(body)
+    events = payload.get('events') if isinstance(payload, dict) \
+        and 'events' in payload else payload
+    if isinstance(events, dict):
+        events = [events]
+    return [parse_event(e) for e in events]
+
+
+class WebhookReceiver:
+
+    def __init__(self, secret=None, max_workers=4, queue_size=10000,
+                 on_error=None):
+        """Initialize a WebhookReceiver object.
+
+        The receiver is a WSGI application (``receiver``) and an ASGI one
+        (``receiver.asgi``). Calls are verified, parsed and queued, then
+        acknowledged right away: handlers run later on a pool of worker
+        threads, so slow handlers never make MailerLite time out. When the
+        bounded queue is full, the call is answered ``503`` and MailerLite
+        retries it later.
+
+        Parameters
+        ----------
+        secret : str, optional
+            your api key, used to verify the signatures. None disables the
+            verification.
+        max_workers : int
+            number of threads running the handlers (default 4)
+        queue_size : int
+            maximum number of events waiting for a worker (default 10000)
+        on_error : callable, optional
+            called with ``(event, exception)`` when a handler fails
+
+        """
+        self.secret = secret
+        self.max_workers = max_workers
+        self.on_error = on_error
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self.received = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.dispatched = 0
+        self.errors = 0
+
+    def add_handler(self, handler, event_type=ALL_EVENTS):
+        """Register a handler called with each :class:`WebhookEvent`.
+
+        Parameters
+        ----------
+        handler : callable
+            called with the event
+        event_type : str
+            e.g. 'subscriber.create', '*' for all events (default)
+
+        """
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def on(self, event_type=ALL_EVENTS):
+        """Register the decorated function as a handler of event_type."""
+        def decorator(handler):
+            self.add_handler(handler, event_type)
+            return handler
+        return decorator
+
+    def start(self):
+        """Start the worker threads, done on the first call otherwise."""
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, daemon=True,
+                                          name='mailerlite-webhook-{}'
+                                          .format(i))
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self, drain=True):
+        """Stop the worker threads.
+
+        Parameters
+        ----------
+        drain : bool
+            dispatch the queued events first (default True)
+
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        if not drain:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._queue.task_done()
+                self._count('dropped')
+        for _ in workers:
+            self._queue.put(None)
+        for worker in workers:
+            worker.join()
+
+    def join(self):
+        """Wait until every queued event has been dispatched."""
+        self._queue.join()
+
+    def pending(self):
+        """Return the number of events waiting for a worker."""
+        return self._queue.qsize()
+
+    def _count(self, counter, n=1):
+        # handle is called from concurrent server threads
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def _work(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is None:
+                    return
+                self.dispatch(event)
+            finally:
+                self._queue.task_done()
+
+    def dispatch(self, event):
+        """Run the handlers of an event in the current thread."""
+        with self._lock:
+            handlers = self._handlers.get(event.type, []) + \
+                self._handlers.get(ALL_EVENTS, [])
+        errors = 0
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                errors += 1
+                if self.on_error is None:
+                    continue
+                try:
+                    self.on_error(event, e)
+                except Exception:  # keep the worker alive
+                    logger.exception('on_error failed for a %s event',
+                                     event.type)
+        with self._lock:
+            self.errors += errors
+            self.dispatched += 1
+
+    def handle(self, body, signature=None):
+        """Verify, parse and queue the events of a webhook call.
+
+        Parameters
+        ----------
+        body : bytes
+            raw request body
+        signature : str, optional
+            value of the ``X-MailerLite-Signature`` header
+
+        Returns
+        -------
+        status : int
+            HTTP status to answer: 200 when queued, 400 on invalid body,
+            401 on invalid signature, 503 when the queue is full
+        message : str
+            a short explanation
+
+        """
+        if self.secret is not None and \
+           not verify_signature(body, signature, self.secret):
+            self._count('rejected')
+            return 401, 'invalid signature'
+        try:
+            events = parse_events(body)
+        except (ValueError, TypeError, AttributeError):
+            self._count('rejected')
+            return 400, 'invalid body'
+
+        self.start()
+        if self._queue.maxsize and \
+           self._queue.qsize() + len(events) > self._queue.maxsize:
+            self._count('dropped', len(events))
+            return 503, 'queue full'
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self._count('dropped')
+                return 503, 'queue full'
+            self._count('received')
+        return 200, 'ok'
+
+    def __call__(self, environ, start_response):
+        """WSGI application."""
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length) if length else b''
+        signature = environ.get('HTTP_' + SIGNATURE_HEADER.upper()
+                                .replace('-', '_'))
+        if environ.get('REQUEST_METHOD', 'POST') != 'POST':
+            status, message = 405, 'method not allowed'
+        else:
+            status, message = self.handle(body, signature)
+        start_response('{} {}'.format(status, HTTPStatus(status).phrase),
+                       [('Content-Type', 'text/plain')])
+        return [message.encode('utf-8')]
+
+    async def asgi(self, scope, receive, send):
+        """ASGI application."""
+        if scope['type'] != 'http':
+            return
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1')
+                   for k, v in scope.get('headers', [])}
+        if scope.get('method', 'POST') != 'POST':
+            status, text = 405, 'method not allowed'
+        else:
+            status, text = self.handle(b''.join(chunks),
+                                       headers.get(SIGNATURE_HEADER.lower()))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body',
+                    'body': text.encode('utf-8')})
@@ -5,8 +5,11 @@ from mailerlite.constants import Segment, Meta, Pagination
 
 
 class Segments:
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_SEGMENTS = client.UrlTemplate('segments')
+    URL_COUNT = client.UrlTemplate('segments', 'count')
 
-    def __init__(self, headers):
+    def __init__(self, headers, validate=True):
         """Initialize Segments object.
 
         Parameters
@@ -14,11 +17,15 @@ class Segments:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
 
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
 
@@ -51,16 +58,15 @@ class Segments:
             raise IOError("Incorrect order, please choose between ASC or DESC")
 
         params = {'limit': limit, 'offset': offset, 'order': order}
-        url = client.build_url('segments', **params)
+        url = self.URL_SEGMENTS(**params)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json['data'], res_json['meta']
 
         all_segments = [Segment(**res) for res in res_json['data']]
-        res_json['meta']['pagination'] = Pagination(**res_json['meta']
-                                                    .pop('pagination'))
-        meta = Meta(**res_json['meta'])
+        pagination = Pagination(**res_json['meta']['pagination'])
+        meta = Meta(**{**res_json['meta'], 'pagination': pagination})
         return all_segments, meta
 
     def count(self):
@@ -75,7 +81,7 @@ class Segments:
             number of segments
 
         """
-        url = client.build_url('segments', 'count')
+        url = self.URL_COUNT()
         _, res_json = client.get(url, headers=self.headers)
 
         return res_json.get('count') or len(res_json.get('data'))
@@ -0,0 +1,298 @@
+"""Evaluate segment filters locally over a snapshot of subscribers."""
+
+import threading
+
+from mailerlite.constants import Segment, Subscriber
+from mailerlite.index import field_values, normalize_email
+
+_FIELD_PREFIXES = ('text_field_', 'number_field_', 'date_field_',
+                   'field_')
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(value, ref):
+    """Return -1, 0, 1 comparing value to ref, None if not comparable."""
+    if value is None or value == '':
+        return None
+    a, b = _number(value), _number(ref)
+    if a is None or b is None:
+        a, b = str(value), str(ref)
+    return (a > b) - (a < b)
+
+
+def _text(value):
+    return '' if value is None else str(value).lower()
+
+
+_PREDICATES = {
+    'equal': lambda v, a: _compare(v, a[0]) == 0,
+    'not_equal': lambda v, a: _compare(v, a[0]) != 0,
+    'greater_than': lambda v, a: _compare(v, a[0]) == 1,
+    'greater_or_equal': lambda v, a: _compare(v, a[0]) in (0, 1),
+    'less_than': lambda v, a: _compare(v, a[0]) == -1,
+    'less_or_equal': lambda v, a: _compare(v, a[0]) in (-1, 0),
+    'between': lambda v, a: (_compare(v, a[0]) in (0, 1) and
+                             _compare(v, a[1]) in (-1, 0)),
+    'contains': lambda v, a: _text(a[0]) in _text(v),
+    'not_contains': lambda v, a: _text(a[0]) not in _text(v),
+    'starts_with': lambda v, a: _text(v).startswith(_text(a[0])),
+    'ends_with': lambda v, a: _text(v).endswith(_text(a[0])),
+    'empty': lambda v, a: v is None or v == '',
+    'not_empty': lambda v, a: not (v is None or v == ''),
+}
+
+GROUP_OPERATORS = ('in_any', 'not_in_any', 'in_all', 'not_in_all')
+OPERATORS = tuple(_PREDICATES) + GROUP_OPERATORS
+
+
+def _bits_to_mask(bits):
+    """Convert a bytearray of b'0'/b'1' (row 0 first) to an int mask."""
+    if not bits:
+        return 0
+    bits.reverse()
+    return int(bits, 2)
+
+
+class SubscriberSnapshot:
+
+    def __init__(self, subscribers, memberships=None):
+        """Initialize a SubscriberSnapshot object.
+
+        Column-oriented copy of subscribers: one list per attribute and per
+        custom field. Condition results are bit masks (Python ints, bit i
+        for row i) combined with ``&`` and ``|`` over all rows at once.
+        Masks of ``equal`` conditions and group memberships are computed
+        once and reused by every segment.
+
+        Parameters
+        ----------
+        subscribers : iterable
+            :class:`Subscriber`, e.g. a :class:`SubscriberIndex`
+        memberships : :class:`MembershipIndex` or dict, optional
+            subscriber id -> group ids, needed by group conditions
+
+        """
+        self.ids = []
+        self.columns = {name: [] for name in Subscriber._fields
+                        if name not in ('id', 'fields')}
+        custom = []
+        for subscriber in subscribers:
+            self.ids.append(subscriber.id)
+            for name, values in self.columns.items():
+                values.append(getattr(subscriber, name))
+            custom.append(field_values(subscriber))
+        keys = {key for fields in custom for key in fields}
+        for key in keys - set(self.columns):
+            self.columns[key] = [fields.get(key) for fields in custom]
+        self.columns['email'] = [normalize_email(e)
+                                 for e in self.columns['email']]
+
+        self.groups = None
+        if memberships is not None:
+            get = memberships.groups_of if hasattr(memberships, 'groups_of') \
+                else (lambda sid: memberships.get(sid, ()))
+            self.groups = [set(get(sid)) for sid in self.ids]
+
+        self.all = (1 << len(self.ids)) - 1
+        self._lock = threading.Lock()
+        self._value_masks = {}
+        self._group_masks = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, name):
+        """Return the values of an attribute or custom field."""
+        if name not in self.columns:
+            raise KeyError('Unknown column: {}'.format(name))
+        return self.columns[name]
+
+    def mask(self, predicate, name, args):
+        """Return the mask of the rows whose value verifies predicate."""
+        bits = bytearray(b'0' * len(self.ids))
+        for row, value in enumerate(self.column(name)):
+            if predicate(value, args):
+                bits[row] = 49  # ord('1')
+        return _bits_to_mask(bits)
+
+    def _rows_to_mask(self, rows):
+        if len(rows) * 64 < len(self.ids):  # sparse rows
+            mask = 0
+            for row in rows:
+                mask |= 1 << row
+            return mask
+        bits = bytearray(b'0' * len(self.ids))
+        for row in rows:
+            bits[row] = 49
+        return _bits_to_mask(bits)
+
+    def value_mask(self, name, value):
+        """Return the mask of the rows of a column equal to value.
+
+        Values are compared as lowercase strings. Rows of every distinct
+        value are indexed on the first call for a column, masks are built
+        (and cached) on demand.
+
+        """
+        with self._lock:
+            values = self._value_masks.get(name)
+            if values is None:
+                values = {}
+                for row, v in enumerate(self.column(name)):
+                    values.setdefault(_text(v), []).append(row)
+                self._value_masks[name] = values
+            key = _text(value)
+            mask = values.get(key, 0)
+            if isinstance(mask, list):
+                mask = values[key] = self._rows_to_mask(mask)
+            return mask
+
+    def group_mask(self, group_id):
+        """Return the mask of the members of a group."""
+        if self.groups is None:
+            raise ValueError('Group conditions need the memberships of the'
+                             ' snapshot')
+        with self._lock:
+            if self._group_masks is None:
+                self._group_masks = {}
+                for row, group_ids in enumerate(self.groups):
+                    for gid in group_ids:
+                        self._group_masks.setdefault(gid, []).append(row)
+            mask = self._group_masks.get(group_id, 0)
+            if isinstance(mask, list):
+                mask = self._group_masks[group_id] = self._rows_to_mask(mask)
+            return mask
+
+    def members(self, mask):
+        """Return the subscriber ids of a mask."""
+        bits = bin(mask)[:1:-1]
+        return [self.ids[row] for row, bit in enumerate(bits) if bit == '1']
+
+    @staticmethod
+    def count(mask):
+        """Return the number of rows of a mask."""
+        return bin(mask).count('1')
+
+
+def _operator(name):
+    for prefix in _FIELD_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    if name not in OPERATORS:
+        raise ValueError('Unknown operator {}, should be one of {}'
+                         .format(name, OPERATORS))
+    return name
+
+
+def _compile_condition(condition):
+    operator = _operator(condition['operator'])
+    column, *args = condition.get('args') or [None]
+
+    if operator in GROUP_OPERATORS:
+        group_ids = args[0] if args and isinstance(args[0], (list, tuple)) \
+            else args
+
+        def evaluate(snapshot):
+            selected = [snapshot.group_mask(int(gid)) for gid in group_ids]
+            if operator.endswith('any'):
+                mask = 0
+                for m in selected:
+                    mask |= m
+            else:
+                mask = snapshot.all
+                for m in selected:
+                    mask &= m
+            return snapshot.all & ~mask if operator.startswith('not') \
+                else mask
+        return evaluate
+
+    if operator in ('equal', 'not_equal') and _number(args[0]) is None:
+        # exact text match: reuse the masks of the column values
+        def evaluate(snapshot):
+            mask = snapshot.value_mask(column, args[0])
+            return snapshot.all & ~mask if operator == 'not_equal' else mask
+        return evaluate
+
+    predicate = _PREDICATES[operator]
+    return lambda snapshot: snapshot.mask(predicate, column, args)
+
+
+def compile_filter(segment_filter):
+    """Compile a segment filter into a function of a snapshot.
+
+    The filter follows the shape of ``Segment.filter``::
+
+        {'rules': [[condition, condition], [condition]]}
+
+    Conditions of an inner list are joined with OR, inner lists are joined
+    with AND. A condition is ``{'operator': ..., 'args': [column, value]}``
+    where column is a subscriber attribute (email, type, sent, ...) or a
+    custom field key, and ``{'operator': 'in_any', 'args': ['groups',
+    [group ids]]}`` for group memberships. The ``text_field_``,
+    ``number_field_`` and ``date_field_`` operator prefixes are accepted.
+    See :data:`OPERATORS` for the supported operators.
+
+    Parameters
+    ----------
+    segment_filter : dict, list or :class:`Segment`
+        the filter, its rules or a segment
+
+    Returns
+    -------
+    predicate : callable
+        takes a :class:`SubscriberSnapshot` and returns the mask of the
+        matching rows
+
+    """
+    if isinstance(segment_filter, Segment):
+        segment_filter = segment_filter.filter
+    rules = segment_filter.get('rules', []) \
+        if isinstance(segment_filter, dict) else segment_filter
+    clauses = [[_compile_condition(c) for c in
+                (clause if isinstance(clause, list) else [clause])]
+               for clause in rules or []]
+
+    def predicate(snapshot):
+        mask = snapshot.all
+        for conditions in clauses:
+            clause_mask = 0
+            for condition in conditions:
+                clause_mask |= condition(snapshot)
+            mask &= clause_mask
+            if not mask:
+                break
+        return mask
+
+    return predicate
+
+
+def evaluate_segments(segments, snapshot):
+    """Compute the members of many segments over a snapshot.
+
+    Parameters
+    ----------
+    segments : list or dict
+        :class:`Segment` objects, or a dict name -> filter
+    snapshot : :class:`SubscriberSnapshot`
+        the subscribers
+
+    Returns
+    -------
+    results : dict
+        segment id (or name) -> mask of the members, use
+        :meth:`SubscriberSnapshot.members` and
+        :meth:`SubscriberSnapshot.count` to read it
+
+    """
+    if isinstance(segments, dict):
+        items = segments.items()
+    else:
+        items = ((s.id, s) for s in segments)
+    return {key: compile_filter(f)(snapshot) for key, f in items}
@@ -0,0 +1,78 @@
+"""Coalesce identical in-flight calls into a single one."""
+
+import threading
+
+
+class _Call:
+
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+
+    def __init__(self):
+        """Initialize a SingleFlight object.
+
+        The first caller for a given key runs the function, callers arriving
+        with the same key while it is running wait and share its result (or
+        its exception). Results are shared, not copied: treat them as
+        read-only.
+
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` once for all concurrent callers.
+
+        Parameters
+        ----------
+        key : hashable
+            identify identical calls
+        func : callable
+            function to run
+
+        Returns
+        -------
+        result : object
+            the value returned by func
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Return the number of calls currently running."""
+        with self._lock:
+            return len(self._calls)
@@ -2,7 +2,10 @@
 
 from warnings import warn
 import mailerlite.client as client
-from mailerlite.constants import Subscriber, Activity, Group, Field
+from mailerlite.concurrency import map_concurrent
+from mailerlite.constants import Subscriber, Activity, Group, Field, \
+    BulkItem, ACTIVITY_TYPES
+from mailerlite.index import as_subscriber, field_values, same_value
 
 
 def get_id_or_email_identifier(**kwargs):
@@ -15,9 +18,56 @@ def get_id_or_email_identifier(**kwargs):
     return identifier
 
 
-class Subscribers:
+def subscriber_diff(current, data):
+    """Return the part of an update which would change a subscriber.
+
+    Parameters
+    ----------
+    current : :class:`Subscriber` or dict
+        current state of the subscriber
+    data : dict
+        desired state, same as :meth:`Subscribers.update`
+
+    Returns
+    -------
+    changes : dict
+        the keys of data whose value differs, and only the changed custom
+        fields. Empty if the update would change nothing. ``groups`` and
+        ``segments`` are always kept, ``resend_autoresponders`` only
+        if something else changes.
+
+    """
+    current = as_subscriber(current)
+    changes = {}
+    for key, value in data.items():
+        if key == 'fields':
+            fields = field_values(current)
+            changed = {k: v for k, v in (value or {}).items()
+                       if not same_value(v, fields.get(k))}
+            if changed:
+                changes['fields'] = changed
+        elif key in ('groups', 'segments'):
+            changes[key] = value
+        elif key != 'resend_autoresponders' and \
+                not same_value(value, getattr(current, key, None)):
+            changes[key] = value
+    if changes and 'resend_autoresponders' in data:
+        changes['resend_autoresponders'] = data['resend_autoresponders']
+    return changes
+
 
-    def __init__(self, headers):
+class Subscribers:
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_SUBSCRIBERS = client.UrlTemplate('subscribers')
+    URL_SUBSCRIBER = client.UrlTemplate('subscribers', '{}')
+    URL_COUNT = client.UrlTemplate('subscribers', 'count')
+    URL_SEARCH = client.UrlTemplate('subscribers', 'search')
+    URL_GROUPS = client.UrlTemplate('subscribers', '{}', 'groups')
+    URL_ACTIVITY = client.UrlTemplate('subscribers', '{}', 'activity')
+    URL_ACTIVITY_TYPE = client.UrlTemplate('subscribers', '{}', 'activity',
+                                           '{}')
+
+    def __init__(self, headers, validate=True):
         """Initialize Subscribers object.
 
         Parameters
@@ -25,11 +75,15 @@ class Subscribers:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
 
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
 
@@ -181,16 +235,14 @@ class Subscribers:
                                        'junk', 'unconfirmed']:
             params.update({'type': stype})
 
-        url = client.build_url('subscribers', **params)
+        url = self.URL_SUBSCRIBERS(**params)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        for res in res_json:
-            res['fields'] = [Field(**field) for field in res['fields']]
-
-        all_subscribers = [Subscriber(**res) for res in res_json]
+        all_subscribers = [Subscriber(**{**res, 'fields': [
+            Field(**field) for field in res['fields']]}) for res in res_json]
         return all_subscribers
 
     def count(self, stype=None, as_json=False):
@@ -224,7 +276,7 @@ class Subscribers:
                                        'junk', 'unconfirmed']:
             params.update({'type': stype})
 
-        url = client.build_url('subscribers', 'count', **params)
+        url = self.URL_COUNT(**params)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
@@ -253,15 +305,15 @@ class Subscribers:
         if path is None:
             raise IOError('An identifier must be define')
 
-        url = client.build_url('subscribers', path)
+        url = self.URL_SUBSCRIBER(path)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        res_json['fields'] = [Field(**res) for res in res_json['fields']]
+        fields = [Field(**res) for res in res_json['fields']]
 
-        return Subscriber(**res_json)
+        return Subscriber(**{**res_json, 'fields': fields})
 
     def delete(self, subscriber_id):
         """Remove a subscribers.
@@ -276,7 +328,7 @@ class Subscribers:
         success: bool
             deletion status
         """
-        url = client.build_url('subscribers', subscriber_id)
+        url = self.URL_SUBSCRIBER(subscriber_id)
         return client.delete(url, headers=self.headers)
 
     def search(self, search=None, limit=100, offset=0, minimized=True,
@@ -308,7 +360,7 @@ class Subscribers:
         params = {'limit': limit, 'offset': offset, 'minimized': minimized}
         if search is not None:
             params.update({'query': search})
-        url = client.build_url('subscribers', 'search', **params)
+        url = self.URL_SEARCH(**params)
 
         _, res_json = client.get(url, headers=self.headers)
 
@@ -316,8 +368,9 @@ class Subscribers:
             return res_json
 
         if not minimized:
-            for res in res_json:
-                res['fields'] = [Field(**field) for field in res['fields']]
+            res_json = [{**res, 'fields': [Field(**field)
+                                           for field in res['fields']]}
+                        for res in res_json]
 
         all_subscribers = [Subscriber(**res) for res in res_json]
         return all_subscribers
@@ -346,7 +399,7 @@ class Subscribers:
         if path is None:
             raise IOError('An identifier must be define')
 
-        url = client.build_url('subscribers', path, 'groups')
+        url = self.URL_GROUPS(path)
 
         _, res_json = client.get(url, headers=self.headers)
 
@@ -396,16 +449,13 @@ class Subscribers:
         if path is None:
             raise IOError('An identifier must be define')
 
-        args = ['subscribers', path, 'activity']
         if atype:
-            possible_atype = ['opens', 'clicks', 'junks', 'bounces',
-                              'unsubscribes', 'forwards', 'sendings']
-            if atype not in possible_atype:
+            if atype not in ACTIVITY_TYPES:
                 raise ValueError('Incorrect value atype. Activity type should'
-                                 ' be {0}'.format(possible_atype))
-            args.append(atype)
-
-        url = client.build_url(*args, **params)
+                                 ' be {0}'.format(ACTIVITY_TYPES))
+            url = self.URL_ACTIVITY_TYPE(path, atype, **params)
+        else:
+            url = self.URL_ACTIVITY(path, **params)
 
         _, res_json = client.get(url, headers=self.headers)
 
@@ -464,15 +514,15 @@ class Subscribers:
             raise ValueError("The following keys are unknown: {}"
                              .format(unknown_keys))
 
-        url = client.build_url('subscribers', path)
+        url = self.URL_SUBSCRIBER(path)
         _, res_json = client.put(url, body=data, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
-        res_json['fields'] = [Field(**res) for res in res_json['fields']]
+        fields = [Field(**res) for res in res_json['fields']]
 
-        return Subscriber(**res_json)
+        return Subscriber(**{**res_json, 'fields': fields})
 
     def create(self, data, as_json=False):
         """Add new single subscriber.
@@ -514,10 +564,105 @@ class Subscribers:
             raise ValueError("The following keys are unknown: {}"
                              .format(unknown_keys))
 
-        url = client.build_url('subscribers')
+        url = self.URL_SUBSCRIBERS()
         _, res_json = client.post(url, body=data, headers=self.headers)
 
         if as_json or not res_json:
             return res_json
 
         return Subscriber(**res_json)
+
+    def update_if_changed(self, data, current=None, as_json=False,
+                          index=None, **identifier):
+        """Update a subscriber, only sending what changed.
+
+        Parameters
+        ----------
+        data : dict
+            desired subscriber state, same as :meth:`update`
+        current : :class:`Subscriber`, optional
+            cached state of the subscriber. Taken from index, or fetched,
+            if not given.
+        as_json : bool
+            return result as json format
+        index : :class:`SubscriberIndex`, optional
+            cached subscribers, the fetched and updated subscriber is
+            written back to it
+        identifier : str
+            should be subscriber id or email.
+            e.g: id=1343965485 or email='demo@mailerlite.com'
+
+        Returns
+        -------
+        subscriber : :class:`Subscriber` or None
+            the updated subscriber, or None if nothing changed and no
+            request was sent
+
+        """
+        if current is None and index is not None:
+            current = index.get(**identifier)
+        if current is None:
+            current = self.get(**identifier)
+            if index is not None and current:
+                index.add(current)
+        changes = subscriber_diff(current, data)
+        if not changes:
+            return None
+        updated = self.update(changes, as_json=as_json, **identifier)
+        if index is not None and updated:
+            # the next sync compares with the updated state
+            index.add(updated)
+        return updated
+
+    def sync_profiles(self, profiles, index=None,
+                      max_workers=None):
+        """Update many subscribers, only sending what changed.
+
+        A failed update does not stop the others: every profile gets its
+        outcome in the returned :class:`BulkResult`.
+
+        Parameters
+        ----------
+        profiles : list of dict
+            desired subscriber states, each one with its ``email`` or
+            ``id`` and the keys accepted by :meth:`update`
+        index : :class:`SubscriberIndex`, optional
+            cached subscribers. Subscribers missing from it are fetched,
+            fetched and updated subscribers are written back to it.
+        max_workers : int, optional
+            maximum number of concurrent requests, default 8 or the
+            adaptive limiter maximum, see :func:`resolve_workers`
+
+        Returns
+        -------
+        result : :class:`BulkResult`
+            one item per profile, in order. The message of a successful
+            item is 'updated', its body the updated :class:`Subscriber`,
+            or 'unchanged' when no request was sent. ``result.retry()``
+            sends again the failed profiles only.
+
+        """
+        from mailerlite.bulk import BulkResult, item_from_error
+
+        def sync(item):
+            i, profile = item
+            data = dict(profile)
+            identifier = {k: data.pop(k) for k in ('id', 'email')
+                          if k in data}
+            try:
+                updated = self.update_if_changed(data, index=index,
+                                                 **identifier)
+            except (IOError, ValueError) as e:
+                return item_from_error(i, profile, e)
+            if updated is None:
+                return BulkItem(index=i, request=profile, ok=True,
+                                message='unchanged', retryable=False)
+            return BulkItem(index=i, request=profile, ok=True, status=200,
+                            body=updated, message='updated',
+                            retryable=False)
+
+        profiles = list(profiles)
+        items = map_concurrent(sync, list(enumerate(profiles)),
+                               max_workers=max_workers)
+        return BulkResult(items, send=lambda retried: self.sync_profiles(
+            retried, index=index, max_workers=max_workers))
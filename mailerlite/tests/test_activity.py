@@ -0,0 +1,140 @@
+"""Module to test the activity harvester."""
+import json
+import os
+
+import pytest
+
+from mailerlite.activity import ActivityHarvester
+
+
+class FakeSubscribers:
+
+    def __init__(self, activities, fail_after=None):
+        self.activities = activities
+        self.fail_after = fail_after
+        self.calls = []
+
+    def activity(self, as_json=False, atype=None, limit=100, offset=0,
+                 **identifier):
+        if self.fail_after is not None and \
+           len(self.calls) >= self.fail_after:
+            raise IOError('MailerLite is down')
+        subscriber = identifier.get('id') or identifier.get('email')
+        self.calls.append((subscriber, atype, offset))
+        rows = [{'type': atype, 'subject': 'campaign {}'.format(i),
+                 'date': '2020-01-01'}
+                for i in range(self.activities.get((subscriber, atype), 0))]
+        return rows[offset:offset + limit]
+
+
+class FakeApi:
+
+    def __init__(self, activities, fail_after=None):
+        self.subscribers = FakeSubscribers(activities, fail_after)
+
+
+ACTIVITIES = {(1, 'opens'): 5, (1, 'clicks'): 2,
+              ('demo@mailerlite.com', 'opens'): 3}
+
+
+def read_rows(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_activity_harvester(tmp_path):
+    path = str(tmp_path / 'activity.ndjson')
+    with pytest.raises(ValueError):
+        ActivityHarvester(FakeApi({}), path, atypes=['likes'])
+
+    api = FakeApi(ACTIVITIES)
+    harvester = ActivityHarvester(api, path, atypes=['opens', 'clicks'],
+                                  page_size=2, rate=1000)
+    assert harvester.run([1, 'demo@mailerlite.com']) == 10
+    rows = read_rows(path)
+    assert len(rows) == 10
+    assert rows[0]['subscriber'] in (1, 'demo@mailerlite.com')
+    assert set(rows[0]) == {'subscriber', 'date', 'report_id', 'subject',
+                            'campaign_name', 'type', 'campaign_id',
+                            'link_id', 'link', 'receiver', 'receiver_name',
+                            'receiver_email', 'sender', 'sender_name',
+                            'sender_email'}
+
+    # everything is done, nothing is fetched again
+    api.subscribers.calls.clear()
+    assert harvester.run([1, 'demo@mailerlite.com']) == 0
+    assert api.subscribers.calls == []
+    assert len(read_rows(path)) == 10
+
+
+def test_activity_harvester_resume(tmp_path):
+    path = str(tmp_path / 'activity.ndjson')
+    api = FakeApi(ACTIVITIES, fail_after=2)
+    harvester = ActivityHarvester(api, path, atypes=['opens'], page_size=2,
+                                  max_workers=1, checkpoint_every=1)
+    with pytest.raises(IOError):
+        harvester.run([1])
+    assert len(read_rows(path)) == 4
+
+    # rows written after the last checkpoint are dropped on resume
+    with open(path, 'a') as f:
+        f.write('{"partial": true}\n')
+
+    api = FakeApi(ACTIVITIES)
+    harvester = ActivityHarvester(api, path, atypes=['opens'], page_size=2,
+                                  max_workers=1)
+    assert harvester.run([1]) == 1
+    assert api.subscribers.calls == [(1, 'opens', 4)]
+    rows = read_rows(path)
+    assert [r['subject'] for r in rows] == \
+        ['campaign {}'.format(i) for i in range(5)]
+
+
+def test_activity_harvester_checkpoint_log(tmp_path):
+    path = str(tmp_path / 'activity.ndjson')
+    checkpoint = path + '.checkpoint'
+    api = FakeApi(ACTIVITIES, fail_after=4)
+    harvester = ActivityHarvester(api, path, atypes=['opens', 'clicks'],
+                                  page_size=2, max_workers=1,
+                                  checkpoint_every=1)
+    with pytest.raises(IOError):
+        harvester.run([1])
+    with open(checkpoint) as f:
+        records = [json.loads(line) for line in f]
+    # each record only holds the stream changed since the previous one
+    assert [r['streams'] for r in records] == [
+        {'1:opens': 2}, {'1:opens': 4}, {'1:opens': -1}, {'1:clicks': 2}]
+
+    # a torn record is ignored, the log is compacted on resume
+    with open(checkpoint, 'a') as f:
+        f.write('{"size": 1, "str')
+    api = FakeApi(ACTIVITIES)
+    harvester = ActivityHarvester(api, path, atypes=['opens', 'clicks'],
+                                  page_size=2, max_workers=1)
+    assert harvester.run([1, 2]) == 0
+    assert api.subscribers.calls == [(1, 'clicks', 2), (2, 'opens', 0),
+                                     (2, 'clicks', 0)]
+    assert len(read_rows(path)) == 7
+    with open(checkpoint) as f:
+        records = [json.loads(line) for line in f]
+    assert records[0]['streams'] == {'1:opens': -1, '1:clicks': 2}
+    assert records[-1]['streams'] == {'1:clicks': -1, '2:opens': -1,
+                                      '2:clicks': -1}
+
+
+def test_activity_harvester_output_missing(tmp_path):
+    path = str(tmp_path / 'activity.ndjson')
+    harvester = ActivityHarvester(FakeApi(ACTIVITIES, fail_after=2), path,
+                                  atypes=['opens'], page_size=2,
+                                  max_workers=1, checkpoint_every=1)
+    with pytest.raises(IOError):
+        harvester.run([1])
+
+    # resuming would pad a new output file with NUL bytes
+    os.remove(path)
+    api = FakeApi(ACTIVITIES)
+    harvester = ActivityHarvester(api, path, atypes=['opens'], page_size=2,
+                                  max_workers=1)
+    with pytest.raises(ValueError):
+        harvester.run([1])
+    assert api.subscribers.calls == []
@@ -1,9 +1,14 @@
 """Module to test API class."""
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+import responses
 
 from mailerlite import MailerLiteApi
-from mailerlite.constants import API_KEY_TEST
+from mailerlite.constants import API_KEY_TEST, MAILERLITE_API_V2_URL
+from mailerlite.subscriber import Subscribers
 
 
 @pytest.fixture
@@ -53,3 +58,42 @@ def test_api(header):
                       }
     res = api.batch(batch_requests)
     assert len(res) == 2
+
+
+def test_lazy_imports():
+    code = ('import sys, mailerlite; from mailerlite import MailerLiteApi; '
+            'print(sorted(m for m in sys.modules if m == "requests" or '
+            'm.startswith("mailerlite.")))')
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.decode().strip() == (
+        "['mailerlite.api', 'mailerlite.client', 'mailerlite.constants', "
+        "'mailerlite.exceptions']")
+
+
+@responses.activate
+def test_lazy_resources():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    api = MailerLiteApi('my-key')
+    assert len(responses.calls) == 1
+    assert 'subscribers' not in vars(api)
+    assert 'subscribers' in dir(api)
+
+    subscribers = api.subscribers
+    assert isinstance(subscribers, Subscribers)
+    assert subscribers.headers is api.headers
+    assert api.subscribers is subscribers
+    # the key was checked by the constructor only
+    assert len(responses.calls) == 1
+    assert hasattr(api, 'groups')
+    assert len(responses.calls) == 1
+    with pytest.raises(AttributeError):
+        api.unknown
+
+
+@responses.activate
+def test_lazy_resources_threads():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    api = MailerLiteApi('my-key')
+    with ThreadPoolExecutor(8) as executor:
+        groups = list(executor.map(lambda _: api.groups, range(32)))
+    assert all(g is groups[0] for g in groups)
@@ -0,0 +1,170 @@
+"""Module to test the per item results of the bulk endpoints."""
+import json
+
+import responses
+
+from mailerlite.api import MailerLiteApi
+from mailerlite.bulk import BulkResult, item_from_status, retry_failed
+from mailerlite.constants import MAILERLITE_API_V2_URL
+from mailerlite.group import Groups
+
+HEADERS = {'content-type': 'application/json',
+           'x-mailerlite-apikey': 'my-key'}
+
+
+def _api():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    return MailerLiteApi('my-key')
+
+
+def test_item_from_status():
+    item = item_from_status(0, {'path': 'x'}, 200, {'id': 1})
+    assert item.ok and not item.retryable
+
+    item = item_from_status(1, {}, 422, {'error': {'code': 123,
+                                                   'message': 'bad'}})
+    assert not item.ok and not item.retryable
+    assert (item.code, item.message) == (123, 'bad')
+    assert item_from_status(2, {}, 503).retryable
+    assert item_from_status(3, {}, 429).retryable
+    item = item_from_status(4, {}, None)
+    assert item.message and item.status is None and item.retryable
+
+
+def test_retry_failed():
+    result = BulkResult([item_from_status(0, 'a', 200),
+                         item_from_status(1, 'b', 503),
+                         item_from_status(2, 'c', 422),
+                         item_from_status(3, 'd', 500)])
+    assert result.errors() == {503: 1, 422: 1, 500: 1}
+    assert [i.index for i in result.retryable] == [1, 3]
+
+    sent, waits = [], []
+
+    def send(requests):
+        sent.append(requests)
+        return BulkResult([item_from_status(i, r, 200 if r == 'b' else 500)
+                           for i, r in enumerate(requests)])
+
+    result = retry_failed(result, send, attempts=2, sleep=waits.append)
+    assert sent == [['b', 'd'], ['d']]
+    assert waits == [1., 2.]
+    assert [i.index for i in result.failed] == [2, 3]
+    assert result[1].ok and result[1].request == 'b'
+
+    result = result.retry(retryable_only=False, attempts=1, delay=0)
+    assert sent[-1] == ['c', 'd']
+
+    # a long Retry-After is capped
+    result = BulkResult([item_from_status(0, 'a', 429)._replace(
+        retry_after=1e9)])
+    retry_failed(result, send, attempts=1, max_delay=60,
+                 sleep=waits.append)
+    assert waits[-1] == 60
+
+
+@responses.activate
+def test_batch_results():
+    api = _api()
+    url = MAILERLITE_API_V2_URL + 'batch'
+    responses.add(responses.POST, url, json={'responses': [
+        {'code': 200, 'body': {'id': 1}},
+        {'code': 422, 'body': {'error': {'code': 123, 'message': 'bad'}}},
+        {'code': 500, 'body': {'error': {'message': 'oops'}}}]})
+    responses.add(responses.POST, url, json={'responses': [
+        {'code': 200, 'body': {'id': 3}}]})
+    requests = [{'method': 'GET', 'path': '/api/v2/groups/%d' % i}
+                for i in range(3)]
+
+    result = api.batch_results({'requests': requests})
+    assert not result.ok
+    assert [i.ok for i in result] == [True, False, False]
+    assert result[1].code == 123 and not result[1].retryable
+    assert result[2].message == 'oops' and result[2].retryable
+
+    result = result.retry(delay=0)
+    assert json.loads(responses.calls[-1].request.body) == \
+        {'requests': [requests[2]]}
+    assert [i.ok for i in result] == [True, False, True]
+    assert result[2].body == {'id': 3}
+
+
+@responses.activate
+def test_batch_results_chunks():
+    api = _api()
+    url = MAILERLITE_API_V2_URL + 'batch'
+    responses.add(responses.POST, url, json={'responses': [
+        {'code': 200, 'body': {}}] * 2})
+    responses.add(responses.POST, url, status=429,
+                  headers={'Retry-After': '3'}, json={})
+    requests = [{'method': 'GET', 'path': str(i)} for i in range(3)]
+
+    result = api.batch_results(requests, chunk_size=2)
+    assert len(responses.calls) == 3
+    assert [i.status for i in result] == [200, 200, 429]
+    assert result[2].retryable and result[2].retry_after == 3.
+
+
+@responses.activate
+def test_add_subscribers_results():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    groups = Groups(HEADERS)
+    url = MAILERLITE_API_V2_URL + 'groups/1/subscribers/import'
+    responses.add(responses.POST, url, json={
+        'imported': [{'id': 1, 'email': 'a@x.com'}],
+        'updated': [{'id': 2, 'email': 'b@x.com'}],
+        'unchanged': [],
+        'errors': [{'email': 'C@x.com', 'message': 'invalid domain'}]})
+    data = [{'email': 'a@x.com', 'name': 'a'},
+            {'email': 'b@x.com', 'name': 'b'},
+            {'email': 'no-name@x.com'},
+            {'email': 'c@x.com', 'name': 'c'}]
+
+    result = groups.add_subscribers_results(1, data)
+    body = json.loads(responses.calls[-1].request.body)
+    assert [s['email'] for s in body['subscribers']] == \
+        ['a@x.com', 'b@x.com', 'c@x.com']
+    assert [i.message for i in result.succeeded] == ['imported', 'updated']
+    assert [(i.index, i.status) for i in result.failed] == [(2, None),
+                                                            (3, 422)]
+    assert result[3].message == 'invalid domain'
+    assert result[3].request == data[3]
+    assert not result.retryable
+
+
+@responses.activate
+def test_add_subscribers_results_not_listed():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    groups = Groups(HEADERS)
+    url = MAILERLITE_API_V2_URL + 'groups/1/subscribers/import'
+    responses.add(responses.POST, url, json={
+        'imported': [{'id': 1, 'email': 'a@x.com'}]})
+    responses.add(responses.POST, url, json={
+        'unchanged': [{'id': 2, 'email': 'b@x.com'}]})
+
+    result = groups.add_subscribers_results(1, [
+        {'email': 'a@x.com', 'name': 'a'}, {'email': 'b@x.com', 'name': 'b'}])
+    assert [i.ok for i in result] == [True, False]
+    assert result[1].status is None and result[1].retryable
+    assert result[1].message == 'not listed in the import response'
+
+    result = result.retry(delay=0)
+    assert json.loads(responses.calls[-1].request.body)['subscribers'] == \
+        [{'email': 'b@x.com', 'name': 'b'}]
+    assert result.ok
+
+
+@responses.activate
+def test_add_subscribers_results_error():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    groups = Groups(HEADERS)
+    url = MAILERLITE_API_V2_URL + 'groups/1/subscribers/import'
+    responses.add(responses.POST, url, status=502, json={})
+    responses.add(responses.POST, url, json={'imported': [
+        {'email': 'a@x.com'}]})
+
+    result = groups.add_subscribers_results(1, {'email': 'a@x.com',
+                                                'name': 'a'})
+    assert result[0].status == 502 and result[0].retryable
+    result = result.retry(delay=0)
+    assert result.ok
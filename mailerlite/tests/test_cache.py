@@ -0,0 +1,90 @@
+"""Module to test the response cache."""
+import pytest
+import responses
+
+import mailerlite.client as client
+from mailerlite.cache import ResponseCache
+from mailerlite.constants import API_KEY_TEST, MAILERLITE_API_V2_URL, Group
+from mailerlite.group import Groups
+
+
+@pytest.fixture
+def header():
+    headers = {'content-type': "application/json",
+               'X-MailerLite-ApiDocs': "true",
+               'x-mailerlite-apikey': API_KEY_TEST
+               }
+    return headers
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_response_cache():
+    clock = FakeClock()
+    cache = ResponseCache(maxsize=2, ttl=10, clock=clock)
+    assert not cache.store('a', 200, [1], {})
+    assert cache.store('a', 200, [1], {'ETag': '"abc"'})
+    entry, fresh = cache.lookup('a')
+    assert fresh
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"abc"'}
+
+    clock.now = 11
+    entry, fresh = cache.lookup('a')
+    assert not fresh
+    cache.refresh(entry)
+    assert cache.lookup('a')[1]
+
+    cache.store('b', 200, [2], {'Last-Modified': 'yesterday'})
+    cache.store('c', 200, [3], {'ETag': '"c"'})
+    assert len(cache) == 2
+    assert cache.lookup('a') == (None, False)
+
+    body = cache.lookup('b')[0].body
+    records = cache.decode('b', body, lambda js: [str(v) for v in js])
+    assert cache.decode('b', body, None) == records
+    assert cache.decode('b', [2], lambda js: 'decoded') == 'decoded'
+
+    cache.invalidate('b')
+    assert len(cache) == 1
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.stats()['revalidated'] == 1
+
+
+@responses.activate
+def test_conditional_requests(header):
+    url = MAILERLITE_API_V2_URL + 'groups'
+    groups_json = [{'id': 1, 'name': 'group 1'}, {'id': 2, 'name': 'group 2'}]
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add(responses.GET, url, json=groups_json,
+                  headers={'ETag': '"v1"'})
+    responses.add(responses.GET, url, status=304)
+
+    cache = ResponseCache()
+    previous = client.set_response_cache(cache)
+    try:
+        assert client.get_response_cache() is cache
+        groups = Groups(header)
+        first = groups.all()
+        second = groups.all()
+    finally:
+        client.set_response_cache(previous)
+
+    assert all(isinstance(g, Group) for g in second)
+    # records are reused, not decoded again
+    assert first is not second
+    assert first[0] is second[0]
+
+    group_calls = [c for c in responses.calls
+                   if c.request.url.startswith(url)]
+    assert len(group_calls) == 2
+    assert 'If-None-Match' not in group_calls[0].request.headers
+    assert group_calls[1].request.headers['If-None-Match'] == '"v1"'
+    assert cache.stats()['revalidated'] == 1
@@ -0,0 +1,128 @@
+"""Module to test the campaign statistics pipeline."""
+import pytest
+
+from mailerlite.campaign_stats import CampaignStats, period_key
+from mailerlite.constants import CampaignRollup
+
+
+def campaign(cid, date, recipients, opened, clicked, **kwargs):
+    return {'id': cid, 'date_send': date, 'total_recipients': recipients,
+            'opened': {'count': opened, 'rate': 0},
+            'clicked': {'count': clicked, 'rate': 0}, 'type': 'regular',
+            **kwargs}
+
+
+class FakeCampaigns:
+
+    def __init__(self):
+        self.data = {'sent': [], 'draft': [], 'outbox': []}
+        self.calls = []
+
+    def all(self, status='sent', limit=100, offset=0, order='asc',
+            as_json=False):
+        self.calls.append((status, offset, order))
+        campaigns = self.data[status]
+        if order == 'desc':
+            campaigns = campaigns[::-1]
+        return campaigns[offset:offset + limit]
+
+
+class FakeApi:
+
+    def __init__(self):
+        self.campaigns = FakeCampaigns()
+
+
+def test_period_key():
+    date = '2020-05-03 10:12:54'
+    assert period_key(date, 'day') == '2020-05-03'
+    assert period_key(date, 'week') == '2020-W18'
+    assert period_key(date, 'month') == '2020-05'
+    assert period_key(date, 'year') == '2020'
+    assert period_key(date, 'all') == 'all'
+    assert period_key(None) is None
+    with pytest.raises(ValueError):
+        period_key(date, 'century')
+
+
+def test_campaign_stats():
+    api = FakeApi()
+    api.campaigns.data['sent'] = [
+        campaign(1, '2020-01-10 10:00:00', 100, 50, 10, groups=[7, 8]),
+        campaign(2, '2020-01-20 10:00:00', 100, 30, 5, groups=[7]),
+        campaign(3, '2020-02-01 10:00:00', 200, 20, 2, groups=[8]),
+    ]
+    api.campaigns.data['draft'] = [
+        {'id': 4, 'date_created': '2020-03-01 10:00:00', 'opened': None,
+         'clicked': None, 'total_recipients': 0}]
+
+    with pytest.raises(ValueError):
+        CampaignStats(api, statuses=('archived',))
+
+    stats = CampaignStats(api, page_size=2)
+    assert stats.refresh() == 4
+    assert len(stats) == 4
+    with pytest.raises(ValueError):
+        stats.rollup(period='century')
+
+    monthly = stats.rollup()
+    assert monthly[0] == CampaignRollup('2020-01', 2, 200, 80, 15, 0.4,
+                                        0.075)
+    assert [r.key for r in monthly] == ['2020-01', '2020-02', '2020-03']
+
+    by_status = stats.rollup(period='all', by='status')
+    assert {r.key: r.campaigns for r in by_status} == \
+        {('all', 'sent'): 3, ('all', 'draft'): 1}
+
+    by_group = {r.key: r.recipients for r in
+                stats.rollup(period='year', by='groups')}
+    assert by_group == {('2020', 7): 200, ('2020', 8): 300,
+                        ('2020', None): 0}
+
+    # a new campaign is sent, the draft is deleted, opens are updated
+    api.campaigns.data['sent'].append(
+        campaign(5, '2020-02-15 10:00:00', 100, 60, 6, groups=[7]))
+    api.campaigns.data['draft'] = []
+    api.campaigns.calls.clear()
+    assert stats.refresh() == 2
+    # only the newest page of sent campaigns is fetched again
+    assert [c for c in api.campaigns.calls if c[0] == 'sent'] == \
+        [('sent', 0, 'desc'), ('sent', 2, 'desc')]
+
+    monthly = {r.key: r for r in stats.rollup()}
+    assert '2020-03' not in monthly
+    assert monthly['2020-02'].campaigns == 2
+    assert monthly['2020-02'].opened == 80
+
+    api.campaigns.data['sent'][0] = campaign(1, '2020-01-10 10:00:00',
+                                             100, 70, 10, groups=[7, 8])
+    assert stats.refresh(full=True) == 1
+    assert stats.rollup()[0].opened == 100
+    by_group = {r.key: r.opened for r in
+                stats.rollup(period='year', by='groups')}
+    assert by_group == {('2020', 7): 160, ('2020', 8): 90}
+
+
+def test_campaign_stats_window():
+    api = FakeApi()
+    api.campaigns.data['sent'] = [
+        campaign(i, '2020-01-0{} 10:00:00'.format(i), 100, i, 0)
+        for i in range(1, 7)]
+    # now is 2020-01-07 10:00:00 UTC
+    stats = CampaignStats(api, statuses=('sent',), page_size=2, window=0,
+                          clock=lambda: 1578391200.)
+    assert stats.refresh() == 6
+
+    # campaign 3 still gets opens, only the newest page is fetched
+    api.campaigns.data['sent'][2] = campaign(3, '2020-01-03 10:00:00', 100,
+                                             90, 0)
+    api.campaigns.calls.clear()
+    assert stats.refresh() == 0
+    assert [c[1] for c in api.campaigns.calls] == [0]
+
+    # unless it was sent within the window
+    stats.window = 3 * 86400
+    api.campaigns.calls.clear()
+    assert stats.refresh() == 1
+    assert [c[1] for c in api.campaigns.calls] == [0, 2, 4]
+    assert stats.rollup(period='all')[0].opened == 108
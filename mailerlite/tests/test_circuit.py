@@ -0,0 +1,173 @@
+"""Module to test the circuit breaker."""
+import pytest
+import responses
+
+import mailerlite.client as client
+from mailerlite.circuit import (CircuitBreaker, CircuitOpenError, CLOSED,
+                                OPEN, HALF_OPEN)
+from mailerlite.constants import MAILERLITE_API_V2_URL
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def breaker():
+    clock = FakeClock()
+    cb = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4,
+                        reset_timeout=10, clock=clock)
+    cb.clock = clock
+    return cb
+
+
+def test_circuit_breaker_errors():
+    with pytest.raises(ValueError):
+        CircuitBreaker(failure_rate=0)
+    with pytest.raises(ValueError):
+        CircuitBreaker(window=5, min_calls=10)
+
+
+def test_circuit_breaker_states(breaker):
+    transitions = []
+    breaker.on_state_change = lambda old, new: transitions.append(new)
+
+    assert breaker.state == CLOSED
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    # not enough calls yet
+    assert breaker.state == CLOSED
+
+    breaker.record_status(200)
+    breaker.record_status(503)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_request()
+    assert e.value.retry_after == 10
+    assert breaker.stats()['rejected'] == 1
+
+    breaker.clock.now = 10
+    assert breaker.state == HALF_OPEN
+    breaker.before_request()
+    # only a single trial call is allowed
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.clock.now = 25
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()['calls'] == 0
+    assert transitions == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+    breaker.record_status(404)
+    breaker.record_status(429)
+    stats = breaker.stats()
+    assert stats['failures'] == 1
+    assert stats['failure_rate'] == 0.5
+
+    breaker.reset()
+    assert breaker.state == CLOSED
+
+
+@responses.activate
+def test_make_request_with_circuit_breaker(breaker):
+    url = MAILERLITE_API_V2_URL + 'stats'
+    responses.add(responses.GET, url, status=500, json={})
+    previous = client.set_circuit_breaker(breaker)
+    try:
+        assert client.get_circuit_breaker() is breaker
+        for _ in range(4):
+            with pytest.raises(IOError):
+                client.get('stats')
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpenError):
+            client.get('stats')
+        assert len(responses.calls) == 4
+    finally:
+        client.set_circuit_breaker(previous)
+
+
+def test_circuit_breaker_tokens(breaker):
+    stale = breaker.before_request()
+    for _ in range(4):
+        breaker.record_failure(breaker.before_request())
+    assert breaker.state == OPEN
+
+    breaker.clock.now = 10
+    trial = breaker.before_request()
+    # a success sent before the circuit opened does not close it
+    breaker.record_success(stale)
+    assert breaker.state == HALF_OPEN
+    # an interrupted trial gives its slot back
+    breaker.release(trial)
+    trial = breaker.before_request()
+    breaker.record_status(200, trial)
+    assert breaker.state == CLOSED
+
+
+def test_circuit_breaker_callback_reads_breaker():
+    seen = []
+    cb = CircuitBreaker(min_calls=1, window=1,
+                        on_state_change=lambda old, new: seen.append(
+                            (new, cb.stats()['state'], cb.state)))
+    cb.record_failure()
+    assert seen == [(OPEN, OPEN, OPEN)]
+    cb.reset()
+    assert seen[-1] == (CLOSED, CLOSED, CLOSED)
+
+
+@responses.activate
+def test_make_request_interrupted_trial(breaker):
+    url = MAILERLITE_API_V2_URL + 'stats'
+    responses.add(responses.GET, url, body=TypeError('boom'))
+    responses.add(responses.GET, url, json={})
+    previous = client.set_circuit_breaker(breaker)
+    try:
+        for _ in range(4):
+            breaker.record_failure()
+        breaker.clock.now = 10
+        with pytest.raises(TypeError):
+            client.get('stats')
+        assert breaker.state == HALF_OPEN
+        # the trial slot was released, the next call is let through
+        client.get('stats')
+        assert breaker.state == CLOSED
+    finally:
+        client.set_circuit_breaker(previous)
+
+
+def test_make_request_interrupted_limiter(breaker):
+    class Limiter:
+        released = 0
+
+        def acquire(self):
+            raise KeyboardInterrupt
+
+        def release(self):
+            self.released += 1
+
+    for _ in range(4):
+        breaker.record_failure()
+    breaker.clock.now = 10
+    previous = client.set_circuit_breaker(breaker)
+    previous_limiter = client.set_adaptive_limiter(Limiter())
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            client.get('stats')
+    finally:
+        limiter = client.set_adaptive_limiter(previous_limiter)
+        client.set_circuit_breaker(previous)
+    assert limiter.released == 0
+    # the only trial slot is still free
+    breaker.record_success(breaker.before_request())
+    assert breaker.state == CLOSED
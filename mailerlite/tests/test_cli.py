@@ -0,0 +1,240 @@
+"""Module to test the command line interface."""
+import csv
+import json
+import os
+
+import pytest
+import responses
+
+from mailerlite.cli import export, main, resolve_columns, import_file
+from mailerlite.constants import MAILERLITE_API_V2_URL, Field
+
+RECORDS = [{'id': i, 'email': 'user{}@mailerlite.com'.format(i),
+            'fields': [{'key': 'n', 'value': i}]} for i in range(23)]
+
+
+class Listing:
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.offsets = []
+
+    def __call__(self, limit=100, offset=0, as_json=False, stype=None):
+        if offset == self.fail_at:
+            raise IOError('boom')
+        self.offsets.append(offset)
+        return RECORDS[offset:offset + limit]
+
+
+def _listing(records):
+    return lambda limit, offset, as_json: records[offset:offset + limit]
+
+
+def test_export_ndjson(tmp_path):
+    path = str(tmp_path / 'out.ndjson')
+    seen = []
+    assert export(Listing(), path, page_size=5, max_workers=2,
+                  progress=seen.append) == 23
+    with open(path) as f:
+        assert [json.loads(line) for line in f] == RECORDS
+    assert seen == [10, 20, 23]
+    with pytest.raises(ValueError):
+        export(Listing(), path, fmt='xml')
+    with pytest.raises(ValueError):
+        export(Listing(), path, fmt='parquet', checkpoint=path + '.ckpt')
+
+
+def test_export_csv_resume(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    checkpoint = path + '.checkpoint'
+    with pytest.raises(IOError):
+        export(Listing(fail_at=15), path, fmt='csv', page_size=5,
+               max_workers=2, checkpoint=checkpoint)
+    assert json.load(open(checkpoint))['offset'] == 10
+
+    listing = Listing()
+    assert export(listing, path, fmt='csv', page_size=5, max_workers=2,
+                  checkpoint=checkpoint) == 23
+    assert min(listing.offsets) == 10
+    assert not os.path.exists(checkpoint)
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [int(r['id']) for r in rows] == list(range(23))
+    assert json.loads(rows[3]['fields']) == RECORDS[3]['fields']
+
+
+def test_export_resume_output_truncated(tmp_path):
+    path = str(tmp_path / 'out.ndjson')
+    checkpoint = path + '.checkpoint'
+    with pytest.raises(IOError):
+        export(Listing(fail_at=15), path, page_size=5, max_workers=2,
+               checkpoint=checkpoint)
+    with open(path, 'w'):
+        pass
+
+    listing = Listing()
+    with pytest.raises(ValueError):
+        export(listing, path, page_size=5, checkpoint=checkpoint)
+    assert listing.offsets == []
+
+
+def test_export_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'out.parquet')
+    assert export(Listing(), path, fmt='parquet', page_size=10) == 23
+    assert pq.read_table(path).num_rows == 23
+
+
+def test_export_parquet_null_first_page(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'out.parquet')
+    records = [{'id': i, 'date_unsubscribe': None if i < 5 else '2024-01-01',
+                'fields': [{'key': 'n', 'value': i}]} for i in range(8)]
+    assert export(_listing(records), path, fmt='parquet', page_size=5) == 8
+    table = pq.read_table(path)
+    assert table.column('date_unsubscribe').to_pylist() == \
+        [None] * 5 + ['2024-01-01'] * 3
+    assert table.column('id').to_pylist()[:2] == ['0', '1']
+
+
+def test_export_csv_columns(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    records = [{'id': 1}, {'id': 2, 'name': 'b'}]
+    assert export(_listing(records), path, fmt='csv', page_size=5) == 2
+    with open(path, newline='') as f:
+        assert list(csv.DictReader(f)) == [{'id': '1', 'name': ''},
+                                           {'id': '2', 'name': 'b'}]
+
+    # nothing to export, no empty header
+    assert export(_listing([]), path, fmt='csv') == 0
+    assert open(path).read() == ''
+
+    # keys missing from the header are not silently dropped
+    with pytest.raises(ValueError):
+        export(_listing(records), path, fmt='csv', page_size=1)
+    assert export(_listing(records), path, fmt='csv', page_size=1,
+                  max_workers=1, columns=['id', 'name']) == 2
+
+
+@responses.activate
+def test_main(tmp_path, capsys):
+    path = str(tmp_path / 'out.ndjson')
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'groups/3/'
+                  'subscribers', json=RECORDS[:2])
+    assert main(['--api-key', 'key', 'export', 'group-subscribers',
+                 '--group-id', '3', '-o', path, '--page-size', '5']) == 0
+    assert len(open(path).readlines()) == 2
+    assert 'exported 2 records' in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(['--api-key', 'key', 'export', 'group-subscribers', '-o',
+              path])
+
+
+@responses.activate
+def test_main_segments(tmp_path):
+    path = str(tmp_path / 'segments.csv')
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'segments', json={
+        'data': [{'id': 1, 'title': 'vip'}, {'id': 2, 'title': 'new'}],
+        'meta': {}})
+    assert main(['--api-key', 'key', 'export', 'segments', '-o', path,
+                 '-f', 'csv', '--page-size', '5']) == 0
+    with open(path, newline='') as f:
+        assert [r['title'] for r in csv.DictReader(f)] == ['vip', 'new']
+
+
+def test_resolve_columns():
+    fields = [Field(key='email', title='Email'), Field(key='name'),
+              Field(key='company', title='Company name')]
+    assert resolve_columns(['E-mail', 'Company Name', 'name'], fields,
+                           mapping={'E-mail': 'email'}) == \
+        {'E-mail': 'email', 'Company Name': 'company', 'name': 'name'}
+    with pytest.raises(ValueError):
+        resolve_columns(['email', 'age'], fields)
+    assert resolve_columns(['email', 'age'], fields,
+                           skip_unknown=True) == {'email': 'email'}
+    with pytest.raises(ValueError):
+        resolve_columns(['name'], fields)
+    with pytest.raises(ValueError):
+        resolve_columns(['email'], fields, mapping={'mail': 'email'})
+
+
+class ImportApi:
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.fields = self
+        self.groups = self
+        self.imported = []
+
+    def all(self):
+        return [Field(key='email', title='Email'), Field(key='name'),
+                Field(key='city', title='City')]
+
+    def add_subscribers(self, group_id, subscribers, resubscribe=False,
+                        autoresponders=False, as_json=False):
+        if subscribers[0]['email'] == self.fail_at:
+            raise IOError('boom')
+        self.imported.extend(subscribers)
+        return {'imported': subscribers}
+
+
+def test_import_file(tmp_path):
+    path = str(tmp_path / 'people.csv')
+    journal = path + '.journal'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Email', 'Name', 'City'])
+        for i in range(23):
+            writer.writerow(['user{}@mailerlite.com'.format(i) if i != 7
+                             else '', 'User {}'.format(i),
+                             'Paris' if i % 2 else ''])
+
+    api = ImportApi(fail_at='user15@mailerlite.com')
+    with pytest.raises(IOError):
+        import_file(api, 1, path, chunk_size=5, max_workers=2,
+                    journal=journal)
+    # chunks 0 to 2 are acknowledged, the one of user 7 has no email
+    assert len(api.imported) == 14
+
+    api = ImportApi()
+    seen = []
+    assert import_file(api, 1, path, chunk_size=5, max_workers=2,
+                       journal=journal, progress=seen.append) == (8, 0)
+    assert api.imported[0] == {'email': 'user15@mailerlite.com',
+                               'name': 'User 15', 'fields': {'city': 'Paris'}}
+    assert seen == [8]
+    # everything is acknowledged, nothing is sent again
+    assert import_file(ImportApi(), 1, path, chunk_size=5,
+                       journal=journal) == (0, 0)
+
+    # the journal belongs to this file and chunk size
+    with pytest.raises(ValueError):
+        import_file(ImportApi(), 1, path, chunk_size=10, journal=journal)
+    with open(path, 'a', newline='') as f:
+        csv.writer(f).writerow(['late@mailerlite.com', 'Late', ''])
+    with pytest.raises(ValueError):
+        import_file(ImportApi(), 1, path, chunk_size=5, journal=journal)
+
+
+def test_import_ndjson(tmp_path):
+    path = str(tmp_path / 'people.ndjson')
+    with open(path, 'w') as f:
+        f.write(json.dumps({'mail': 'a@mailerlite.com', 'town': 'Lyon'}))
+        f.write('\n\n')
+    api = ImportApi()
+    assert import_file(api, 1, path, mapping={'mail': 'email',
+                                              'town': 'city'}) == (1, 0)
+    assert api.imported == [{'email': 'a@mailerlite.com', 'name': '',
+                             'fields': {'city': 'Lyon'}}]
+
+
+def test_import_ndjson_later_keys(tmp_path):
+    path = str(tmp_path / 'people.ndjson')
+    with open(path, 'w') as f:
+        f.write(json.dumps({'email': 'a@mailerlite.com'}) + '\n')
+        f.write(json.dumps({'email': 'b@mailerlite.com', 'city': 'Lyon'}))
+    api = ImportApi()
+    assert import_file(api, 1, path) == (2, 0)
+    assert api.imported[1]['fields'] == {'city': 'Lyon'}
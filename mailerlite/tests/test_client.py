@@ -1,6 +1,10 @@
 """Module to test client."""
+import pytest
+import responses
+
 import mailerlite.client as client
-from mailerlite.constants import API_KEY_TEST
+from mailerlite.cache import ResponseCache
+from mailerlite.constants import API_KEY_TEST, MAILERLITE_API_V2_URL
 
 
 def test_build_url():
@@ -13,6 +17,36 @@ def test_build_url():
     res = client.build_url('test', 125, id='my_id', value=123)
     assert res == 'test/125?id=my_id&value=123'
 
+    res = client.build_url('test', filters=['a', 'b'])
+    assert res == 'test?filters=%5B%27a%27%2C+%27b%27%5D'
+
+
+def test_encode_query_value_types():
+    # equal values of different types share no cache entry
+    assert client.encode_query({'limit': 1, 'minimized': True}) == \
+        'limit=1&minimized=True'
+    assert client.encode_query({'limit': True, 'minimized': 1}) == \
+        'limit=True&minimized=1'
+    assert client.encode_query({'limit': 1.0}) == 'limit=1.0'
+
+
+def test_url_template():
+    template = client.UrlTemplate('groups', '{}', 'subscribers')
+    assert template(12) == client.build_url('groups', 12, 'subscribers')
+    assert template(12, limit=10, offset=0) == \
+        client.build_url('groups', 12, 'subscribers', limit=10, offset=0)
+    assert client.UrlTemplate('stats')() == 'stats'
+    assert repr(template) == "UrlTemplate('groups/{}/subscribers')"
+
+
+def test_absolute_url():
+    assert client.absolute_url('groups/1') == \
+        MAILERLITE_API_V2_URL + 'groups/1'
+    assert client.absolute_url('/api/v2/groups') == \
+        MAILERLITE_API_V2_URL + 'groups'
+    assert client.absolute_url('https://example.com/x') == \
+        'https://example.com/x'
+
 
 def test_check_headers():
 
@@ -44,3 +78,60 @@ def test_check_headers():
         assert not msg
     except Exception:
         return
+
+
+@responses.activate
+def test_response_envelope():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'groups',
+                  json=[{'id': 1}], headers={'X-RateLimit-Remaining': '119',
+                                             'X-RateLimit-Reset': '30',
+                                             'X-Request-Id': 'abc',
+                                             'ETag': '"v1"'})
+    responses.add(responses.DELETE, MAILERLITE_API_V2_URL + 'groups/1',
+                  status=204)
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'groups/2',
+                  status=404, json={'error': {'message': 'Not found'}})
+    seen = []
+    client.add_response_listener(seen.append)
+    try:
+        result, response = client.with_response(client.get, 'groups')
+        assert result == (200, [{'id': 1}])
+        assert response.status == 200
+        assert response.body == [{'id': 1}]
+        assert response.rate_limit_remaining == 119
+        assert response.rate_limit_reset == 30
+        assert response.request_id == 'abc'
+        assert response.bytes == len(b'[{"id": 1}]')
+        assert response.elapsed >= 0
+        assert response.url == MAILERLITE_API_V2_URL + 'groups'
+        assert response.method == 'GET'
+        assert not response.cached
+
+        result, response = client.with_response(client.delete, 'groups/1')
+        assert result is None
+        assert response.status == 204
+
+        with pytest.raises(IOError):
+            client.get('groups/2')
+        assert client.last_response().status == 404
+        assert [r.status for r in seen] == [200, 204, 404]
+
+        assert client.with_response(len, []) == (0, None)
+    finally:
+        client.remove_response_listener(seen.append)
+
+
+@responses.activate
+def test_response_envelope_cached():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'fields',
+                  json=[], headers={'ETag': '"v1"'})
+    previous = client.set_response_cache(ResponseCache(ttl=60))
+    try:
+        client.get('fields')
+        _, response = client.with_response(client.get, 'fields')
+        assert response.cached
+        assert response.status == 200
+        assert response.bytes == 0
+        assert len(responses.calls) == 1
+    finally:
+        client.set_response_cache(previous)
@@ -0,0 +1,71 @@
+"""Module to test compression negotiation."""
+import gzip
+import json
+
+import responses
+
+import mailerlite.client as client
+from mailerlite.compression import Compression
+from mailerlite.constants import MAILERLITE_API_V2_URL
+
+
+def test_compression_encode():
+    compression = Compression(threshold=100)
+    base = MAILERLITE_API_V2_URL
+    assert not compression.should_compress(base + 'batch', 99)
+    assert compression.should_compress(base + 'batch', 100)
+    assert compression.should_compress(
+        base + 'groups/12/subscribers/import', 100)
+    assert not compression.should_compress(base + 'subscribers', 1000)
+
+    small = {'name': 'John'}
+    body, headers = compression.encode(base + 'batch', small)
+    assert json.loads(body) == small
+    assert 'Content-Encoding' not in headers
+
+    big = {'subscribers': [{'email': 'demo-{}@mailerlite.com'.format(i),
+                            'name': 'John'} for i in range(100)]}
+    body, headers = compression.encode(base + 'batch', big)
+    assert headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body)) == big
+
+    stats = compression.stats()
+    assert stats['requests'] == 2
+    assert stats['compressed_requests'] == 1
+    assert stats['request_ratio'] < 0.5
+    compression.reset()
+    assert compression.stats()['requests'] == 0
+
+
+@responses.activate
+def test_compressed_requests():
+    payload = [{'id': i, 'name': 'group {}'.format(i)} for i in range(200)]
+    raw = json.dumps(payload).encode('utf-8')
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'groups',
+                  body=gzip.compress(raw),
+                  headers={'Content-Encoding': 'gzip'},
+                  content_type='application/json')
+    responses.add(responses.POST, MAILERLITE_API_V2_URL + 'batch',
+                  json={'responses': []})
+
+    compression = Compression(threshold=1000)
+    previous = client.set_compression(compression)
+    try:
+        assert client.get_compression() is compression
+        _, res_json = client.get('groups', headers={'a': 'b'})
+        assert res_json == payload
+        client.post('batch', body={'requests': payload}, headers={'a': 'b'})
+    finally:
+        client.set_compression(previous)
+
+    get_request = responses.calls[0].request
+    assert get_request.headers['Accept-Encoding'] == 'gzip, deflate'
+    post_request = responses.calls[1].request
+    assert post_request.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(post_request.body)) == \
+        {'requests': payload}
+
+    stats = compression.stats()
+    assert stats['encodings'] == {'gzip': 1, 'identity': 1}
+    assert stats['response_bytes'] > len(raw)
+    assert stats['response_bytes_received'] < stats['response_bytes']
@@ -0,0 +1,159 @@
+"""Module to test concurrency helpers."""
+import threading
+
+import pytest
+import responses
+
+import mailerlite.client as client
+from mailerlite.concurrency import map_concurrent, RateLimiter, \
+    AdaptiveLimiter, resolve_workers
+from mailerlite.constants import MAILERLITE_API_V2_URL
+
+
+def test_map_concurrent():
+    assert map_concurrent(lambda x: x * 2, range(10), max_workers=4) == \
+        [x * 2 for x in range(10)]
+    assert map_concurrent(lambda x: x * 2, [3], max_workers=1) == [6]
+    assert map_concurrent(str, []) == []
+
+    def fail(x):
+        if x == 3:
+            raise IOError('boom')
+        return x
+
+    with pytest.raises(IOError):
+        map_concurrent(fail, range(5))
+
+
+def test_map_concurrent_cancels_on_error():
+    started = []
+    lock = threading.Lock()
+
+    def fail(x):
+        with lock:
+            started.append(x)
+        if x == 0:
+            raise IOError('boom')
+        return x
+
+    def items():
+        for x in range(1000):
+            yield x
+
+    with pytest.raises(IOError):
+        map_concurrent(fail, items(), max_workers=2)
+    # only a bounded number of items was submitted before the error
+    assert len(started) < 1000
+
+
+def test_rate_limiter():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+    limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    limiter.acquire()
+    limiter.acquire()
+    assert sleeps == []
+    limiter.acquire()
+    assert sleeps == [0.5]
+    now[0] += 10
+    limiter.acquire()
+    limiter.acquire()
+    assert len(sleeps) == 1
+
+
+def test_adaptive_limiter():
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(initial=10, max_limit=5)
+    with pytest.raises(ValueError):
+        AdaptiveLimiter(backoff=2)
+
+    now = [0.]
+    limiter = AdaptiveLimiter(initial=2, max_limit=4, clock=lambda: now[0])
+    # stable latency: one more request per round
+    for _ in range(3):
+        limiter.record(200, 0.1)
+    assert limiter.limit == 3
+    for _ in range(20):
+        limiter.record(200, 0.1)
+    assert limiter.limit == 4
+    # latency far above the baseline lowers the limit
+    limiter.record(200, 1.)
+    assert limiter.limit == 3
+
+    # a burst of 429 halves the limit once per cooldown
+    limiter.record(429)
+    limiter.record(503)
+    assert limiter.limit == 1
+    assert limiter.backoffs == 1
+    now[0] = 2.
+    limiter.record(None)
+    assert limiter.limit == 1
+    assert limiter.stats()['backoffs'] == 2
+
+
+def test_adaptive_limiter_endpoints():
+    limiter = AdaptiveLimiter(initial=4, max_limit=8)
+    # a fast call does not set the baseline of slower endpoints
+    limiter.record(200, 0.01, 'GET /api/v2/stats')
+    limiter.record(304, 0.001, 'GET /api/v2/subscribers')
+    for _ in range(4):
+        limiter.record(200, 0.5, 'GET /api/v2/subscribers')
+    assert limiter.limit == 5
+    assert limiter.stats()['baselines'] == {'GET /api/v2/stats': 0.01,
+                                            'GET /api/v2/subscribers': 0.5}
+    assert limiter.baseline == 0.01
+
+    assert client.endpoint_key('get', MAILERLITE_API_V2_URL +
+                               'groups/12/subscribers?limit=10') == \
+        'GET /api/v2/groups/{id}/subscribers'
+    assert client.endpoint_key('GET', MAILERLITE_API_V2_URL +
+                               'subscribers/a@x.com') == \
+        'GET /api/v2/subscribers/{id}'
+
+
+def test_adaptive_limiter_blocks():
+    limiter = AdaptiveLimiter(initial=1, max_limit=2)
+    limiter.acquire()
+    entered = threading.Event()
+
+    def second():
+        with limiter:
+            entered.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not entered.wait(0.05)
+    limiter.record(200, 0.1)  # the limit grows to 2
+    assert entered.wait(1)
+    thread.join()
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+@responses.activate
+def test_adaptive_limiter_client():
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'groups', json=[])
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'groups',
+                  status=429, json={})
+    limiter = AdaptiveLimiter(initial=4)
+    assert resolve_workers() == 8
+    previous = client.set_adaptive_limiter(limiter)
+    try:
+        assert resolve_workers() == 32
+        assert resolve_workers(2) == 2
+        client.get('groups')
+        with pytest.raises(IOError):
+            client.get('groups')
+    finally:
+        client.set_adaptive_limiter(previous)
+    assert limiter.in_flight == 0
+    assert limiter.backoffs == 1
+    assert limiter.limit == 2
@@ -0,0 +1,127 @@
+"""Module to test the application of webhook events."""
+import time
+
+from mailerlite.events import EventBuffer, event_time
+from mailerlite.index import SubscriberIndex
+from mailerlite.receiver import WebhookReceiver, parse_event
+
+
+def event(etype, timestamp, group=None, **subscriber):
+    data = {'subscriber': {'id': 1, **subscriber}}
+    if group is not None:
+        data['group'] = {'id': group}
+    return parse_event({'type': etype, 'timestamp': timestamp,
+                        'data': data})
+
+
+def test_event_time():
+    assert event_time(10) == 10.
+    assert event_time('1588500000') == 1588500000.
+    assert event_time('2020-05-03 10:00:00') == 1588500000.
+    assert event_time(None) == event_time('yesterday') == 0.
+
+
+def test_event_buffer():
+    index = SubscriberIndex([{'id': 1, 'email': 'a@mailerlite.com',
+                              'type': 'active',
+                              'fields': [{'key': 'city', 'value': 'Paris'}]}])
+    buffer = EventBuffer(index, memberships={1: [10]})
+    events = [
+        event('subscriber.update', 3, name='Late',
+              fields=[{'key': 'company', 'value': 'ML'}]),
+        event('subscriber.update', 2, name='Early'),
+        event('subscriber.add_to_group', 2, group=20),
+        event('subscriber.remove_from_group', 1, group=10),
+        event('subscriber.create', 1, id=2, email='b@mailerlite.com',
+              type='active'),
+    ]
+    # duplicated deliveries are dropped
+    assert buffer.push(events + events[:2]) == 5
+    assert buffer.duplicates == 2
+    assert buffer.flush() == 5
+
+    subscriber = index.get(1)
+    assert subscriber.name == 'Late'
+    assert subscriber.email == 'a@mailerlite.com'
+    assert {f.key: f.value for f in subscriber.fields} == \
+        {'city': 'Paris', 'company': 'ML'}
+    assert buffer.groups_of(1) == [20]
+    assert index.get(email='b@mailerlite.com').id == 2
+
+    # replays and older events never revert the cache
+    buffer.push([event('subscriber.update', 1, name='Older'),
+                 event('subscriber.add_to_group', 0, group=10)])
+    assert buffer.flush() == 0
+    assert buffer.stale == 2
+    assert index.get(1).name == 'Late'
+    assert buffer.groups_of(1) == [20]
+
+    buffer.push([event('subscriber.unsubscribe', 4,
+                       email='A@mailerlite.com', id=None),
+                 event('subscriber.delete', 5, id=2)])
+    assert buffer.flush() == 2
+    assert index.get(1).type == 'unsubscribed'
+    assert index.get(2) is None
+    assert buffer.applied == 7
+
+
+def test_event_buffer_delay():
+    now = [100.]
+    buffer = EventBuffer(delay=10, clock=lambda: now[0])
+    buffer.push([event('subscriber.update', 95, name='New'),
+                 event('subscriber.update', 85, name='Old')])
+    assert buffer.apply() == 1
+    assert len(buffer) == 1
+    # a late delivery is still put back in order
+    buffer.push([event('subscriber.update', 88, name='Late')])
+    now[0] = 110.
+    assert buffer.apply() == 2
+    assert buffer.index.get(1).name == 'New'
+    assert buffer.stale == 0
+
+
+def test_event_buffer_retention():
+    buffer = EventBuffer(retention=100)
+    buffer.push([event('subscriber.update', 10, name='A'),
+                 event('subscriber.add_to_group', 50, group=7)])
+    buffer.flush()
+    assert set(buffer._versions) == {1, (1, 7)}
+
+    buffer.push([event('subscriber.update', 200, id=2, name='C')])
+    buffer.flush()
+    # subscriber 1 is older than the retention window
+    assert set(buffer._versions) == {2}
+    assert len(buffer._expiry) == 1
+
+
+def test_event_buffer_receiver():
+    receiver = WebhookReceiver()
+    buffer = EventBuffer()
+    buffer.attach(receiver)
+    receiver.handle(b'{"events": [{"type": "subscriber.create", '
+                    b'"timestamp": 1, "data": {"subscriber": '
+                    b'{"id": 5, "email": "c@mailerlite.com"}}}]}')
+    receiver.stop()
+    assert 5 in buffer.index
+
+
+def test_event_buffer_delay_receiver():
+    now = [100.]
+    receiver = WebhookReceiver()
+    buffer = EventBuffer(delay=10, clock=lambda: now[0])
+    buffer.attach(receiver, interval=0.01)
+    receiver.handle(b'{"events": [{"type": "subscriber.create", '
+                    b'"timestamp": 95, "data": {"subscriber": '
+                    b'{"id": 5, "email": "c@mailerlite.com"}}}]}')
+    receiver.stop()
+    assert 5 not in buffer.index
+
+    # applied by the background thread, without a later event
+    now[0] = 110.
+    for _ in range(100):
+        if 5 in buffer.index:
+            break
+        time.sleep(0.01)
+    assert 5 in buffer.index
+    buffer.stop()
+    assert buffer._thread is None
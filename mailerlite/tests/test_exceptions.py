@@ -0,0 +1,96 @@
+"""Module to test the exceptions of error responses."""
+import time
+
+import pytest
+import responses
+
+import mailerlite.client as client
+from mailerlite.circuit import CircuitOpenError
+from mailerlite.constants import MAILERLITE_API_V2_URL
+from mailerlite.exceptions import MailerLiteError, ClientError, NotFound, \
+    RateLimited, ValidationError, ServerError, Unauthorized, error_class
+
+
+def test_error_class():
+    assert error_class(404) is NotFound
+    assert error_class(418) is ClientError
+    assert error_class(502) is ServerError
+    assert not NotFound.retryable
+    assert RateLimited.retryable and ServerError.retryable
+    assert issubclass(ValidationError, IOError)
+
+    error = CircuitOpenError(2.5)
+    assert isinstance(error, MailerLiteError)
+    assert error.retryable
+    assert error.retry_after == 2.5
+    assert str(error) == 'MailerLite circuit is open, retry in 2.5s'
+
+
+@responses.activate
+def test_error_responses(capsys):
+    url = MAILERLITE_API_V2_URL + 'subscribers/'
+    responses.add(responses.GET, url + '1', status=404,
+                  json={'error': {'code': 123,
+                                  'message': 'Subscriber not found'}})
+    responses.add(responses.GET, url + '2', status=429, json={},
+                  headers={'Retry-After': '12'})
+    responses.add(responses.PUT, url + '3', status=422,
+                  json={'message': 'The email must be a valid email.'})
+    responses.add(responses.GET, url + '4', status=500, body='oops')
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats',
+                  status=401, json={'error': {'message': 'Unauthorized'}})
+
+    with pytest.raises(NotFound) as info:
+        client.get('subscribers/1')
+    error = info.value
+    assert error.status == 404
+    assert error.code == 123
+    assert error.message == 'Subscriber not found'
+    assert error.body == {'error': {'code': 123,
+                                    'message': 'Subscriber not found'}}
+    assert error.args[0] is error.response
+    assert str(error) == '404 NotFound: Subscriber not found'
+
+    with pytest.raises(RateLimited) as info:
+        client.get('subscribers/2')
+    assert info.value.retry_after == 12
+
+    with pytest.raises(ValidationError) as info:
+        client.put('subscribers/3', body={'email': 'x'})
+    assert info.value.message == 'The email must be a valid email.'
+
+    with pytest.raises(ServerError) as info:
+        client.get('subscribers/4')
+    assert info.value.body is None
+    assert info.value.retryable
+
+    with pytest.raises(Unauthorized):
+        client.get('stats')
+    valid, msg = client.check_headers({'content-type': 'application/json',
+                                       'x-mailerlite-apikey': 'FAKE_KEY'})
+    assert not valid
+    assert b'Unauthorized' in msg
+    # nothing is printed anymore
+    assert capsys.readouterr().out == ''
+
+
+@responses.activate
+def test_rate_limit_reset():
+    url = MAILERLITE_API_V2_URL + 'groups'
+    responses.add(responses.GET, url, status=429, json={},
+                  headers={'X-RateLimit-Reset': '30'})
+    responses.add(responses.GET, url, status=429, json={},
+                  headers={'X-RateLimit-Reset': str(int(time.time()) + 60)})
+    responses.add(responses.GET, url, status=429, json={},
+                  headers={'X-RateLimit-Reset': '1000000001'})
+
+    with pytest.raises(RateLimited) as info:
+        client.get('groups')
+    assert info.value.retry_after == 30
+    # a unix time is turned into the seconds left
+    with pytest.raises(RateLimited) as info:
+        client.get('groups')
+    assert 50 < info.value.retry_after <= 60
+    with pytest.raises(RateLimited) as info:
+        client.get('groups')
+    assert info.value.retry_after == 0
@@ -5,8 +5,9 @@ import time
 import itertools
 
 import pytest
+import responses
 
-from mailerlite.constants import API_KEY_TEST, Group
+from mailerlite.constants import API_KEY_TEST, MAILERLITE_API_V2_URL, Group
 from mailerlite.group import Groups
 from mailerlite.testing import succeed_or_skip_sensitive_tests
 
@@ -190,3 +191,60 @@ def test_groups_single_subscriber(header):
         data = {'name': 'John',
                 'fields': {'company': 'MailerLite'}}
         groups.add_single_subscriber(group_1.id, data)
+
+
+@responses.activate
+def test_groups_resolve():
+    url = MAILERLITE_API_V2_URL + 'groups'
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    groups = Groups({'content-type': 'application/json',
+                     'x-mailerlite-apikey': 'my-key'})
+    page = [{'id': i, 'name': 'group {}'.format(i)} for i in range(100)]
+    responses.add(responses.GET, url, json=page)
+    responses.add(responses.GET, url, json=[{'id': 100, 'name': 'news'}])
+
+    assert groups.resolve('news') == Group(id=100, name='news')
+    assert groups.resolve('group 5').id == 5
+    assert groups.resolve('missing') is None
+    listings = [c for c in responses.calls
+                if c.request.method == 'GET' and '/groups' in c.request.url]
+    assert len(listings) == 2
+    assert 'offset=100' in listings[1].request.url
+
+    responses.add(responses.PUT, url + '/100',
+                  json={'id': 100, 'name': 'weekly'})
+    groups.update(100, 'weekly')
+    assert groups.resolve('news') is None
+    assert groups.resolve('weekly').id == 100
+
+    responses.add(responses.DELETE, url + '/100', status=204)
+    groups.delete(100)
+    assert groups.resolve('weekly') is None
+
+    responses.add(responses.POST, url, json={'id': 101, 'name': 'new'})
+    groups.create('new')
+    assert groups.resolve('new').id == 101
+    assert len(responses.calls) == len(listings) + 4
+
+    groups.invalidate()
+    responses.add(responses.GET, url, json=[])
+    assert groups.resolve('new') is None
+
+
+@responses.activate
+def test_groups_get_or_create():
+    url = MAILERLITE_API_V2_URL + 'groups'
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    groups = Groups({'content-type': 'application/json',
+                     'x-mailerlite-apikey': 'my-key'})
+    responses.add(responses.GET, url, json=[{'id': 1, 'name': 'a'}])
+    responses.add(responses.GET, url, json=[{'id': 1, 'name': 'a'}])
+    responses.add(responses.POST, url, json={'id': 2, 'name': 'b'})
+
+    assert groups.get_or_create('a').id == 1
+    assert groups.get_or_create('b').id == 2
+    assert groups.get_or_create('b').id == 2
+    methods = [c.request.method for c in responses.calls
+               if '/groups' in c.request.url]
+    # first listing, fresh listing before the creation, creation
+    assert methods == ['GET', 'GET', 'POST']
@@ -0,0 +1,147 @@
+"""Module to test the idempotent creation of resources."""
+import json
+
+import pytest
+import requests
+import responses
+
+from mailerlite.api import MailerLiteApi
+from mailerlite.constants import MAILERLITE_API_V2_URL
+from mailerlite.exceptions import ValidationError
+from mailerlite.idempotency import IdempotencyJournal, IdempotentWriter, \
+    idempotency_key, is_ambiguous
+
+URL = MAILERLITE_API_V2_URL
+
+
+def _writer(journal=None):
+    responses.add(responses.GET, URL + 'stats', json={})
+    waits = []
+    writer = IdempotentWriter(MailerLiteApi('my-key'), journal=journal,
+                              sleep=waits.append)
+    return writer, waits
+
+
+def _posts():
+    return [c for c in responses.calls if c.request.method == 'POST']
+
+
+def test_idempotency_key():
+    assert idempotency_key('group', {'name': 'a'}) == \
+        idempotency_key('group', {'name': 'a'})
+    assert idempotency_key('group', {'name': 'a'}) != \
+        idempotency_key('group', {'name': 'b'})
+    assert is_ambiguous(requests.exceptions.ConnectionError())
+    assert not is_ambiguous(ValueError())
+
+
+def test_journal(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    with IdempotencyJournal(path) as journal:
+        journal.begin('k', 'group', 'd')
+        assert journal.pending() == ['k']
+    journal = IdempotencyJournal(path)
+    assert journal.get('k')['state'] == 'pending'
+    journal.complete('k', {'id': 1})
+    entry = journal.get('k')
+    assert (entry['state'], entry['result']) == ('done', {'id': 1})
+    journal.forget('k')
+    assert journal.get('k') is None
+
+
+@responses.activate
+def test_done_writes_are_not_sent_again():
+    writer, _ = _writer()
+    responses.add(responses.POST, URL + 'groups',
+                  json={'id': 1, 'name': 'news'})
+
+    assert writer.create_group('news') == {'id': 1, 'name': 'news'}
+    assert writer.create_group('news') == {'id': 1, 'name': 'news'}
+    assert len(_posts()) == 1
+    with pytest.raises(ValueError):
+        writer.create_group('other', key=idempotency_key(
+            'group', {'name': 'news'}))
+
+
+@responses.activate
+def test_timeout_reconciled_with_lookup():
+    writer, waits = _writer()
+    responses.add(responses.POST, URL + 'groups',
+                  body=requests.exceptions.ConnectionError('timeout'))
+    responses.add(responses.GET, URL + 'groups', json=[
+        {'id': 7, 'name': 'other'}, {'id': 8, 'name': 'news'}])
+
+    assert writer.create_group('news') == {'id': 8, 'name': 'news'}
+    assert len(_posts()) == 1
+    assert writer.reconciled == 1
+    assert waits == [1.]
+
+
+@responses.activate
+def test_timeout_lookup_missing_posts_again():
+    writer, _ = _writer()
+    url = URL + 'subscribers'
+    responses.add(responses.POST, url, status=502, json={})
+    responses.add(responses.GET, url + '/a@x.com', status=404, json={})
+    responses.add(responses.POST, url, json={'id': 1, 'email': 'a@x.com'})
+
+    assert writer.create_subscriber({'email': 'a@x.com'}) == \
+        {'id': 1, 'email': 'a@x.com'}
+    assert len(_posts()) == 2
+    assert writer.reconciled == 0
+
+
+@responses.activate
+def test_pending_entry_reconciled_after_crash(tmp_path):
+    path = str(tmp_path / 'journal.db')
+    writer, _ = _writer(IdempotencyJournal(path))
+    responses.add(responses.POST, URL + 'fields',
+                  body=requests.exceptions.ConnectionError('timeout'))
+    writer.attempts = 1
+    with pytest.raises(IOError):
+        writer.create_field('Company')
+    writer.journal.close()
+
+    responses.add(responses.GET, URL + 'fields', json=[
+        {'id': 3, 'title': 'company', 'type': 'TEXT'}])
+    writer = IdempotentWriter(writer.api, IdempotencyJournal(path))
+    assert writer.create_field('Company')['id'] == 3
+    assert len(_posts()) == 1
+
+
+@responses.activate
+def test_client_errors_are_not_retried():
+    writer, _ = _writer()
+    responses.add(responses.POST, URL + 'campaigns', status=422,
+                  json={'error': {'code': 1, 'message': 'invalid'}})
+    data = {'type': 'regular', 'name': 'n', 'subject': 's', 'groups': [1]}
+
+    with pytest.raises(ValidationError):
+        writer.create_campaign(data)
+    assert len(_posts()) == 1
+    assert writer.journal.get(idempotency_key('campaign', data))['state'] \
+        == 'failed'
+
+
+@responses.activate
+def test_rate_limited_retried_without_lookup():
+    writer, waits = _writer()
+    responses.add(responses.POST, URL + 'campaigns', status=429,
+                  headers={'Retry-After': '5'}, json={})
+    responses.add(responses.POST, URL + 'campaigns', json={'id': 9})
+    data = {'type': 'regular', 'name': 'n', 'subject': 's', 'groups': [1]}
+
+    assert writer.create_campaign(data) == {'id': 9}
+    assert waits == [5.]
+    assert len(_posts()) == 2
+    assert not [c for c in responses.calls
+                if 'campaigns/draft' in c.request.url]
+    assert json.loads(_posts()[-1].request.body) == data
+
+    # a long Retry-After is capped
+    responses.add(responses.POST, URL + 'groups', status=429,
+                  headers={'Retry-After': '100000'}, json={})
+    responses.add(responses.POST, URL + 'groups', json={'id': 3})
+    writer.max_delay = 60
+    assert writer.create_group('capped') == {'id': 3}
+    assert waits[-1] == 60
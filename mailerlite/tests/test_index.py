@@ -0,0 +1,106 @@
+"""Module to test the local subscriber index."""
+import threading
+
+import pytest
+
+from mailerlite.constants import Subscriber, Field
+from mailerlite.index import SubscriberIndex, normalize_email, as_subscriber
+
+
+def subscriber_json(sid, email, stype='active', **fields):
+    return {'id': sid, 'email': email, 'type': stype,
+            'fields': [{'key': k, 'value': v} for k, v in fields.items()]}
+
+
+class FakeSubscribers:
+
+    def __init__(self, subscribers):
+        self.subscribers = subscribers
+
+    def all(self, limit=100, offset=0, stype=None, as_json=False):
+        return self.subscribers[offset:offset + limit]
+
+
+class FakeApi:
+
+    def __init__(self, subscribers):
+        self.subscribers = FakeSubscribers(subscribers)
+
+
+SUBSCRIBERS = [
+    subscriber_json(1, 'John@MailerLite.com', company='A', city='Paris'),
+    subscriber_json(2, 'jane@mailerlite.com', company='B', city='Paris'),
+    subscriber_json(3, 'joe@mailerlite.com', 'unsubscribed', company='A',
+                    city='Paris'),
+]
+
+
+def test_helpers():
+    assert normalize_email('  John@MailerLite.COM ') == 'john@mailerlite.com'
+    assert normalize_email(None) is None
+    subscriber = as_subscriber({'id': 1, 'fields': {'city': 'Paris'}})
+    assert subscriber.fields == [Field(key='city', value='Paris')]
+    assert as_subscriber(subscriber) is subscriber
+
+
+def test_subscriber_index():
+    index = SubscriberIndex.from_api(FakeApi(SUBSCRIBERS), page_size=2)
+    assert len(index) == 3
+    assert index.get(id=2).email == 'jane@mailerlite.com'
+    assert index.get(email=' john@mailerlite.COM').id == 1
+    assert index.get(email='nobody@mailerlite.com') is None
+    assert 'JANE@mailerlite.com' in index
+    assert 3 in index
+    assert 4 not in index
+    assert {s.id for s in index} == {1, 2, 3}
+
+    assert index.ids() == {1, 2, 3}
+    assert index.ids(stype='active') == {1, 2}
+    assert index.ids(company='A') == {1, 3}
+    assert index.ids(stype='active', company='A', city='Paris') == {1}
+    assert index.ids(company='C') == set()
+    assert index.count(city='Paris') == 3
+    assert [s.id for s in index.find(stype='unsubscribed')] == [3]
+    assert index.values('company') == {'A', 'B'}
+
+    # incremental update
+    assert index.update([subscriber_json(1, 'john.doe@mailerlite.com',
+                                         'unsubscribed', company='B')]) == 1
+    assert index.get(email='john@mailerlite.com') is None
+    assert index.get(email='john.doe@mailerlite.com').id == 1
+    assert index.ids(company='A') == {3}
+    assert index.ids(stype='unsubscribed') == {1, 3}
+    assert index.ids(city='Paris') == {2, 3}
+
+    assert index.remove(3).id == 3
+    assert index.remove(3) is None
+    assert index.values('company') == {'B'}
+    assert index.ids(stype='unsubscribed') == {1}
+
+    with pytest.raises(ValueError):
+        index.add(Subscriber(email='noid@mailerlite.com'))
+
+    # unhashable values are stored but not indexed
+    index.add(subscriber_json(4, 'list@mailerlite.com', tags=['a']))
+    index.add(subscriber_json(4, 'list@mailerlite.com', tags=['b']))
+    assert index.get(id=4).fields[0].value == ['b']
+
+
+def test_find_with_concurrent_remove():
+    index = SubscriberIndex(SUBSCRIBERS)
+    ids = index.ids
+    removers = []
+
+    def ids_then_remove(**kwargs):
+        found = ids(**kwargs)
+        # another thread removes a subscriber between the two steps
+        remover = threading.Thread(target=index.remove, args=(1,))
+        remover.start()
+        remover.join(0.05)
+        removers.append(remover)
+        return found
+
+    index.ids = ids_then_remove
+    assert {s.id for s in index.find(company='A')} == {1, 3}
+    removers[0].join()
+    assert 1 not in index
@@ -0,0 +1,67 @@
+"""Module to test the group membership export."""
+import pytest
+
+from mailerlite.membership import MembershipIndex, export_memberships
+
+
+class FakeGroups:
+
+    def __init__(self, members):
+        self.members = members
+        self.calls = 0
+
+    def all(self, limit=100, offset=0, gfilters='', as_json=False):
+        self.calls += 1
+        groups = [{'id': gid} for gid in sorted(self.members)]
+        return groups[offset:offset + limit]
+
+    def subscribers(self, group_id, limit=100, offset=0, stype=None,
+                    as_json=False):
+        self.calls += 1
+        subscribers = [{'id': sid} for sid in self.members[group_id]]
+        return subscribers[offset:offset + limit]
+
+
+class FakeApi:
+
+    def __init__(self, members):
+        self.groups = FakeGroups(members)
+
+
+MEMBERS = {10: [3, 1, 2], 20: [2, 5], 30: [], 40: [1, 2, 3, 4, 5, 6]}
+
+
+def test_membership_index(tmp_path):
+    index = MembershipIndex.from_groups(MEMBERS)
+    assert len(index) == 6
+    assert list(index) == [1, 2, 3, 4, 5, 6]
+    assert index.groups_of(2).tolist() == [10, 20, 40]
+    assert index.groups_of(6).tolist() == [40]
+    assert index.groups_of(7).tolist() == []
+    assert 5 in index
+    assert 7 not in index
+    assert index.as_dict()[1] == [10, 40]
+
+    path = str(tmp_path / 'memberships.bin')
+    index.save(path)
+    loaded = MembershipIndex.load(path)
+    assert loaded.as_dict() == index.as_dict()
+
+    with open(path, 'wb') as f:
+        f.write(b'garbage' * 10)
+    with pytest.raises(ValueError):
+        MembershipIndex.load(path)
+
+    with pytest.raises(ValueError):
+        MembershipIndex(index.subscriber_ids, index.offsets[:-1],
+                        index.group_ids)
+
+
+def test_export_memberships(tmp_path):
+    api = FakeApi(MEMBERS)
+    path = str(tmp_path / 'memberships.bin')
+    index = export_memberships(api, page_size=2, path=path)
+    assert index.as_dict() == MembershipIndex.from_groups(MEMBERS).as_dict()
+    assert MembershipIndex.load(path).groups_of(4).tolist() == [40]
+    # 3 pages of groups, 2 + 2 + 1 + 4 pages of subscribers
+    assert api.groups.calls == 12
@@ -0,0 +1,24 @@
+"""Module to test pagination helpers."""
+from mailerlite.pagination import iter_pages, iter_records
+
+
+def test_iter_pages():
+    calls = []
+
+    def fetch(prefix, limit=100, offset=0):
+        calls.append((limit, offset))
+        records = ['{}{}'.format(prefix, i) for i in range(7)]
+        return records[offset:offset + limit]
+
+    pages = list(iter_pages(fetch, 'r', page_size=3))
+    assert pages == [['r0', 'r1', 'r2'], ['r3', 'r4', 'r5'], ['r6']]
+    assert calls == [(3, 0), (3, 3), (3, 6)]
+
+    calls.clear()
+    assert list(iter_records(fetch, 'r', page_size=7, offset=2)) == \
+        ['r2', 'r3', 'r4', 'r5', 'r6']
+    # a full page needs one more call to know it was the last one
+    assert list(iter_pages(fetch, 'r', page_size=7)) == \
+        [['r{}'.format(i) for i in range(7)]]
+    assert calls[-1] == (7, 7)
+    assert list(iter_pages(lambda limit, offset: None)) == []
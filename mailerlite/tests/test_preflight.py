@@ -0,0 +1,73 @@
+"""Module to test the bulk pre-flight stage."""
+import pytest
+
+from mailerlite.constants import Subscriber, Field
+from mailerlite.index import SubscriberIndex
+from mailerlite.membership import MembershipIndex
+from mailerlite.preflight import preflight, is_unchanged
+
+PAYLOADS = [
+    {'email': ' John@MailerLite.com', 'name': 'John',
+     'fields': {'company': 'A', 'city': 'Paris'}},
+    {'email': 'jane@mailerlite.com', 'name': 'Jane'},
+    {'name': 'No email'},
+    {'email': 'john@mailerlite.com ', 'name': 'Johnny',
+     'fields': {'company': 'B'}},
+]
+
+
+def test_is_unchanged():
+    subscriber = Subscriber(id=1, name='John', type='active',
+                            fields=[Field(key='age', value='42')])
+    assert is_unchanged({'name': 'John', 'fields': {'age': 42}}, subscriber)
+    assert is_unchanged({}, subscriber)
+    assert not is_unchanged({'name': 'Jane'}, subscriber)
+    assert not is_unchanged({'type': 'unsubscribed'}, subscriber)
+    assert not is_unchanged({'fields': {'age': 43}}, subscriber)
+    assert not is_unchanged({'fields': {'city': 'Paris'}}, subscriber)
+
+
+def test_preflight_dedup():
+    with pytest.raises(ValueError):
+        preflight(PAYLOADS, merge='first')
+
+    records, report = preflight(PAYLOADS)
+    assert [r['email'] for r in records] == ['john@mailerlite.com',
+                                             'jane@mailerlite.com']
+    assert records[0] == {'email': 'john@mailerlite.com', 'name': 'Johnny',
+                          'fields': {'company': 'B'}}
+    assert report.received == 4
+    assert report.sent == 2
+    assert report.duplicates == 1
+    assert report.invalid == 1
+    assert report.saved == 2
+
+    records, _ = preflight(PAYLOADS, merge='fields')
+    assert records[0]['fields'] == {'company': 'B', 'city': 'Paris'}
+
+    records, report = preflight({'email': 'A@mailerlite.com'})
+    assert records == [{'email': 'a@mailerlite.com'}]
+    assert report.saved == 0
+
+
+def test_preflight_snapshot():
+    index = SubscriberIndex([
+        {'id': 1, 'email': 'john@mailerlite.com', 'name': 'Johnny',
+         'fields': [{'key': 'company', 'value': 'B'}]},
+        {'id': 2, 'email': 'jane@mailerlite.com', 'name': 'Jane Doe'},
+    ])
+    records, report = preflight(PAYLOADS, index=index)
+    assert [r['email'] for r in records] == ['jane@mailerlite.com']
+    assert report.unchanged == 1
+    assert report.saved == 3
+
+    # adding to a group: unchanged profiles are only dropped for members
+    memberships = MembershipIndex.from_groups({10: [1]})
+    records, report = preflight(PAYLOADS, index=index, group_id=10,
+                                memberships=memberships)
+    assert report.unchanged == 1
+    records, report = preflight(PAYLOADS, index=index, group_id=20,
+                                memberships={1: [10]})
+    assert report.unchanged == 0
+    records, report = preflight(PAYLOADS, index=index, group_id=10)
+    assert report.unchanged == 0
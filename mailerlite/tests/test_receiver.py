@@ -0,0 +1,162 @@
+"""Module to test the webhook receiver."""
+import asyncio
+import io
+import json
+import threading
+
+from mailerlite.constants import WebhookEvent, Subscriber
+from mailerlite.receiver import WebhookReceiver, sign, verify_signature, \
+    parse_events
+
+SECRET = 'my-api-key'
+BODY = json.dumps({'events': [
+    {'type': 'subscriber.create', 'timestamp': 1,
+     'data': {'subscriber': {'id': 1, 'email': 'demo@mailerlite.com',
+                             'fields': [{'key': 'name', 'value': 'John'}],
+                             'unknown_key': True}}},
+    {'type': 'subscriber.add_to_group', 'timestamp': 2,
+     'data': {'subscriber': {'id': 1}, 'group': {'id': 10, 'name': 'G'}}},
+]}).encode('utf-8')
+
+
+def test_signature():
+    signature = sign(BODY, SECRET)
+    assert verify_signature(BODY, signature, SECRET)
+    assert verify_signature(BODY, ' {} '.format(signature), SECRET)
+    assert not verify_signature(BODY + b' ', signature, SECRET)
+    assert not verify_signature(BODY, None, SECRET)
+    assert not verify_signature(BODY, signature, 'other-key')
+
+
+def test_parse_events():
+    events = parse_events(BODY)
+    assert len(events) == 2
+    assert isinstance(events[0], WebhookEvent)
+    assert isinstance(events[0].subscriber, Subscriber)
+    assert events[0].subscriber.fields[0].value == 'John'
+    assert events[1].group.id == 10
+    single = parse_events('{"type": "subscriber.unsubscribe"}')
+    assert single[0].type == 'subscriber.unsubscribe'
+    assert single[0].subscriber is None
+
+
+def test_receiver_dispatch():
+    receiver = WebhookReceiver(SECRET, max_workers=2)
+    seen, everything, failures = [], [], []
+    receiver.on_error = lambda event, e: failures.append(event.type)
+    done = threading.Event()
+
+    @receiver.on('subscriber.create')
+    def on_create(event):
+        done.wait(5)  # slow handler, the call is acknowledged before
+        seen.append(event.subscriber.email)
+
+    @receiver.on()
+    def on_all(event):
+        everything.append(event.type)
+
+    def broken(event):
+        raise RuntimeError('boom')
+
+    receiver.add_handler(broken, 'subscriber.add_to_group')
+
+    assert receiver.handle(BODY, 'bad signature') == (401,
+                                                      'invalid signature')
+    assert receiver.handle(b'not json', sign(b'not json', SECRET))[0] == 400
+    assert receiver.handle(BODY, sign(BODY, SECRET)) == (200, 'ok')
+    assert seen == []
+    done.set()
+    receiver.join()
+    assert seen == ['demo@mailerlite.com']
+    assert sorted(everything) == ['subscriber.add_to_group',
+                                  'subscriber.create']
+    assert failures == ['subscriber.add_to_group']
+    assert receiver.received == 2
+    assert receiver.rejected == 2
+    assert receiver.dispatched == 2
+    assert receiver.errors == 1
+    receiver.stop()
+
+
+def test_receiver_full_queue():
+    receiver = WebhookReceiver(max_workers=1, queue_size=1)
+    assert receiver.handle(BODY) == (503, 'queue full')
+    assert receiver.dropped == 2
+    receiver.stop()
+
+
+def test_receiver_wsgi():
+    receiver = WebhookReceiver(SECRET)
+    received = []
+    receiver.add_handler(received.append)
+    statuses = []
+
+    def start_response(status, headers):
+        statuses.append(status)
+
+    environ = {'REQUEST_METHOD': 'POST', 'CONTENT_LENGTH': str(len(BODY)),
+               'wsgi.input': io.BytesIO(BODY),
+               'HTTP_X_MAILERLITE_SIGNATURE': sign(BODY, SECRET)}
+    assert receiver(environ, start_response) == [b'ok']
+    assert receiver({'REQUEST_METHOD': 'GET', 'wsgi.input': io.BytesIO()},
+                    start_response) == [b'method not allowed']
+    assert statuses == ['200 OK', '405 Method Not Allowed']
+    receiver.stop()
+    assert len(received) == 2
+
+
+def test_receiver_asgi():
+    receiver = WebhookReceiver(SECRET)
+    received = []
+    receiver.add_handler(received.append)
+    sent = []
+    chunks = [{'body': BODY[:10], 'more_body': True}, {'body': BODY[10:]}]
+
+    async def receive():
+        return chunks.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST',
+             'headers': [(b'x-mailerlite-signature',
+                          sign(BODY, SECRET).encode())]}
+    asyncio.run(receiver.asgi(scope, receive, send))
+    assert sent[0]['status'] == 200
+    assert sent[1]['body'] == b'ok'
+    receiver.stop()
+    assert len(received) == 2
+
+
+def test_receiver_on_error_fails():
+    receiver = WebhookReceiver(max_workers=1)
+
+    def broken(event):
+        raise RuntimeError('boom')
+
+    def on_error(event, e):
+        raise ValueError('broken error handler')
+
+    receiver.add_handler(broken)
+    receiver.on_error = on_error
+    assert receiver.handle(BODY) == (200, 'ok')
+    receiver.join()
+    # the worker survived, later events are still dispatched
+    assert receiver.handle(BODY) == (200, 'ok')
+    receiver.join()
+    assert receiver.dispatched == 4
+    assert receiver.errors == 4
+    receiver.stop()
+
+
+def test_receiver_counters_threads():
+    receiver = WebhookReceiver(SECRET, max_workers=1)
+    threads = [threading.Thread(target=lambda: [receiver.handle(BODY, 'x')
+                                                for _ in range(200)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert receiver.rejected == 1600
+    receiver.stop()
@@ -0,0 +1,92 @@
+"""Module to test local segment evaluation."""
+import pytest
+
+from mailerlite.constants import Segment
+from mailerlite.index import SubscriberIndex
+from mailerlite.membership import MembershipIndex
+from mailerlite.segmentation import SubscriberSnapshot, compile_filter, \
+    evaluate_segments
+
+
+def subscriber_json(sid, email, stype='active', opened=0, **fields):
+    return {'id': sid, 'email': email, 'type': stype, 'opened': opened,
+            'fields': [{'key': k, 'value': v} for k, v in fields.items()]}
+
+
+@pytest.fixture
+def snapshot():
+    index = SubscriberIndex([
+        subscriber_json(1, 'John@gmail.com', opened=10, company='A',
+                        city='Paris'),
+        subscriber_json(2, 'jane@mailerlite.com', opened=3, company='B',
+                        city='Berlin'),
+        subscriber_json(3, 'joe@gmail.com', 'unsubscribed', opened=0,
+                        company='a'),
+        subscriber_json(4, 'jim@yahoo.com', opened=25, company='C',
+                        city='paris'),
+    ])
+    memberships = MembershipIndex.from_groups({10: [1, 2], 20: [2, 3]})
+    return SubscriberSnapshot(index, memberships=memberships)
+
+
+def members(snapshot, rules):
+    return sorted(snapshot.members(compile_filter({'rules': rules})(
+        snapshot)))
+
+
+def test_snapshot(snapshot):
+    assert len(snapshot) == 4
+    assert snapshot.column('email')[0] == 'john@gmail.com'
+    assert snapshot.column('city')[2] is None
+    with pytest.raises(KeyError):
+        snapshot.column('unknown')
+    assert snapshot.count(snapshot.all) == 4
+    assert snapshot.members(snapshot.value_mask('city', 'PARIS')) == [1, 4]
+    assert snapshot.members(snapshot.group_mask(20)) == [2, 3]
+    assert snapshot.group_mask(30) == 0
+
+    no_groups = SubscriberSnapshot([])
+    assert no_groups.all == 0
+    with pytest.raises(ValueError):
+        no_groups.group_mask(10)
+
+
+def test_compile_filter(snapshot):
+    def cond(operator, *args):
+        return {'operator': operator, 'args': list(args)}
+
+    assert members(snapshot, []) == [1, 2, 3, 4]
+    assert members(snapshot, [[cond('equal', 'company', 'a')]]) == [1, 3]
+    assert members(snapshot, [[cond('not_equal', 'type', 'active')]]) == [3]
+    assert members(snapshot, [[cond('text_field_ends_with', 'email',
+                                    '@gmail.com')]]) == [1, 3]
+    assert members(snapshot, [[cond('number_field_greater_than', 'opened',
+                                    5)]]) == [1, 4]
+    assert members(snapshot, [[cond('between', 'opened', 3, 10)]]) == [1, 2]
+    assert members(snapshot, [[cond('empty', 'city')]]) == [3]
+    assert members(snapshot, [[cond('contains', 'city', 'ar')]]) == [1, 4]
+    assert members(snapshot, [[cond('in_any', 'groups', [10, 20])]]) == \
+        [1, 2, 3]
+    assert members(snapshot, [[cond('in_all', 'groups', [10, 20])]]) == [2]
+    assert members(snapshot, [[cond('not_in_any', 'groups', [10])]]) == \
+        [3, 4]
+
+    # inner lists are OR, outer lists are AND
+    rules = [[cond('equal', 'city', 'paris'), cond('equal', 'company', 'b')],
+             [cond('less_than', 'opened', 20)]]
+    assert members(snapshot, rules) == [1, 2]
+
+    with pytest.raises(ValueError):
+        compile_filter({'rules': [[cond('sounds_like', 'email', 'x')]]})
+
+
+def test_evaluate_segments(snapshot):
+    gmail = {'rules': [[{'operator': 'ends_with',
+                         'args': ['email', 'gmail.com']}]]}
+    segments = [Segment(id=1, filter=gmail), Segment(id=2, filter={})]
+    results = evaluate_segments(segments, snapshot)
+    assert snapshot.members(results[1]) == [1, 3]
+    assert snapshot.count(results[2]) == 4
+
+    results = evaluate_segments({'gmail': gmail}, snapshot)
+    assert snapshot.count(results['gmail']) == 2
@@ -0,0 +1,96 @@
+"""Module to test single-flight deduplication."""
+import json
+import threading
+import time
+
+import pytest
+import responses
+
+import mailerlite.client as client
+from mailerlite.constants import API_KEY_TEST, MAILERLITE_API_V2_URL, \
+    Subscriber
+from mailerlite.singleflight import SingleFlight
+from mailerlite.subscriber import Subscribers
+
+
+@pytest.fixture
+def header():
+    headers = {'content-type': "application/json",
+               'X-MailerLite-ApiDocs': "true",
+               'x-mailerlite-apikey': API_KEY_TEST
+               }
+    return headers
+
+
+@pytest.fixture
+def single_flight():
+    group = client.set_single_flight(True)
+    yield group
+    client.set_single_flight(False)
+
+
+def run_concurrently(func, n=5):
+    results = [None] * n
+    barrier = threading.Barrier(n)
+
+    def target(i):
+        barrier.wait()
+        results[i] = func()
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_single_flight():
+    group = SingleFlight()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.1)
+        return value
+
+    results = run_concurrently(lambda: group.do('key', slow, 42))
+    assert results == [42] * 5
+    assert len(calls) == 1
+    assert group.shared == 4
+    assert group.in_flight() == 0
+
+    def fail():
+        raise IOError('boom')
+
+    with pytest.raises(IOError):
+        group.do('key', fail)
+    assert group.in_flight() == 0
+
+
+@responses.activate
+def test_single_flight_requests(header, single_flight):
+    assert client.get_single_flight() is single_flight
+    url = MAILERLITE_API_V2_URL + 'subscribers/demo@mailerlite.com'
+    subscriber = {'id': 1, 'email': 'demo@mailerlite.com',
+                  'fields': [{'key': 'name', 'value': 'John'}]}
+
+    def callback(request):
+        time.sleep(0.1)
+        return 200, {}, json.dumps(subscriber)
+
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add_callback(responses.GET, url, callback=callback)
+    subscribers = Subscribers(header)
+
+    results = run_concurrently(
+        lambda: subscribers.get(email='demo@mailerlite.com'))
+    assert all(isinstance(r, Subscriber) for r in results)
+    assert all(r.fields[0].value == 'John' for r in results)
+    assert len([c for c in responses.calls if c.request.url == url]) == 1
+
+    # other api keys do not share the same flight
+    header_2 = {**header, 'x-mailerlite-apikey': 'other'}
+    run_concurrently(lambda: client.get(
+        'subscribers/demo@mailerlite.com', headers=header_2), n=2)
+    assert len([c for c in responses.calls if c.request.url == url]) == 2
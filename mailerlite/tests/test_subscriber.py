@@ -4,10 +4,15 @@ import string
 import time
 import itertools
 
+import json
+
 import pytest
+import responses
 
-from mailerlite.constants import API_KEY_TEST
-from mailerlite.subscriber import Subscribers
+from mailerlite.constants import API_KEY_TEST, MAILERLITE_API_V2_URL, \
+    Subscriber, Field
+from mailerlite.index import SubscriberIndex
+from mailerlite.subscriber import Subscribers, subscriber_diff
 from mailerlite.testing import succeed_or_skip_sensitive_tests
 
 
@@ -158,3 +163,81 @@ def test_subscribers_crud(header):
         subscriber.activity(email=mail, atype='test')
 
     assert subscriber.delete(e_res.id) is None
+
+
+def test_subscriber_diff():
+    current = Subscriber(id=1, name='John', type='active',
+                         fields=[Field(key='company', value='MailerLite'),
+                                 Field(key='city', value='')])
+    assert subscriber_diff(current, {'name': 'John'}) == {}
+    assert subscriber_diff(current, {'fields': {'company': 'MailerLite',
+                                                'city': None}}) == {}
+    assert subscriber_diff(current, {'resend_autoresponders': True}) == {}
+    assert subscriber_diff(current, {'name': 'Jack', 'type': 'active'}) == \
+        {'name': 'Jack'}
+    assert subscriber_diff(current, {'fields': {'company': 'MailerLite',
+                                                'city': 'Paris'},
+                                     'resend_autoresponders': True}) == \
+        {'fields': {'city': 'Paris'}, 'resend_autoresponders': True}
+    assert subscriber_diff({'id': 1, 'name': 'John'},
+                           {'groups': [12]}) == {'groups': [12]}
+
+
+@responses.activate
+def test_update_if_changed(header):
+    base = MAILERLITE_API_V2_URL + 'subscribers/'
+    subscriber = {'id': 1, 'email': 'demo@mailerlite.com', 'name': 'John',
+                  'type': 'active',
+                  'fields': [{'key': 'company', 'value': 'MailerLite'}]}
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add(responses.GET, base + 'demo@mailerlite.com',
+                  json=subscriber)
+    responses.add(responses.PUT, base + 'demo@mailerlite.com',
+                  json={**subscriber, 'name': 'Jack'})
+    responses.add(responses.PUT, base + '2',
+                  json={**subscriber, 'id': 2, 'name': 'Jane',
+                        'email': 'jane@mailerlite.com'})
+    subs = Subscribers(header)
+
+    assert subs.update_if_changed({'name': 'John'},
+                                  email='demo@mailerlite.com') is None
+    res = subs.update_if_changed({'name': 'Jack', 'fields': {
+        'company': 'MailerLite'}}, email='demo@mailerlite.com')
+    assert res.name == 'Jack'
+    put = [c for c in responses.calls if c.request.method == 'PUT']
+    assert json.loads(put[0].request.body) == {'name': 'Jack'}
+
+    index = SubscriberIndex([{**subscriber, 'id': 2,
+                              'email': 'jane@mailerlite.com'}])
+    responses.add(responses.PUT, base + '3', status=500, json={})
+    responses.add(responses.PUT, base + '3',
+                  json={**subscriber, 'id': 3, 'name': 'Joe',
+                        'email': 'joe@mailerlite.com'})
+    index.add({**subscriber, 'id': 3, 'email': 'joe@mailerlite.com'})
+    index.add({**subscriber, 'id': 4, 'email': 'jim@mailerlite.com'})
+    result = subs.sync_profiles([
+        {'id': 2, 'name': 'Jane'},
+        {'id': 4, 'name': 'John'},
+        {'email': 'demo@mailerlite.com', 'name': 'John'},
+        {'id': 3, 'name': 'Joe'},
+    ], index=index)
+    assert [i.message for i in result.succeeded] == ['updated', 'unchanged',
+                                                     'unchanged']
+    assert result[0].body.name == 'Jane'
+    # the failed update does not hide the others
+    assert [(i.index, i.status, i.retryable) for i in result.failed] == \
+        [(3, 500, True)]
+    result = result.retry(delay=0)
+    assert result.ok and result[3].body.name == 'Joe'
+    assert len([c for c in responses.calls
+                if c.request.method == 'PUT']) == 4
+
+    # the index holds the updated subscribers, nothing is sent again
+    calls = len(responses.calls)
+    result = subs.sync_profiles([
+        {'id': 2, 'name': 'Jane'},
+        {'email': 'demo@mailerlite.com', 'name': 'John'},
+        {'id': 3, 'name': 'Joe'},
+    ], index=index)
+    assert [i.message for i in result] == ['unchanged'] * 3
+    assert len(responses.calls) == calls
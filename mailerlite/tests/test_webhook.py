@@ -1,9 +1,12 @@
 """Module to tests Webhook."""
 
+import json
+
 import pytest
+import responses
 
-from mailerlite.constants import API_KEY_TEST, Webhook
-from mailerlite.webhook import Webhooks
+from mailerlite.constants import API_KEY_TEST, Webhook, MAILERLITE_API_V2_URL
+from mailerlite.webhook import Webhooks, reconcile_webhooks
 
 
 @pytest.fixture
@@ -77,3 +80,82 @@ def test_webhook_crud(header):
     # assert custom_wh.event == first_wh.event
     # assert custom_wh.url == first_wh.url
     # assert custom_wh.id != first_wh.id
+
+
+CURRENT = {'webhooks': [
+    {'id': 1, 'event': 'subscriber.create', 'url': 'https://a.com/hook'},
+    {'id': 2, 'event': 'subscriber.update', 'url': 'https://old.com/hook'},
+    {'id': 3, 'event': 'campaign.sent', 'url': 'https://a.com/hook'},
+]}
+DESIRED = [('subscriber.create', 'https://a.com/hook'),
+           {'event': 'subscriber.update', 'url': 'https://a.com/hook'},
+           Webhook(event='subscriber.unsubscribe', url='https://a.com/hook')]
+
+
+def test_webhook_diff(header):
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+        wh = Webhooks(header)
+    current = [Webhook(**w) for w in CURRENT['webhooks']]
+
+    plan = wh.diff(DESIRED, current=current)
+    assert [w.id for w in plan.unchanged] == [1]
+    assert plan.updated == [current[1]._replace(url='https://a.com/hook')]
+    assert plan.created == [Webhook(event='subscriber.unsubscribe',
+                                    url='https://a.com/hook')]
+    assert plan.deleted == [current[2]]
+
+    plan = wh.diff(DESIRED, prune=False, current=current)
+    assert len(plan.created) == 2
+    assert plan.updated == plan.deleted == []
+
+
+@responses.activate
+def test_reconcile_webhooks(header):
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'webhooks',
+                  json=CURRENT)
+    responses.add(responses.POST, MAILERLITE_API_V2_URL + 'batch',
+                  json={'responses': [
+                      {'code': 200, 'body': {'id': 4, 'url': 'x',
+                                             'event': 'e'}},
+                      {'code': 422, 'body': {'error': 'invalid url'}},
+                      {'code': 200, 'body': {'success': True}}]})
+
+    class Api:
+        webhooks = Webhooks(header)
+
+    reports = reconcile_webhooks({'first': Api(), 'second': Api()}, DESIRED,
+                                 dry_run=True)
+    assert len(reports['first'].created) == 1
+    assert not [c for c in responses.calls
+                if c.request.method == 'POST']
+
+    report = reconcile_webhooks([Api()], DESIRED)[0]
+    assert [w.id for w in report.created] == [4]
+    assert report.updated == []
+    assert [w.id for w in report.deleted] == [3]
+    assert report.errors == [(Webhook(id=2, event='subscriber.update',
+                                      url='https://a.com/hook'),
+                              {'error': 'invalid url'})]
+    batch = [json.loads(c.request.body) for c in responses.calls
+             if c.request.method == 'POST'][0]['requests']
+    assert [(r['method'], r['path']) for r in batch] == \
+        [('POST', '/api/v2/webhooks'), ('PUT', '/api/v2/webhooks/2'),
+         ('DELETE', '/api/v2/webhooks/3')]
+    assert batch[1]['body']['url'] == 'https://a.com/hook'
+
+
+@responses.activate
+def test_apply_missing_responses(header):
+    responses.add(responses.GET, MAILERLITE_API_V2_URL + 'stats', json={})
+    responses.add(responses.POST, MAILERLITE_API_V2_URL + 'batch',
+                  json={'responses': [{'code': 200, 'body': {'id': 4}}]})
+    wh = Webhooks(header)
+    current = [Webhook(**w) for w in CURRENT['webhooks']]
+
+    report = wh.apply(wh.diff(DESIRED, current=current))
+    # only the creation was answered, the other changes are not applied
+    assert [w.id for w in report.created] == [4]
+    assert report.updated == report.deleted == []
+    assert [w.id for w, _ in report.errors] == [2, 3]
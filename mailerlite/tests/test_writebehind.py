@@ -0,0 +1,215 @@
+"""Module to test the write-behind queue."""
+import time
+
+import pytest
+
+from mailerlite.bulk import BulkResult, item_from_status
+from mailerlite.writebehind import WriteBehindQueue
+
+
+class FakeGroups:
+
+    def __init__(self):
+        self.imports = []
+        # email -> status of its import, 200 by default
+        self.codes = {}
+
+    def add_subscribers_results(self, group_id, subscribers_data,
+                                resubscribe=False, autoresponders=False):
+        self.imports.append((group_id, subscribers_data, resubscribe))
+        return BulkResult([item_from_status(i, data,
+                                            self.codes.get(data['email'],
+                                                           200))
+                           for i, data in enumerate(subscribers_data)])
+
+
+class FakeApi:
+
+    def __init__(self, fail=False, codes=None, drop=0):
+        self.fail = fail
+        self.codes = codes or {}
+        self.drop = drop
+        self.batches = []
+        self.groups = FakeGroups()
+
+    def batch(self, batch_requests):
+        if self.fail:
+            raise IOError('MailerLite is down')
+        reqs = batch_requests['requests']
+        self.batches.append(reqs)
+        responses = [{'code': self.codes.get(r['path'], 200), 'body': {}}
+                     for r in reqs]
+        return 200, {'responses': responses[:len(responses) - self.drop]}
+
+
+def test_write_behind_errors():
+    queue = WriteBehindQueue(FakeApi())
+    with pytest.raises(ValueError):
+        queue.create({'name': 'John'})
+    with pytest.raises(IOError):
+        queue.update({'name': 'John'})
+    with pytest.raises(ValueError):
+        queue.update({'email': 'john@mailerlite.com'}, id=12)
+    with pytest.raises(ValueError):
+        queue.add_to_group(1, {'email': 'john@mailerlite.com'})
+
+
+def test_write_behind_coalesce():
+    api = FakeApi()
+    queue = WriteBehindQueue(api)
+    queue.create({'email': 'John@mailerlite.com', 'name': 'John',
+                  'fields': {'company': 'A', 'city': 'Paris'}})
+    queue.create({'email': 'john@mailerlite.com ',
+                  'fields': {'company': 'B'}})
+    queue.update({'name': 'Jane'}, id=42)
+    queue.add_to_group(7, {'email': 'a@mailerlite.com', 'name': 'A'})
+    queue.add_to_group(7, {'email': 'A@mailerlite.com', 'name': 'AA'})
+    queue.add_to_group(7, {'email': 'b@mailerlite.com', 'name': 'B'})
+    assert queue.pending() == 6
+
+    assert queue.flush() == 0
+    assert len(api.batches) == 1
+    create, update = api.batches[0]
+    assert create['method'] == 'POST'
+    assert create['path'] == '/api/v2/subscribers'
+    assert create['body']['name'] == 'John'
+    assert create['body']['fields'] == {'company': 'B', 'city': 'Paris'}
+    assert update['method'] == 'PUT'
+    assert update['path'] == '/api/v2/subscribers/42'
+
+    assert len(api.groups.imports) == 1
+    group_id, subscribers, _ = api.groups.imports[0]
+    assert group_id == 7
+    assert [s['name'] for s in subscribers] == ['AA', 'B']
+
+
+def test_write_behind_retry_and_replay(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    queue = WriteBehindQueue(FakeApi(fail=True), path=path, max_attempts=2,
+                             retry_delay=0)
+    queue.create({'email': 'john@mailerlite.com'})
+    queue.update({'name': 'Jane'}, id=42)
+    assert queue.flush() == 2
+    queue._db.close()
+
+    # simulate a restart, operations are replayed
+    api = FakeApi(codes={'/api/v2/subscribers/42': 404})
+    queue = WriteBehindQueue(api, path=path, max_attempts=2, retry_delay=0)
+    assert queue.pending() == 2
+    assert queue.flush() == 0
+    failed = queue.failed()
+    assert len(failed) == 1
+    assert failed[0]['target'] == '42'
+    assert failed[0]['attempts'] == 2
+    queue.close()
+
+
+def test_write_behind_retryable_errors():
+    api = FakeApi(codes={'/api/v2/subscribers/1': 422,
+                         '/api/v2/subscribers/2': 429,
+                         '/api/v2/subscribers/3': 503})
+    queue = WriteBehindQueue(api, max_attempts=5)
+    for i in (1, 2, 3):
+        queue.update({'name': 'Jane'}, id=i)
+    # the invalid update is given up at once, the others are retried
+    assert queue.flush() == 2
+    assert [f['target'] for f in queue.failed()] == ['1']
+    queue.close()
+
+
+def test_write_behind_background_flusher():
+    api = FakeApi()
+    queue = WriteBehindQueue(api)
+    queue.start(interval=0.01)
+    queue.create({'email': 'john@mailerlite.com'})
+    deadline = time.time() + 5
+    while not api.batches and time.time() < deadline:
+        time.sleep(0.01)
+    # sent by the flusher thread, not by the flush of stop()
+    assert len(api.batches) == 1
+    assert queue.pending() == 0
+    queue.stop()
+    assert len(api.batches) == 1
+
+
+def test_write_behind_missing_responses_stay_queued():
+    api = FakeApi(drop=1)
+    queue = WriteBehindQueue(api, retry_delay=0)
+    queue.update({'name': 'A'}, id=1)
+    queue.update({'name': 'B'}, id=2)
+    assert queue.flush() == 1
+    api.drop = 0
+    assert queue.flush() == 0
+    assert api.batches[-1][0]['path'] == '/api/v2/subscribers/2'
+    assert not queue.failed()
+
+
+def test_write_behind_import_errors():
+    api = FakeApi()
+    api.groups.codes = {'b@mailerlite.com': 422, 'c@mailerlite.com': None}
+    queue = WriteBehindQueue(api, retry_delay=0)
+    for name in 'abc':
+        queue.add_to_group(7, {'email': name + '@mailerlite.com',
+                               'name': name})
+    # the rejected subscriber is given up, the unknown one stays queued
+    assert queue.flush() == 1
+    assert [op['payload']['name'] for op in queue.failed()] == ['b']
+
+    api.groups.codes = {}
+    assert queue.flush() == 0
+    assert [s['name'] for s in api.groups.imports[-1][1]] == ['c']
+
+
+def test_write_behind_backoff():
+    now = [1000.]
+    api = FakeApi(codes={'/api/v2/subscribers/1': 503})
+    queue = WriteBehindQueue(api, max_attempts=5, retry_delay=1.,
+                             clock=lambda: now[0])
+    queue.update({'name': 'A'}, id=1)
+    queue.flush()
+    queue.flush()
+    assert len(api.batches) == 1  # waits 1 second
+    queue.update({'name': 'B'}, id=1)
+    now[0] += 1
+    queue.flush()
+    # both updates are coalesced once the delay is over
+    assert len(api.batches) == 2
+    assert api.batches[-1][0]['body'] == {'name': 'B'}
+    now[0] += 1
+    queue.flush()
+    assert len(api.batches) == 2  # then 2 seconds
+    now[0] += 1
+    queue.flush()
+    assert len(api.batches) == 3
+    assert not queue.failed()
+
+
+def test_write_behind_retry_after():
+    now = [1000.]
+
+    class RateLimitedApi(FakeApi):
+        def batch(self, batch_requests):
+            self.batches.append(batch_requests['requests'])
+            error = IOError('rate limited')
+            error.retryable, error.retry_after = True, 30.
+            raise error
+
+    api = RateLimitedApi()
+    queue = WriteBehindQueue(api, clock=lambda: now[0])
+    queue.update({'name': 'A'}, id=1)
+    queue.flush()
+    now[0] += 29
+    queue.flush()
+    assert len(api.batches) == 1
+    now[0] += 1
+    queue.flush()
+    assert len(api.batches) == 2
+
+    # a long Retry-After waits at most max_retry_delay
+    api = RateLimitedApi()
+    queue = WriteBehindQueue(api, max_retry_delay=10, clock=lambda: now[0])
+    queue.update({'name': 'B'}, id=2)
+    queue.flush()
+    now[0] += 10
+    queue.flush()
+    assert len(api.batches) == 2
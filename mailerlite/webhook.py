@@ -1,12 +1,33 @@
 """Manage Webhooks."""
 
+from urllib.parse import urlparse
+
 import mailerlite.client as client
-from mailerlite.constants import Webhook
+from mailerlite.concurrency import map_concurrent
+from mailerlite.constants import Webhook, WebhookReport, \
+    MAILERLITE_API_V2_URL
+
+API_PATH = urlparse(MAILERLITE_API_V2_URL).path
+MAX_BATCH_REQUESTS = 50
+
+
+def _as_webhook(spec):
+    """Return a :class:`Webhook` from a Webhook, a dict or (event, url)."""
+    if isinstance(spec, Webhook):
+        return spec
+    if isinstance(spec, dict):
+        return Webhook(event=spec['event'], url=spec['url'])
+    event, url = spec
+    return Webhook(event=event, url=url)
 
 
 class Webhooks:
+    # url templates of the endpoints, see client.UrlTemplate
+    URL_WEBHOOKS = client.UrlTemplate('webhooks')
+    URL_WEBHOOK = client.UrlTemplate('webhooks', '{}')
+    URL_BATCH = client.UrlTemplate('batch')
 
-    def __init__(self, headers):
+    def __init__(self, headers, validate=True):
         """Initialize Webhooks object.
 
         Parameters
@@ -14,10 +35,14 @@ class Webhooks:
         headers : dict
             request header containing your mailerlite api_key.
             More information : https://developers.mailerlite.com/docs/request
+        validate : bool
+            check the headers with a request to the API (default True).
+            False when they were already checked, e.g. by MailerLiteApi.
         """
-        valid_headers, error_msg = client.check_headers(headers)
-        if not valid_headers:
-            raise ValueError(error_msg)
+        if validate:
+            valid_headers, error_msg = client.check_headers(headers)
+            if not valid_headers:
+                raise ValueError(error_msg)
 
         self.headers = headers
 
@@ -34,7 +59,7 @@ class Webhooks:
             return result as json format
 
         """
-        url = client.build_url('webhooks')
+        url = self.URL_WEBHOOKS()
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
@@ -61,7 +86,7 @@ class Webhooks:
             the desired webhook.
 
         """
-        url = client.build_url('webhooks', webhook_id)
+        url = self.URL_WEBHOOK(webhook_id)
         _, res_json = client.get(url, headers=self.headers)
 
         if as_json or not res_json:
@@ -85,7 +110,7 @@ class Webhooks:
         success: bool
             deletion status
         """
-        url = client.build_url('webhooks', webhook_id)
+        url = self.URL_WEBHOOK(webhook_id)
         return client.delete(url, headers=self.headers)
 
     def update(self, webhook_id, url, event):
@@ -107,9 +132,10 @@ class Webhooks:
         webhook : :class:Webhook
             webhook object updated
         """
-        url = client.build_url('webhooks', webhook_id)
+        request_url = self.URL_WEBHOOK(webhook_id)
         body = {"url": url, 'event': event}
-        _, res_json = client.put(url, body=body, headers=self.headers)
+        _, res_json = client.put(request_url, body=body,
+                                 headers=self.headers)
 
         return res_json
 
@@ -130,9 +156,10 @@ class Webhooks:
         field : :class:Field
             field object updated
         """
-        url = client.build_url('webhooks')
+        request_url = self.URL_WEBHOOKS()
         body = {"url": url, 'event': event}
-        code, res_json = client.post(url, body=body, headers=self.headers)
+        code, res_json = client.post(request_url, body=body,
+                                     headers=self.headers)
 
         webhook = Webhook(**res_json)
         return code, webhook
@@ -148,3 +175,180 @@ class Webhooks:
         """
         res_json = self.all(as_json=True)
         return res_json.get('count') or len(res_json.get('webhooks'))
+
+    def diff(self, desired, prune=True, current=None):
+        """Compute the minimal changes to reach the desired webhooks.
+
+        Webhooks with the same event and url are kept. Remaining desired
+        webhooks reuse (update) an existing webhook of the same event before
+        new ones are created.
+
+        Parameters
+        ----------
+        desired : list
+            desired webhooks, :class:`Webhook`, dicts with ``event`` and
+            ``url`` keys or ``(event, url)`` tuples
+        prune : bool
+            delete the webhooks not in desired (default True)
+        current : list of :class:`Webhook`, optional
+            current webhooks, fetched with :meth:`all` by default
+
+        Returns
+        -------
+        plan : :class:`WebhookReport`
+            webhooks to create, update (with their new url) and delete, and
+            the unchanged ones
+
+        """
+        if current is None:
+            current = self.all() or []
+        remaining = list(current)
+        unchanged, missing = [], []
+        for spec in {(w.event, w.url): w for w in
+                     map(_as_webhook, desired)}.values():
+            match = next((w for w in remaining if (w.event, w.url) ==
+                          (spec.event, spec.url)), None)
+            if match is None:
+                missing.append(spec)
+            else:
+                remaining.remove(match)
+                unchanged.append(match)
+
+        created, updated = [], []
+        for spec in missing:
+            match = next((w for w in remaining if w.event == spec.event),
+                         None) if prune else None
+            if match is None:
+                created.append(spec)
+            else:
+                remaining.remove(match)
+                updated.append(match._replace(url=spec.url))
+        deleted = remaining if prune else []
+        return WebhookReport(created=created, updated=updated,
+                             deleted=deleted, unchanged=unchanged, errors=[])
+
+    def apply(self, plan):
+        """Apply a plan computed by :meth:`diff` through batch requests.
+
+        Parameters
+        ----------
+        plan : :class:`WebhookReport`
+            changes to apply
+
+        Returns
+        -------
+        report : :class:`WebhookReport`
+            changes applied, ``errors`` lists ``(webhook, error)`` for the
+            changes that failed or whose outcome is unknown (no response in
+            the batch reply)
+
+        """
+        webhooks_path = API_PATH + self.URL_WEBHOOKS()
+        operations = []
+        for webhook in plan.created:
+            operations.append(('created', webhook, {
+                'method': 'POST', 'path': webhooks_path,
+                'body': {'url': webhook.url, 'event': webhook.event}}))
+        for webhook in plan.updated:
+            operations.append(('updated', webhook, {
+                'method': 'PUT',
+                'path': '{}/{}'.format(webhooks_path, webhook.id),
+                'body': {'url': webhook.url, 'event': webhook.event}}))
+        for webhook in plan.deleted:
+            operations.append(('deleted', webhook, {
+                'method': 'DELETE',
+                'path': '{}/{}'.format(webhooks_path, webhook.id)}))
+
+        report = WebhookReport(created=[], updated=[], deleted=[],
+                               unchanged=list(plan.unchanged), errors=[])
+        batch_url = self.URL_BATCH()
+        for start in range(0, len(operations), MAX_BATCH_REQUESTS):
+            chunk = operations[start:start + MAX_BATCH_REQUESTS]
+            try:
+                _, res_json = client.post(
+                    batch_url, body={'requests': [r for _, _, r in chunk]},
+                    headers=self.headers)
+            except IOError as e:
+                report.errors.extend((webhook, e) for _, webhook, _ in chunk)
+                continue
+            responses = (res_json or {}).get('responses') or []
+            for i, (kind, webhook, _) in enumerate(chunk):
+                response = responses[i] if i < len(responses) else None
+                code = response.get('code') \
+                    if isinstance(response, dict) else None
+                if code is None:
+                    # unknown outcome, the change may not have been applied
+                    report.errors.append((webhook, 'no response for this'
+                                                   ' request'))
+                    continue
+                if code >= 400:
+                    report.errors.append((webhook, response.get('body')))
+                    continue
+                body = response.get('body')
+                if kind == 'created' and isinstance(body, dict):
+                    webhook = Webhook(**{k: v for k, v in body.items()
+                                         if k in Webhook._fields})
+                getattr(report, kind).append(webhook)
+        return report
+
+    def reconcile(self, desired, prune=True, dry_run=False):
+        """Create, update and delete webhooks to match desired ones.
+
+        See :meth:`diff` for the parameters.
+
+        Parameters
+        ----------
+        dry_run : bool
+            only compute the changes (default False)
+
+        Returns
+        -------
+        report : :class:`WebhookReport`
+            changes applied, or planned with dry_run
+
+        """
+        plan = self.diff(desired, prune=prune)
+        if dry_run or not (plan.created or plan.updated or plan.deleted):
+            return plan
+        return self.apply(plan)
+
+
+def reconcile_webhooks(apis, desired, prune=True, dry_run=False,
+                       max_workers=None):
+    """Reconcile the webhooks of many accounts concurrently.
+
+    Parameters
+    ----------
+    apis : dict or list
+        account name -> :class:`mailerlite.MailerLiteApi`, or a list of them
+        (keys are then their positions)
+    desired : list
+        desired webhooks, see :meth:`Webhooks.diff`
+    prune : bool
+        delete the webhooks not in desired (default True)
+    dry_run : bool
+        only compute the changes (default False)
+    max_workers : int, optional
+        maximum number of accounts reconciled at once, default 8 or the
+        adaptive limiter maximum, see :func:`resolve_workers`
+
+    Returns
+    -------
+    reports : dict
+        account -> :class:`WebhookReport`. An account that could not be
+        reached has a report with the error only.
+
+    """
+    items = list(apis.items() if isinstance(apis, dict) else enumerate(apis))
+    desired = list(desired)
+
+    def reconcile(item):
+        try:
+            return item[1].webhooks.reconcile(desired, prune=prune,
+                                              dry_run=dry_run)
+        except IOError as e:
+            return WebhookReport(created=[], updated=[], deleted=[],
+                                 unchanged=[], errors=[(None, e)])
+
+    reports = map_concurrent(reconcile, items, max_workers=max_workers)
+    return {key: report for (key, _), report in zip(items, reports)}
@@ -0,0 +1,405 @@
+"""Durable write-behind queue for subscriber writes."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from mailerlite.constants import MAILERLITE_API_V2_URL
+from mailerlite.exceptions import error_class
+from mailerlite.subscriber import Subscribers, get_id_or_email_identifier
+
+API_PATH = urlparse(MAILERLITE_API_V2_URL).path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL DEFAULT 0
+)
+"""
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_REQUESTS = 50
+
+
+def _merge(old, new):
+    """Merge two subscriber payloads, the last write wins."""
+    merged = {**old, **new}
+    if isinstance(old.get('fields'), dict) and \
+       isinstance(new.get('fields'), dict):
+        merged['fields'] = {**old['fields'], **new['fields']}
+    return merged
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class WriteBehindQueue:
+
+    def __init__(self, api, path=':memory:', import_size=500,
+                 max_attempts=5, retry_delay=1., max_retry_delay=300.,
+                 clock=time.time):
+        """Initialize a WriteBehindQueue object.
+
+        Writes are stored right away in a local SQLite database and sent
+        later by :meth:`flush`, either called explicitly or from the
+        background flusher started with :meth:`start`. Pending operations
+        survive a crash: opening the same ``path`` again replays them.
+
+        Parameters
+        ----------
+        api : :class:`mailerlite.MailerLiteApi`
+            api used to send the operations
+        path : str
+            SQLite database file, default ':memory:' (not durable)
+        import_size : int
+            maximum number of subscribers per group import (default 500)
+        max_attempts : int
+            number of failed sends after which an operation is parked
+            as failed (default 5)
+        retry_delay : float
+            seconds before the first retry of a failed operation, doubled
+            after each attempt; a longer ``Retry-After`` is honoured
+            (default 1.0)
+        max_retry_delay : float
+            maximum seconds between two attempts (default 300)
+        clock : callable
+            returns the current unix time
+
+        """
+        self.api = api
+        self.import_size = import_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(_SCHEMA)
+        columns = [r[1] for r in
+                   self._db.execute('PRAGMA table_info(operations)')]
+        if 'next_attempt_at' not in columns:  # queue of a previous version
+            self._db.execute('ALTER TABLE operations ADD COLUMN'
+                             ' next_attempt_at REAL NOT NULL DEFAULT 0')
+        self._db.commit()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _enqueue(self, kind, target, payload):
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT INTO operations (kind, target, payload, created_at)'
+                ' VALUES (?, ?, ?, ?)',
+                (kind, str(target), json.dumps(payload), time.time()))
+            self._db.commit()
+            return cursor.lastrowid
+
+    def create(self, data):
+        """Queue the creation of a subscriber.
+
+        Parameters
+        ----------
+        data : dict
+            subscriber object, same as :meth:`Subscribers.create`
+
+        Returns
+        -------
+        operation_id : int
+            id of the queued operation
+
+        """
+        if not isinstance(data, dict) or 'email' not in data:
+            raise ValueError('data should be a dictionary containing'
+                             ' at least the email')
+        return self._enqueue('create', data['email'].strip().lower(), data)
+
+    def update(self, data, **identifier):
+        """Queue the update of a subscriber.
+
+        Parameters
+        ----------
+        data : dict
+            subscriber object, same as :meth:`Subscribers.update`
+        identifier : str
+            should be subscriber id or email.
+            e.g: id=1343965485 or email='demo@mailerlite.com'
+
+        Returns
+        -------
+        operation_id : int
+            id of the queued operation
+
+        """
+        path = get_id_or_email_identifier(**identifier)
+        if path is None:
+            raise IOError('An identifier must be define')
+        if 'email' in data.keys():
+            raise ValueError("Subscriber email can not be updated.")
+        return self._enqueue('update', path, data)
+
+    def add_to_group(self, group_id, subscriber_data, resubscribe=False,
+                     autoresponders=False):
+        """Queue the addition of a subscriber to a group.
+
+        Parameters
+        ----------
+        group_id : int
+            group id
+        subscriber_data : dict
+            subscriber data, should contain email and name
+        resubscribe : bool
+            reactivate subscriber if value is true (default False)
+        autoresponders : bool
+            autoresponders will be sent if value is true (default False)
+
+        Returns
+        -------
+        operation_id : int
+            id of the queued operation
+
+        """
+        if not {'email', 'name'}.issubset(subscriber_data.keys()):
+            raise ValueError('Subscribers_data should contain the'
+                             ' following keys: email, name')
+        target = json.dumps([group_id, bool(resubscribe),
+                             bool(autoresponders)])
+        return self._enqueue('group_add', target, subscriber_data)
+
+    def pending(self):
+        """Return the number of operations waiting to be sent."""
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM operations'
+                                    ' WHERE failed = 0').fetchone()[0]
+
+    def failed(self):
+        """Return the operations given up.
+
+        Operations are given up after ``max_attempts``, or at once on an
+        error that cannot be retried (validation error, not found, ...).
+
+        Returns
+        -------
+        operations : list of dict
+            id, kind, target, payload, attempts and last error
+
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT id, kind, target, payload, attempts, last_error'
+                ' FROM operations WHERE failed = 1 ORDER BY id').fetchall()
+        return [{'id': r[0], 'kind': r[1], 'target': r[2],
+                 'payload': json.loads(r[3]), 'attempts': r[4],
+                 'last_error': r[5]} for r in rows]
+
+    def _coalesce(self, rows):
+        """Group queued rows by kind and target, merging their payloads."""
+        coalesced = {}
+        for op_id, kind, target, payload in rows:
+            payload = json.loads(payload)
+            if kind == 'group_add':
+                target = (target, payload['email'].strip().lower())
+            key = (kind, target)
+            if key in coalesced:
+                ids, old = coalesced[key]
+                coalesced[key] = (ids + [op_id], _merge(old, payload))
+            else:
+                coalesced[key] = ([op_id], payload)
+        return coalesced
+
+    def _acknowledge(self, ids):
+        with self._lock:
+            self._db.executemany('DELETE FROM operations WHERE id = ?',
+                                 [(i,) for i in ids])
+            self._db.commit()
+
+    def _retry_later(self, ids, error, retryable=True, retry_after=None):
+        """Count a failed attempt, give up at once if not retryable.
+
+        The next attempt is delayed exponentially, or by ``retry_after``
+        seconds when it is longer, at most by ``max_retry_delay``.
+
+        """
+        now = self.clock()
+        with self._lock:
+            for i in ids:
+                attempts, = self._db.execute(
+                    'SELECT attempts FROM operations WHERE id = ?',
+                    (i,)).fetchone()
+                delay = min(self.retry_delay * 2 ** attempts,
+                            self.max_retry_delay)
+                delay = min(max(delay, retry_after or 0),
+                            self.max_retry_delay)
+                self._db.execute(
+                    'UPDATE operations SET attempts = attempts + 1,'
+                    ' last_error = ?, failed = (attempts + 1 >= ? OR ?),'
+                    ' next_attempt_at = ? WHERE id = ?',
+                    (str(error), self.max_attempts, not retryable,
+                     now + delay, i))
+            self._db.commit()
+
+    def _retry_error(self, ids, error):
+        self._retry_later(ids, error, getattr(error, 'retryable', True),
+                          getattr(error, 'retry_after', None))
+
+    def _send_batch(self, items):
+        requests = []
+        for (kind, target), (_, payload) in items:
+            if kind == 'create':
+                requests.append({'method': 'POST',
+                                 'path': API_PATH +
+                                 Subscribers.URL_SUBSCRIBERS(),
+                                 'body': payload})
+            else:
+                requests.append({'method': 'PUT',
+                                 'path': API_PATH +
+                                 Subscribers.URL_SUBSCRIBER(target),
+                                 'body': payload})
+        try:
+            _, res_json = self.api.batch({'requests': requests})
+        except IOError as e:
+            for _, (ids, _) in items:
+                self._retry_error(ids, e)
+            return
+
+        responses = (res_json or {}).get('responses') or []
+        for i, (_, (ids, _)) in enumerate(items):
+            code = responses[i].get('code') \
+                if i < len(responses) and isinstance(responses[i], dict) \
+                else None
+            if code is None:
+                # no answer for this operation, it may not have run
+                self._retry_later(ids, 'no response for this operation')
+            elif code >= 400:
+                self._retry_later(ids, responses[i].get('body'),
+                                  error_class(code).retryable)
+            else:
+                self._acknowledge(ids)
+
+    def _send_imports(self, items):
+        per_group = {}
+        for (_, (target, _)), (ids, payload) in items:
+            per_group.setdefault(target, []).append((ids, payload))
+
+        for target, entries in per_group.items():
+            group_id, resubscribe, autoresponders = json.loads(target)
+            for chunk in _chunks(entries, self.import_size):
+                # subscribers rejected or missing from the import response
+                # stay queued
+                result = self.api.groups.add_subscribers_results(
+                    group_id, [payload for _, payload in chunk],
+                    resubscribe=resubscribe, autoresponders=autoresponders)
+                for (ids, _), item in zip(chunk, result):
+                    if item.ok:
+                        self._acknowledge(ids)
+                    else:
+                        self._retry_later(ids, item.message, item.retryable,
+                                          item.retry_after)
+
+    def flush(self):
+        """Send all pending operations.
+
+        Operations are coalesced first: several writes on the same
+        subscriber are merged into a single one. Creations and updates are
+        sent through :meth:`MailerLiteApi.batch`, group additions through
+        group imports. Failed operations stay in the queue and are retried
+        by a later flush, once their retry delay is over, unless their error
+        cannot be retried.
+
+        Returns
+        -------
+        remaining : int
+            number of operations still pending
+
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT id, kind, target, payload, next_attempt_at'
+                    ' FROM operations WHERE failed = 0'
+                    ' ORDER BY id').fetchall()
+            now = self.clock()
+            waiting = {row[0] for row in rows if row[4] > now}
+            coalesced = self._coalesce([row[:4] for row in rows])
+            # a write waiting for its retry holds back the later writes on
+            # the same subscriber, so they are not overwritten by it
+            coalesced = {key: value for key, value in coalesced.items()
+                         if waiting.isdisjoint(value[0])}
+
+            writes = [(key, value) for key, value in coalesced.items()
+                      if key[0] in ('create', 'update')]
+            # creations first, so that updates find their subscriber
+            writes.sort(key=lambda item: item[0][0] != 'create')
+            for chunk in _chunks(writes, MAX_BATCH_REQUESTS):
+                self._send_batch(chunk)
+
+            self._send_imports([(key, value)
+                                for key, value in coalesced.items()
+                                if key[0] == 'group_add'])
+        return self.pending()
+
+    def start(self, interval=1.0):
+        """Start the background flusher.
+
+        Parameters
+        ----------
+        interval : float
+            seconds between two flushes (default 1.0)
+
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.flush()
+                except Exception:  # keep the flusher alive
+                    logger.exception('MailerLite write-behind flush failed')
+
+        self._thread = threading.Thread(target=run, daemon=True,
+                                        name='mailerlite-write-behind')
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """Stop the background flusher.
+
+        Parameters
+        ----------
+        flush : bool
+            send the pending operations one last time (default True)
+
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def close(self):
+        """Stop the flusher, flush and close the database."""
+        self.stop(flush=True)
+        with self._lock:
+            self._db.close()
@@ -48,7 +48,7 @@ setup(
     packages=find_packages(exclude=['docs', 'tests']),
     entry_points={
         'console_scripts': [
-            # 'command = some.module:some_function',
+            'mailerlite = mailerlite.cli:main',
         ],
     },
     include_package_data=True,
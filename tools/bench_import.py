@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""Measure the import time of mailerlite in fresh interpreters.
+
+Each scenario runs in a new Python process, the best of several runs is
+reported. ``eager`` imports everything ``import mailerlite`` used to load
+(all the resources and requests) for comparison.
+
+    python tools/bench_import.py --repeat 20
+
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SCENARIOS = {
+    'import mailerlite': 'import mailerlite',
+    'MailerLiteApi': 'from mailerlite import MailerLiteApi',
+    'subscribers only': 'import mailerlite.subscriber',
+    'eager': 'import requests, mailerlite.api, mailerlite.campaign, '
+             'mailerlite.segment, mailerlite.subscriber, mailerlite.group, '
+             'mailerlite.field, mailerlite.webhook, mailerlite.account',
+}
+
+TIMER = """
+import sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(elapsed, int('requests' in sys.modules))
+"""
+
+
+def measure(code, repeat):
+    """Return the best time and whether requests was imported."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root, PYTHONDONTWRITEBYTECODE='')
+    best, loaded = float('inf'), False
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c',
+                                       TIMER.format(code=code)], env=env)
+        elapsed, requests_loaded = out.split()
+        best = min(best, float(elapsed))
+        loaded = requests_loaded == b'1'
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='runs per scenario, the best is kept')
+    args = parser.parse_args()
+
+    print('{:<20} {:>10}  {}'.format('scenario', 'best (ms)', 'requests'))
+    for name, code in SCENARIOS.items():
+        best, loaded = measure(code, args.repeat)
+        print('{:<20} {:>10.1f}  {}'.format(name, best * 1000,
+                                            'yes' if loaded else 'no'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""Compare url building with build_url + urljoin and with UrlTemplate.
+
+    python tools/bench_urls.py --number 200000
+
+"""
+import argparse
+import os
+import sys
+import timeit
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from mailerlite import client  # noqa: E402
+from mailerlite.constants import MAILERLITE_API_V2_URL  # noqa: E402
+from mailerlite.group import Groups  # noqa: E402
+from mailerlite.subscriber import Subscribers  # noqa: E402
+
+
+def before_one():
+    return urljoin(MAILERLITE_API_V2_URL,
+                   client.build_url('subscribers', 'demo@mailerlite.com'))
+
+
+def after_one():
+    return client.absolute_url(Subscribers.URL_SUBSCRIBER(
+        'demo@mailerlite.com'))
+
+
+def before_page():
+    params = {'limit': 100, 'offset': 500, 'type': 'active'}
+    return urljoin(MAILERLITE_API_V2_URL,
+                   client.build_url('groups', 12, 'subscribers', **params))
+
+
+def after_page():
+    params = {'limit': 100, 'offset': 500, 'type': 'active'}
+    return client.absolute_url(Groups.URL_SUBSCRIBERS(12, **params))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    print('{:<22} {:>12} {:>12} {:>8}'.format('url', 'before (us)',
+                                              'after (us)', 'speedup'))
+    for name, before, after in [('subscriber by email', before_one,
+                                 after_one),
+                                ('group subscribers page', before_page,
+                                 after_page)]:
+        assert before() == after()
+        old = min(timeit.repeat(before, number=args.number, repeat=3))
+        new = min(timeit.repeat(after, number=args.number, repeat=3))
+        print('{:<22} {:>12.2f} {:>12.2f} {:>7.1f}x'.format(
+            name, old / args.number * 1e6, new / args.number * 1e6,
+            old / new))
+
+
+if __name__ == '__main__':
+    main()